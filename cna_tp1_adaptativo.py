@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_adaptativo.py'
+
+Contiene el control del paso temporal por estimación del error local.
+
+El error de cada paso se estima por duplicación de paso: se avanza el
+campo con un paso dt y con dos pasos dt/2, y la diferencia entre ambos
+resultados, dividida por 2^p - 1 (p orden del método), aproxima el error
+local de la solución con dt/2, que es la que se conserva.
+
+Los pasos se restringen a dt0 * 2^k, con dt0 el paso de referencia y k
+entero (nivel). Así el paso de cada nivel se arma (y su matriz se
+factoriza) una única vez y se reutiliza cada vez que se vuelve a ese
+nivel. Los tiempos de salida, múltiplos de dt0, se alcanzan exactamente
+bajando de nivel cerca de ellos.
+"""
+
+import sys
+import numpy as np
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_avance_adaptativo(armar_paso, delta_t=1, tol=1e-4, orden=1,
+                            nivel_min=-6, nivel_max=0):
+    """
+    Función que devuelve una función 'avanzar(u_ini, intervalo)' que
+    avanza el campo u_ini un intervalo de tiempo 'intervalo', en segundos,
+    con pasos adaptativos, y devuelve el campo final.
+
+    'armar_paso(dt)' debe devolver una función 'paso(u_ini)' que avance
+    un paso dt (ver, por ejemplo, 'cna_tp1_theta.armar_paso_theta'). Los
+    pasos armados se guardan por nivel, con dt = delta_t * 2^nivel y
+    nivel entre 'nivel_min' y 'nivel_max'.
+
+    Un paso se acepta si el error local estimado, relativo al máximo del
+    campo, es menor a 'tol'. Si no, se repite con la mitad del paso. Si el
+    error es suficientemente menor que 'tol', el paso siguiente se
+    duplica. 'orden' es el orden de precisión temporal del método: 1 para
+    theta != 0.5 y 2 para Crank-Nicolson y ADI.
+
+    El intervalo debe ser múltiplo de delta_t * 2^nivel_min.
+    """
+
+    if nivel_min > nivel_max:
+        print("Error en función 'armar_avance_adaptativo'")
+        print("'nivel_min' debe ser menor o igual a 'nivel_max'")
+        sys.exit(1)
+    else:
+        pass
+
+    # Pasos armados, por nivel
+    pasos = {}
+
+    def paso_nivel(nivel):
+        if nivel not in pasos:
+            print("\tArmado del paso dt = {:.4g} s".
+                  format(delta_t * 2.0**nivel))
+            pasos[nivel] = armar_paso(delta_t * 2.0**nivel)
+        return pasos[nivel]
+
+    # Factor de reducción del error de un paso al duplicarlo. Se exige un
+    # margen para no rechazar el paso siguiente
+    factor_error = 2.0**(orden+1)
+    margen = 0.5
+
+    # Paso mínimo, para la comparación de tiempos
+    dt_min = delta_t * 2.0**nivel_min
+
+    # Nivel con el que se inicia el próximo paso
+    estado = {'nivel': min(0, nivel_max)}
+
+    def avanzar(u_ini, intervalo):
+        u = np.array(u_ini, copy=True)
+        t = 0.0
+
+        aceptados = 0
+        rechazados = 0
+        niveles = []
+
+        while intervalo - t > 0.5*dt_min:
+            nivel_libre = estado['nivel']
+
+            # Nivel limitado para no pasar del fin del intervalo
+            nivel = nivel_libre
+            while nivel > nivel_min and \
+                  delta_t * 2.0**nivel > intervalo - t + 0.5*dt_min:
+                nivel -= 1
+
+            # Un paso dt y dos pasos dt/2. Los pasos pueden devolver un
+            # arreglo interno, por lo que sus resultados se copian
+            u_1 = np.array(paso_nivel(nivel)(u), copy=True)
+            u_med = np.array(paso_nivel(nivel-1)(u), copy=True)
+            u_2 = np.array(paso_nivel(nivel-1)(u_med), copy=True)
+
+            escala = max(np.abs(u_2).max(), np.finfo(float).tiny)
+            error = np.abs(u_2 - u_1).max() / (2**orden - 1) / escala
+
+            if error > tol and nivel > nivel_min:
+                # Paso rechazado: se repite con la mitad del paso
+                rechazados += 1
+                estado['nivel'] = nivel - 1
+                continue
+
+            # Paso aceptado
+            u = u_2
+            t += delta_t * 2.0**nivel
+            aceptados += 1
+            niveles.append(nivel)
+
+            if error * factor_error <= margen * tol:
+                nivel_nuevo = nivel + 1
+            else:
+                nivel_nuevo = nivel
+
+            # Si el paso se limitó por el fin del intervalo, se mantiene
+            # el nivel anterior
+            if nivel < nivel_libre:
+                nivel_nuevo = max(nivel_nuevo, nivel_libre)
+
+            estado['nivel'] = min(nivel_nuevo, nivel_max)
+
+        print("\tPasos aceptados: {:d}, rechazados: {:d}, ".
+              format(aceptados, rechazados) +
+              "dt entre {:.4g} y {:.4g} s".
+              format(delta_t * 2.0**min(niveles),
+                     delta_t * 2.0**max(niveles)))
+
+        return u
+
+    # Fin función 'armar_avance_adaptativo'
+    return avanzar
+#%%
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_adi.py'
+
+Contiene el integrador temporal ADI (direcciones alternadas implícitas)
+de Peaceman-Rachford.
+
+El operador L = D2x + D2y - I*c_dec - D1x se separa según dirección en
+Lx = D2x - D1x - I*c_dec/2 y Ly = D2y - I*c_dec/2. Cada paso temporal
+se divide en dos medios pasos:
+
+    (I - dt/2 Lx) u* = (I + dt/2 Ly) u_ini + forzante/2
+    (I - dt/2 Ly) u_n1 = (I + dt/2 Lx) u* + forzante/2
+
+Los términos explícitos se calculan con el esquema de 5 puntos de
+'cna_tp1_explicito.py'. Los implícitos son sistemas tridiagonales
+independientes a lo largo de cada línea 'x' (o 'y'), que se resuelven
+todos a la vez con el algoritmo de Thomas. El costo por paso es del orden
+de nx*ny, sin factorización global, y el método es incondicionalmente
+estable como Crank-Nicolson.
+"""
+
+import numpy as np
+import cna_tp1_armado as cna_armado
+import cna_tp1_explicito as cna_explicito
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_thomas(diag_inf, diag_ppal, diag_sup):
+    """
+    Función que prepara la solución de sistemas tridiagonales con el
+    algoritmo de Thomas y devuelve una función 'resolver(vec_b)'.
+
+    Las diagonales son arreglos de forma (n, ...), alineadas por fila
+    según el eje 0: cada columna de los ejes restantes es un sistema
+    tridiagonal independiente de n incógnitas. Los sistemas se resuelven
+    todos a la vez, recorriendo sólo el eje 0.
+
+    La eliminación hacia adelante de la matriz se calcula una única vez.
+    El resultado se guarda en un arreglo interno que se reutiliza en las
+    llamadas siguientes.
+    """
+
+    n_el = diag_ppal.shape[0]
+    tipo = np.result_type(diag_inf, diag_ppal, diag_sup)
+
+    # Eliminación hacia adelante de los coeficientes de la matriz
+    inv_den = np.empty(diag_ppal.shape, dtype=tipo)
+    sup_mod = np.empty(diag_ppal.shape, dtype=tipo)
+
+    inv_den[0] = 1 / diag_ppal[0]
+    sup_mod[0] = diag_sup[0] * inv_den[0]
+    for i in range(1, n_el):
+        inv_den[i] = 1 / (diag_ppal[i] - diag_inf[i]*sup_mod[i-1])
+        sup_mod[i] = diag_sup[i] * inv_den[i]
+
+    trabajo = {}
+
+    def resolver(vec_b):
+        if 'x' not in trabajo:
+            tipo_x = np.result_type(tipo, vec_b)
+            trabajo['x'] = np.empty(vec_b.shape, dtype=tipo_x)
+            trabajo['aux'] = np.empty(vec_b.shape[1:], dtype=tipo_x)
+
+        vec_x = trabajo['x']
+        aux = trabajo['aux']
+
+        # Sustitución hacia adelante
+        np.multiply(vec_b[0], inv_den[0], out=vec_x[0])
+        for i in range(1, n_el):
+            np.multiply(diag_inf[i], vec_x[i-1], out=aux)
+            np.subtract(vec_b[i], aux, out=vec_x[i])
+            vec_x[i] *= inv_den[i]
+
+        # Sustitución hacia atrás
+        for i in range(n_el-2, -1, -1):
+            np.multiply(sup_mod[i], vec_x[i+1], out=aux)
+            vec_x[i] -= aux
+
+        return vec_x
+
+    # Fin función 'armar_thomas'
+    return resolver
+#%%
+
+#%%
+def armar_paso_adi(n_el_x=1, n_el_y=1, delta_x=1, delta_y=1,
+                   delta_t=1, vel=0, dif_long=0, dif_trans=0,
+                   c_dec=0, upwinding='NO', mascara_Dir=None,
+                   val_forz=0, pos_x=1, pos_y=1):
+    """
+    Función que devuelve una función 'paso(u_ini)' que avanza un paso
+    temporal ADI de Peaceman-Rachford el campo u_ini, de forma (ny, nx),
+    y devuelve el campo u_n1.
+
+    Los nodos de 'mascara_Dir' mantienen su valor en ambos medios pasos,
+    tal como las filas Dirichlet del método theta. La forzante se reparte
+    en partes iguales entre los dos medios pasos; puede darse en varios
+    nodos, como en 'cna_tp1_explicito.armar_paso_explicito'. Con
+    'paso(u_ini, val_forz)' la forzante del paso reemplaza a 'val_forz',
+    en los mismos nodos.
+
+    Los parámetros 'vel', 'dif_long', 'dif_trans' y 'c_dec' pueden ser
+    escalares o arreglos de forma (N, 1, 1), en cuyo caso se avanzan N
+    campos a la vez con u_ini de forma (N, ny, nx).
+
+    El campo devuelto se guarda en un arreglo interno que se reutiliza
+    en los pasos siguientes. Si se lo quiere conservar, debe copiarse.
+    """
+
+    if mascara_Dir is None:
+        mascara_Dir = np.zeros((n_el_y, n_el_x), dtype=bool)
+
+    medio_dt = delta_t / 2
+
+    # Términos explícitos de cada medio paso. La mitad de la forzante se
+    # da en cada llamada
+    medio_forz = np.divide(val_forz, 2)
+
+    paso_y = cna_explicito.armar_paso_explicito(
+        n_el_x=n_el_x, n_el_y=n_el_y, delta_x=delta_x, delta_y=delta_y,
+        delta_t=medio_dt, vel=0, dif_long=0, dif_trans=dif_trans,
+        c_dec=c_dec/2, upwinding=upwinding, mascara_Dir=mascara_Dir,
+        val_forz=medio_forz, pos_x=pos_x, pos_y=pos_y)
+
+    paso_x = cna_explicito.armar_paso_explicito(
+        n_el_x=n_el_x, n_el_y=n_el_y, delta_x=delta_x, delta_y=delta_y,
+        delta_t=medio_dt, vel=vel, dif_long=dif_long, dif_trans=0,
+        c_dec=c_dec/2, upwinding=upwinding, mascara_Dir=mascara_Dir,
+        val_forz=medio_forz, pos_x=pos_x, pos_y=pos_y)
+
+    # Diagonales de las matrices 1D de derivación
+    d1x = cna_armado.coeficientes_1D(
+        orden=1, n_el=n_el_x, delta=delta_x, upwinding=upwinding)
+    d2x = cna_armado.coeficientes_1D(
+        orden=2, n_el=n_el_x, delta=delta_x, upwinding=upwinding)
+    d2y = cna_armado.coeficientes_1D(
+        orden=2, n_el=n_el_y, delta=delta_y, upwinding=upwinding)
+
+    # Diagonales de I - dt/2 Lx, de forma (..., ny, nx)
+    forma = np.broadcast(np.asarray(dif_long), np.asarray(vel),
+                         np.asarray(dif_trans), np.asarray(c_dec),
+                         mascara_Dir).shape
+
+    diags_x = [np.broadcast_to(
+        -medio_dt * (dif_long*d2x[k] - vel*d1x[k]), forma).copy()
+        for k in range(3)]
+    diags_x[1] += 1 + medio_dt*c_dec/2
+
+    # Diagonales de I - dt/2 Ly, de forma (..., ny, nx)
+    diags_y = [np.broadcast_to(
+        -medio_dt * dif_trans*d2y[k].reshape(-1,1), forma).copy()
+        for k in range(3)]
+    diags_y[1] += 1 + medio_dt*c_dec/2
+
+    # Filas Dirichlet: identidad
+    for diags in (diags_x, diags_y):
+        diags[0][..., mascara_Dir] = 0
+        diags[1][..., mascara_Dir] = 1
+        diags[2][..., mascara_Dir] = 0
+
+    # Sistemas a lo largo de 'x' (eje 0 = columnas del campo) y de 'y'
+    # (eje 0 = filas del campo)
+    thomas_x = armar_thomas(*[np.ascontiguousarray(np.moveaxis(d, -1, 0))
+                              for d in diags_x])
+    thomas_y = armar_thomas(*[np.ascontiguousarray(np.moveaxis(d, -2, 0))
+                              for d in diags_y])
+
+    trabajo = {}
+
+    def paso(u_ini, val_forz=None):
+        if val_forz is not None:
+            medio = np.divide(val_forz, 2)
+        else:
+            medio = medio_forz
+
+        # Primer medio paso: implícito en 'x'
+        rhs = paso_y(u_ini, medio)
+        u_med = thomas_x(np.ascontiguousarray(np.moveaxis(rhs, -1, 0)))
+        u_med = np.moveaxis(u_med, 0, -1)
+
+        # Segundo medio paso: implícito en 'y'
+        rhs = paso_x(u_med, medio)
+        u_n1 = thomas_y(np.ascontiguousarray(np.moveaxis(rhs, -2, 0)))
+        u_n1 = np.moveaxis(u_n1, 0, -2)
+
+        # Copia a un arreglo contiguo de forma (..., ny, nx)
+        if 'u' not in trabajo:
+            trabajo['u'] = np.empty(u_n1.shape)
+        trabajo['u'][...] = u_n1
+
+        return trabajo['u']
+
+    # Fin función 'armar_paso_adi'
+    return paso
+#%%
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_almacen.py'
+
+Contiene el almacén binario de soluciones de un directorio de salida.
+
+Las soluciones en los tiempos de escritura se guardan en un único arreglo
+mapeado en memoria, 'soluciones.npy', de forma (n_max, ny, nx), reservado
+al crear el almacén y ampliado al doble si se llena. Los tiempos [s] de
+las soluciones escritas están en 'tiempos.npy' (NaN en las posiciones
+libres) y los metadatos (dx, dy, dt, theta, descripción) en
+'soluciones.json'. Los lectores obtienen vistas del arreglo mapeado, sin
+copiar los datos. La solución del modo ESTACIONARIO se guarda con
+t = inf.
+
+Con 'escritor_asincrono' la escritura se efectúa en un hilo aparte,
+con una cola acotada, mientras el programa sigue calculando.
+
+Se conserva la exportación al formato de texto anterior, un archivo
+'sol_<t>' por tiempo de escritura, con 'exportar_texto'.
+
+Modo de uso (exportación a texto):
+    cna_tp1_almacen.py <dir_sol> [<dir_destino>]
+"""
+
+import json
+import numpy as np
+import os
+import queue
+import sys
+import threading
+
+# Nombres de los archivos del almacén
+ARCH_SOL = "soluciones.npy"
+ARCH_TIEMPOS = "tiempos.npy"
+ARCH_META = "soluciones.json"
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def crear_almacen(dir_sol, forma=(1, 1), n_max=1, meta=None):
+    """
+    Función que crea en 'dir_sol' un almacén vacío para campos de forma
+    'forma' (ny, nx), con lugar para 'n_max' tiempos, y devuelve la
+    función 'agregar(t, campo)' que escribe el campo del tiempo t [s] en
+    la siguiente posición libre. Un almacén anterior en 'dir_sol' se
+    reemplaza.
+
+    'meta' es el diccionario de metadatos (dx, dy, dt, theta y
+    'descripcion', la línea del encabezado de la exportación a texto).
+    """
+
+    os.makedirs(dir_sol, exist_ok=True)
+
+    ruta_sol = os.path.join(dir_sol, ARCH_SOL)
+    ruta_tiempos = os.path.join(dir_sol, ARCH_TIEMPOS)
+
+    with open(os.path.join(dir_sol, ARCH_META), 'w') as a_meta:
+        json.dump(dict(meta or {}, ny=forma[0], nx=forma[1]), a_meta,
+                  indent=1)
+
+    estado = {'n': 0}
+
+    def reservar(n_nuevo):
+        # Nuevos arreglos con lugar para 'n_nuevo' tiempos, con los datos
+        # ya escritos
+        n = estado['n']
+        for clave, ruta, forma_k in (('campos', ruta_sol, forma),
+                                     ('tiempos', ruta_tiempos, ())):
+            nuevo = np.lib.format.open_memmap(
+                ruta + ".tmp", mode='w+', shape=(n_nuevo,) + forma_k)
+            if clave=='tiempos':
+                nuevo[:] = np.nan
+            if n > 0:
+                nuevo[:n] = estado[clave][:n]
+            nuevo.flush()
+            del nuevo
+
+            estado.pop(clave, None)
+            os.replace(ruta + ".tmp", ruta)
+            estado[clave] = np.lib.format.open_memmap(ruta, mode='r+')
+
+    reservar(max(int(n_max), 1))
+
+    def agregar(t, campo):
+        n = estado['n']
+        if n==len(estado['tiempos']):
+            reservar(2*n)
+
+        estado['campos'][n] = campo
+        estado['tiempos'][n] = t
+        estado['n'] = n + 1
+
+        # Visible para los lectores de otros procesos
+        estado['campos'].flush()
+        estado['tiempos'].flush()
+
+    # Fin función 'crear_almacen'
+    return agregar
+#%%
+
+#%%
+def escritor_asincrono(agregar, capacidad=4):
+    """
+    Función que devuelve las funciones 'encolar(t, campo)' y 'cerrar()'
+    de una etapa de escritura en segundo plano para la función
+    'agregar(t, campo)' (ver 'crear_almacen').
+
+    'encolar' copia el campo y lo pone en una cola de a lo sumo
+    'capacidad' campos, que un hilo escritor vacía llamando a 'agregar'.
+    Si la cola está llena, 'encolar' espera a que el escritor libere un
+    lugar, de modo que la memoria usada está acotada aunque el disco sea
+    lento. 'cerrar' espera a que se escriban todos los campos encolados y
+    termina el hilo. Un error del escritor se propaga en el siguiente
+    llamado a 'encolar' o en 'cerrar'.
+    """
+
+    cola = queue.Queue(maxsize=max(int(capacidad), 1))
+    errores = []
+
+    def escribir():
+        while True:
+            elemento = cola.get()
+            if elemento is None:
+                break
+            # Tras un error se descartan los campos, sin bloquear la cola
+            if not errores:
+                try:
+                    agregar(*elemento)
+                except Exception as error:
+                    errores.append(error)
+
+    hilo = threading.Thread(target=escribir, daemon=True)
+    hilo.start()
+
+    def encolar(t, campo):
+        if errores:
+            raise errores[0]
+        cola.put((t, np.array(campo, copy=True)))
+
+    def cerrar():
+        if hilo.is_alive():
+            cola.put(None)
+            hilo.join()
+        if errores:
+            raise errores[0]
+
+    # Fin función 'escritor_asincrono'
+    return encolar, cerrar
+#%%
+
+#%%
+def hay_almacen(dir_sol):
+    """
+    Función que indica si 'dir_sol' contiene un almacén de soluciones.
+    """
+
+    # Fin función 'hay_almacen'
+    return os.path.isfile(os.path.join(dir_sol, ARCH_SOL)) and \
+        os.path.isfile(os.path.join(dir_sol, ARCH_TIEMPOS))
+#%%
+
+#%%
+def leer_almacen(dir_sol):
+    """
+    Función que abre, sólo para lectura, el almacén de 'dir_sol' y
+    devuelve los tiempos escritos [s], los campos correspondientes, de
+    forma (n, ny, nx), y el diccionario de metadatos. Los campos son una
+    vista del arreglo mapeado en memoria: se leen del disco recién al
+    usarse.
+    """
+
+    if not hay_almacen(dir_sol):
+        print("Error en función 'leer_almacen'")
+        print("No hay almacén de soluciones en '{}'".format(dir_sol))
+        sys.exit(1)
+    else:
+        pass
+
+    tiempos = np.load(os.path.join(dir_sol, ARCH_TIEMPOS), mmap_mode='r')
+    campos = np.load(os.path.join(dir_sol, ARCH_SOL), mmap_mode='r')
+
+    with open(os.path.join(dir_sol, ARCH_META), 'r') as a_meta:
+        meta = json.load(a_meta)
+
+    # Cantidad de tiempos escritos: hasta la primera posición libre
+    libres = np.isnan(tiempos)
+    n = int(np.argmax(libres)) if libres.any() else len(tiempos)
+
+    # Fin función 'leer_almacen'
+    return tiempos[:n], campos[:n], meta
+#%%
+
+#%%
+def exportar_texto(dir_sol, dir_destino=None):
+    """
+    Función que exporta el almacén de 'dir_sol' al formato de texto
+    anterior, un archivo 'sol_<t>' por tiempo (t en segundos), en
+    'dir_destino' (por defecto, 'dir_sol'). Devuelve la cantidad de
+    archivos escritos.
+    """
+
+    if dir_destino is None:
+        dir_destino = dir_sol
+
+    tiempos, campos, meta = leer_almacen(dir_sol)
+    os.makedirs(dir_destino, exist_ok=True)
+
+    for t, campo in zip(tiempos, campos):
+        ruta_sol = os.path.join(dir_destino, "sol_{:.1f}".format(t))
+
+        encabezado = "Solución para concentración de " +\
+        "contaminante [kg/m^3]\n" +\
+        "{}\n".format(meta.get('descripcion', '')) +\
+        "t = {:.2f} min".format(t/60)
+
+        np.savetxt(ruta_sol, campo, fmt='%.6e', header=encabezado)
+
+    # Fin función 'exportar_texto'
+    return len(tiempos)
+#%%
+
+#**** PROGRAMA ****#
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ + " <dir_sol> [<dir_destino>]")
+        sys.exit(1)
+
+    dir_destino = sys.argv[2] if len(sys.argv)==3 else sys.argv[1]
+    n_archivos = exportar_texto(sys.argv[1], dir_destino)
+
+    print("{:d} soluciones exportadas a texto en '{}'".
+          format(n_archivos, dir_destino))
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_armado.py'
+
+Contiene funciones de armado vectorizado de las matrices del problema.
+
+Las matrices de derivación de 'cna_tp1_func.py' se arman en formato 'lil'
+con productos kronecker y asignaciones por filas, lo que resulta lento y
+costoso en memoria para mallas grandes. Aquí los coeficientes de cada
+diagonal se calculan con numpy y la matriz se genera en un solo paso en
+formato 'dia' o 'csr'.
+
+Todas las matrices son de a lo sumo 5 diagonales: la principal, las
+adyacentes (desfazadas 1 elemento, derivación según 'x') y las desfazadas
+nx elementos (derivación según 'y'). Los coeficientes coinciden con los
+de d_dx y d_dy, filas de borde incluidas.
+"""
+
+import sys
+import numpy as np
+import scipy.sparse as sp
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def coeficientes_1D(orden=None, n_el=1, delta=1, upwinding='NO'):
+    """
+    Función que devuelve las diagonales inferior, principal y superior de
+    la matriz de derivación sobre una única línea de n_el nodos, con la
+    condición de Neumann = 0 en los extremos tal como en d_dx y d_dy.
+
+    Las diagonales se devuelven alineadas por fila: el elemento i de la
+    diagonal inferior es el coeficiente de u_i-1 en la fila i (nulo en la
+    primera fila) y el elemento i de la superior el de u_i+1 (nulo en la
+    última fila).
+
+    La matriz resultante es la misma para ambas coordenadas, por lo que
+    sirve tanto para la derivación según 'x' como según 'y'.
+    """
+
+    if orden not in (1,2):
+        print("Error en función 'coeficientes_1D'")
+        print("Orden de derivada mal especificado: debe ser <1> o <2>")
+        sys.exit(1)
+    elif upwinding not in ("SI", "NO"):
+        print("Error en función 'coeficientes_1D'")
+        print("Upwinding mal especificado, debe ser 'SI' o 'NO'")
+        sys.exit(1)
+    else:
+        pass
+
+    if orden==1:
+        coef_sec_inf = -1 # Coeficiente de diagonal para términos u_-1
+        if upwinding=='SI':
+            coef_sec_sup = 0 # Coeficiente de diagonal para términos u_+1
+            coef_ppal = 1 # Coeficiente de diagonal para términos u_0
+        else: # upwinding=='NO'
+            coef_sec_sup = 1
+            coef_ppal = 0
+
+    else: # orden==2
+        coef_ppal = -2
+        coef_sec_sup = 1
+        coef_sec_inf = 1
+
+    diag_inf = np.full(n_el, coef_sec_inf, dtype=float)
+    diag_ppal = np.full(n_el, coef_ppal, dtype=float)
+    diag_sup = np.full(n_el, coef_sec_sup, dtype=float)
+
+    # Elementos fuera de la matriz
+    diag_inf[0] = 0
+    diag_sup[-1] = 0
+
+    # Condición de Neumann en los extremos
+    if orden==1:
+        # Filas de los extremos iguales a 0
+        for diag in (diag_inf, diag_ppal, diag_sup):
+            diag[[0,-1]] = 0
+
+    else: # orden==2
+        # Sustitución de los nodos fantasmas
+        if upwinding=='SI':
+            diag_ppal[[0,-1]] += 1
+        else: # upwinding=='NO'
+            diag_sup[0] += 1
+            diag_inf[-1] += 1
+
+    # División por el paso de discretización
+    if orden==1:
+        if upwinding=='SI':
+            escala = 1/delta
+        else: # upwinding=='NO'
+            escala = 1/(2*delta)
+
+    else: # orden==2
+        escala = 1/delta**2
+
+    # Fin función 'coeficientes_1D'
+    return escala*diag_inf, escala*diag_ppal, escala*diag_sup
+#%%
+
+#%%
+def matriz_diagonales(diags_fila, offsets, formato='csr'):
+    """
+    Función que arma una matriz dispersa cuadrada a partir de sus
+    diagonales alineadas por fila: el elemento r de la diagonal con
+    desfazaje k es el coeficiente en la fila r, columna r+k. Los
+    elementos que caen fuera de la matriz no se tienen en cuenta.
+
+    El formato de salida puede ser 'dia' o 'csr'.
+    """
+
+    n_el_total = len(diags_fila[0])
+
+    # El formato 'dia' de scipy alinea las diagonales por columna
+    datos = np.zeros((len(offsets), n_el_total))
+    for k, (diag, offset) in enumerate(zip(diags_fila, offsets)):
+        if offset >= 0:
+            datos[k, offset:] = diag[:n_el_total-offset]
+        else:
+            datos[k, :offset] = diag[-offset:]
+
+    matriz = sp.dia_matrix((datos, offsets),
+                           shape=(n_el_total, n_el_total))
+
+    if formato=='dia':
+        return matriz
+    else: # formato=='csr'
+        return matriz.tocsr()
+#%%
+
+#%%
+def d_dx(orden=None, n_el_x=1, n_el_y=1, delta_x=1, upwinding='NO',
+         formato='csr'):
+    """
+    Función equivalente a 'cna_tp1_func.d_dx', con armado vectorizado.
+
+    La matriz es I_y (x) T_x, por lo que sus diagonales son las de la
+    matriz 1D T_x repetidas para cada una de las ny líneas de nodos.
+    """
+
+    diags_1D = coeficientes_1D(orden=orden, n_el=n_el_x, delta=delta_x,
+                               upwinding=upwinding)
+
+    diags_fila = [np.tile(diag, n_el_y) for diag in diags_1D]
+
+    # Fin función 'd_dx'
+    return matriz_diagonales(diags_fila, [-1,0,1], formato=formato)
+#%%
+
+#%%
+def d_dy(orden=None, n_el_x=1, n_el_y=1, delta_y=1, upwinding='NO',
+         formato='csr'):
+    """
+    Función equivalente a 'cna_tp1_func.d_dy', con armado vectorizado.
+
+    La matriz es T_y (x) I_x, por lo que cada coeficiente de la matriz 1D
+    T_y se repite para los nx nodos de la línea y las diagonales
+    adyacentes quedan desfazadas nx elementos.
+    """
+
+    diags_1D = coeficientes_1D(orden=orden, n_el=n_el_y, delta=delta_y,
+                               upwinding=upwinding)
+
+    diags_fila = [np.repeat(diag, n_el_x) for diag in diags_1D]
+
+    # Fin función 'd_dy'
+    return matriz_diagonales(diags_fila, [-n_el_x,0,n_el_x],
+                             formato=formato)
+#%%
+
+#%%
+def diagonales_M(n_el_x=1, n_el_y=1, delta_x=1, delta_y=1, delta_t=1,
+                 vel=0, dif_long=0, dif_trans=0, c_dec=0,
+                 upwinding='NO'):
+    """
+    Función que calcula las diagonales, alineadas por fila, de la matriz
+    M = dt * (D2x + D2y - I*c_dec - D1x) del programa principal, con
+    D1x = vel*d_dx(1), D2x = dif_long*d_dx(2) y D2y = dif_trans*d_dy(2).
+
+    Devuelve la lista de diagonales y la lista de desfazajes
+    [-nx, -1, 0, 1, nx].
+    """
+
+    # Matrices 1D de derivación
+    d1x = coeficientes_1D(orden=1, n_el=n_el_x, delta=delta_x,
+                          upwinding=upwinding)
+    d2x = coeficientes_1D(orden=2, n_el=n_el_x, delta=delta_x,
+                          upwinding=upwinding)
+    d2y = coeficientes_1D(orden=2, n_el=n_el_y, delta=delta_y,
+                          upwinding=upwinding)
+
+    # Diagonales de los términos según 'x' (desfazajes -1, 0, 1)
+    d1x = [np.tile(diag, n_el_y) for diag in d1x]
+    d2x = [np.tile(diag, n_el_y) for diag in d2x]
+
+    # Diagonales de los términos según 'y' (desfazajes -nx, 0, nx)
+    d2y = [np.repeat(diag, n_el_x) for diag in d2y]
+
+    # Suma de términos, en el mismo orden que en el programa principal
+    diag_ppal = ((dif_long*d2x[1] + dif_trans*d2y[1]) - c_dec) -\
+        vel*d1x[1]
+
+    diags_fila = [
+                  delta_t * (dif_trans*d2y[0]),
+                  delta_t * (dif_long*d2x[0] - vel*d1x[0]),
+                  delta_t * diag_ppal,
+                  delta_t * (dif_long*d2x[2] - vel*d1x[2]),
+                  delta_t * (dif_trans*d2y[2])
+                 ]
+
+    offsets = [-n_el_x, -1, 0, 1, n_el_x]
+
+    # Fin función 'diagonales_M'
+    return diags_fila, offsets
+#%%
+
+#%%
+def matrices_AB(diags_M, offsets, theta=0.5, formato='csr'):
+    """
+    Función que arma las matrices A = I - theta*M y B = I + (1-theta)*M
+    a partir de las diagonales de M que devuelve 'diagonales_M'.
+
+    No aplica las condiciones de borde Dirichlet.
+    """
+
+    diags_A = [-theta*diag for diag in diags_M]
+    diags_B = [(1-theta)*diag for diag in diags_M]
+
+    k_ppal = offsets.index(0)
+    diags_A[k_ppal] = 1 - theta*diags_M[k_ppal]
+    diags_B[k_ppal] = 1 + (1-theta)*diags_M[k_ppal]
+
+    A = matriz_diagonales(diags_A, offsets, formato=formato)
+    B = matriz_diagonales(diags_B, offsets, formato=formato)
+
+    # Fin función 'matrices_AB'
+    return A, B
+#%%
+
+#%%
+def factores_kron(n_el_x=1, n_el_y=1, delta_x=1, delta_y=1, delta_t=1,
+                  vel=0, dif_long=0, dif_trans=0, c_dec=0,
+                  upwinding='NO', theta=0.5):
+    """
+    Función que devuelve los factores 1D densos T_x (nx*nx) y T_y (ny*ny)
+    de la matriz A = I - theta*M, antes de aplicar las condiciones
+    Dirichlet, de modo que
+
+        A = I - (I_y (x) T_x + T_y (x) I_x)
+
+    con T_x = theta*dt*(dif_long*d2x - vel*d1x - I*c_dec/2) y
+    T_y = theta*dt*(dif_trans*d2y - I*c_dec/2), siendo d1x, d2x y d2y
+    las matrices 1D de derivación.
+    """
+
+    d1x = coeficientes_1D(orden=1, n_el=n_el_x, delta=delta_x,
+                          upwinding=upwinding)
+    d2x = coeficientes_1D(orden=2, n_el=n_el_x, delta=delta_x,
+                          upwinding=upwinding)
+    d2y = coeficientes_1D(orden=2, n_el=n_el_y, delta=delta_y,
+                          upwinding=upwinding)
+
+    diags_x = [dif_long*d2x[k] - vel*d1x[k] for k in range(3)]
+    diags_x[1] = diags_x[1] - c_dec/2
+    diags_y = [dif_trans*d2y[k] for k in range(3)]
+    diags_y[1] = diags_y[1] - c_dec/2
+
+    factor_x = theta*delta_t * \
+        matriz_diagonales(diags_x, [-1,0,1]).toarray()
+    factor_y = theta*delta_t * \
+        matriz_diagonales(diags_y, [-1,0,1]).toarray()
+
+    # Fin función 'factores_kron'
+    return factor_x, factor_y
+#%%
+
+#**** FIN PROGRAMA ****#
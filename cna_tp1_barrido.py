@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_barrido.py'
+
+Programa que efectúa un barrido de parámetros a partir de un archivo de
+entrada base, con los casos repartidos entre procesos.
+
+Los casos son todas las combinaciones de los valores dados para cada
+variable del archivo de entrada (por ejemplo THETA, DX, DY, DT, E_L, E_T
+o UPWINDING). Los casos con igual discretización y matrices, que sólo
+difieren en las fuentes, forman un grupo que se resuelve por lotes (ver
+'cna_tp1_lote.py'): sus matrices se arman y factorizan una única vez. Cada
+grupo se resuelve en un proceso. Con AUTO_DT = SI el paso se calcula en
+cada caso, por lo que DT no puede barrerse.
+
+Modo de uso:
+    cna_tp1_barrido.py <archivo_input_base> VAR=v1,v2,... [VAR=...]
+                       [PROCESOS=n]
+
+Los resultados se guardan en un único almacén indexado,
+'cna_tp1_barrido_<base>.npz', con la concentración [kg/m^3] de cada caso
+en los tiempos de escritura ('sol_<caso>', de forma (n_t, ny, nx), y
+'t_<caso>', en segundos) y el índice de casos ('variables', 'valores',
+'grupo' y 'dt', el paso empleado [s]). El índice se escribe también como
+texto en
+'cna_tp1_barrido_<base>_indice.txt'.
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_lote as cna_lote
+
+import concurrent.futures
+import contextlib
+import io
+import itertools
+import numpy as np
+import os
+import re
+import sys
+import tempfile
+import time
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def leer_grillas(argumentos):
+    """
+    Función que interpreta los argumentos 'VAR=v1,v2,...' y devuelve la
+    lista de variables, la lista de sus valores (como texto, tal como se
+    escriben en el archivo de entrada) y la cantidad de procesos
+    ('PROCESOS=n', por defecto la cantidad de procesadores).
+    """
+
+    variables = []
+    valores = []
+    procesos = os.cpu_count() or 1
+
+    for argumento in argumentos:
+        if '=' not in argumento:
+            print("Argumento '{}' mal especificado: ".format(argumento) +
+                  "debe ser 'VAR=v1,v2,...'")
+            sys.exit(1)
+        else:
+            pass
+
+        variable, lista = argumento.split('=', 1)
+        variable = variable.strip().upper()
+        lista = [val.strip() for val in lista.split(',') if val.strip()]
+
+        if variable=='PROCESOS':
+            procesos = int(lista[0])
+        elif variable in variables:
+            print("Variable {} barrida más de una vez".format(variable))
+            sys.exit(1)
+        elif variable=='FUENTE' or len(lista)==0:
+            print("Variable {} no admitida ".format(variable) +
+                  "o sin valores")
+            sys.exit(1)
+        else:
+            variables.append(variable)
+            valores.append(lista)
+
+    # Fin función 'leer_grillas'
+    return variables, valores, max(procesos, 1)
+#%%
+
+#%%
+def datos_caso(texto_base, variables, valores_caso):
+    """
+    Función que devuelve el diccionario de variables del caso (ver
+    'cna_tp1_in.datos_input'): el archivo de entrada base con las líneas
+    de 'variables' reemplazadas (o agregadas, si no figuran) con los
+    valores del caso. El archivo del caso se lee con 'datos_input', de
+    modo que se verifica como cualquier archivo de entrada.
+    """
+
+    texto = texto_base
+    for variable, valor in zip(variables, valores_caso):
+        linea = "{} = {}".format(variable, valor)
+        patron = re.compile(r'^[ \t]*' + variable + r'[ \t]*=.*$',
+                            re.MULTILINE)
+
+        if patron.search(texto):
+            texto = patron.sub(linea, texto)
+        else:
+            texto = texto.rstrip('\n') + '\n' + linea + '\n'
+
+    with tempfile.NamedTemporaryFile('w', suffix='.in', delete=False) \
+         as archivo:
+        archivo.write(texto)
+
+    try:
+        vs = cna_in.datos_input(archivo.name)
+    finally:
+        os.remove(archivo.name)
+
+    # Fin función 'datos_caso'
+    return vs
+#%%
+
+#%%
+def resolver_grupo(lista_vs):
+    """
+    Función que resuelve por lotes los casos de 'lista_vs', que comparten
+    las matrices del problema, y devuelve los tiempos de escritura [s], la
+    concentración de cada caso, de forma (k, n_t, ny, nx), y el tiempo de
+    cálculo del grupo [s]. La salida por pantalla se descarta.
+    """
+
+    t_ini = time.perf_counter()
+
+    lista_p = [cna_main.parametros(vs) for vs in lista_vs]
+
+    tiempos = []
+    campos = []
+
+    def guardar(t, campos_t):
+        tiempos.append(t)
+        campos.append(campos_t)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cna_lote.resolver_lote(lista_p, t_sol=lista_vs[0]['T_SOL'],
+                               guardar=guardar, informar=False)
+
+    # Fin función 'resolver_grupo'
+    return np.array(tiempos), np.stack(campos, axis=1), \
+        time.perf_counter() - t_ini
+#%%
+
+#**** PROGRAMA ****#
+
+def main(archivo_input, argumentos):
+
+    print("Ejecutando programa " + __file__)
+
+    variables, valores, procesos = leer_grillas(argumentos)
+
+    with open(archivo_input, 'r') as a_in:
+        texto_base = a_in.read()
+
+    # Casos: combinaciones de los valores de todas las variables
+    casos = list(itertools.product(*valores))
+    lista_vs = [datos_caso(texto_base, variables, caso) for caso in casos]
+
+    # Con AUTO_DT = SI el paso de cada caso reemplaza al DT barrido
+    if 'DT' in variables and \
+       any(vs['AUTO_DT']=='SI' for vs in lista_vs):
+        print("Error: DT no puede barrerse con AUTO_DT = SI, ya que " +
+              "el paso se calcula en cada caso")
+        print("Debe fijarse AUTO_DT = NO en el archivo de entrada o " +
+              "en el barrido")
+        sys.exit(1)
+    else:
+        pass
+
+    # Agrupación de los casos con iguales matrices y bucle temporal
+    grupos = {}
+    dt_caso = np.empty(len(casos))
+    for i_caso, vs in enumerate(lista_vs):
+        p = cna_main.parametros(vs)
+        cna_lote.verificar_escenario(vs, p)
+        clave = repr(cna_lote.firma_matrices(vs, p))
+        grupos.setdefault(clave, []).append(i_caso)
+        dt_caso[i_caso] = p['dt']
+
+        # Los tiempos de escritura deben ser múltiplos del paso, también
+        # del calculado con AUTO_DT = SI
+        t_sol_seg = vs['T_SOL'] * 60
+        if not np.isclose(t_sol_seg/p['dt'], round(t_sol_seg/p['dt'])):
+            print("Error en el caso {:04d}: T_SOL ".format(i_caso) +
+                  "({} min) no es múltiplo del paso ".format(vs['T_SOL']) +
+                  "dt = {:.3f} s".format(p['dt']))
+            sys.exit(1)
+        else:
+            pass
+
+    grupos = list(grupos.values())
+    grupo_caso = np.empty(len(casos), dtype=int)
+    for i_grupo, grupo in enumerate(grupos):
+        grupo_caso[grupo] = i_grupo
+
+    print("\nBarrido de {:d} casos en {:d} grupos ".
+          format(len(casos), len(grupos)) +
+          "con igual discretización, con {:d} procesos".
+          format(min(procesos, len(grupos))))
+    for variable, lista in zip(variables, valores):
+        print("\t{}: {}".format(variable, ", ".join(lista)))
+
+    nombre = os.path.splitext(os.path.basename(archivo_input))[0]
+    ruta = os.path.join(os.getcwd(), "cna_tp1_barrido_" + nombre)
+
+    resultados = {}
+    t_grupos = np.zeros(len(grupos))
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(procesos, len(grupos))) as ejecutor:
+        futuros = {ejecutor.submit(resolver_grupo,
+                                   [lista_vs[i] for i in grupo]): i_grupo
+                   for i_grupo, grupo in enumerate(grupos)}
+
+        for futuro in concurrent.futures.as_completed(futuros):
+            i_grupo = futuros[futuro]
+            tiempos, campos, t_grupos[i_grupo] = futuro.result()
+
+            for i_caso, campo in zip(grupos[i_grupo], campos):
+                resultados['t_{:04d}'.format(i_caso)] = tiempos
+                resultados['sol_{:04d}'.format(i_caso)] = campo
+
+            print("\tGrupo {:d} ({:d} casos) resuelto en {:.2f} s".
+                  format(i_grupo, len(grupos[i_grupo]),
+                         t_grupos[i_grupo]))
+
+    np.savez(ruta, variables=np.array(variables),
+             valores=np.array(casos, dtype=str).reshape(len(casos), -1),
+             grupo=grupo_caso, dt=dt_caso, t_grupo=t_grupos,
+             **resultados)
+
+    # Índice de casos como texto
+    with open(ruta + "_indice.txt", 'w') as a_ind:
+        a_ind.write("# Barrido de '{}'\n".format(archivo_input))
+        a_ind.write("# caso grupo " + " ".join(variables) +
+                    " dt[s] conc_max_final[kg/m^3]\n")
+        for i_caso, caso in enumerate(casos):
+            sol = resultados['sol_{:04d}'.format(i_caso)]
+            a_ind.write("{:04d} {:d} ".format(i_caso, grupo_caso[i_caso]) +
+                        " ".join(caso) + " {:.3f}".format(dt_caso[i_caso]) +
+                        " {:.6e}\n".format(sol[-1].max()))
+
+    print("\nResultados guardados en '{}.npz'".format(ruta))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ +
+              " <archivo_input_base> VAR=v1,v2,... [VAR=...] " +
+              "[PROCESOS=n]")
+        sys.exit(1)
+
+    main(sys.argv[1], sys.argv[2:])
+
+#**** FIN PROGRAMA ****#
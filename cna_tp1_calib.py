@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_calib.py'
+
+Programa que calibra parámetros del modelo ('E_L' y 'E_T' por defecto,
+o cualquiera de 'VEL', 'E_L', 'E_T' y 'C_DEC') ajustando por mínimos
+cuadrados las concentraciones medidas en puntos fijos.
+
+El archivo de observaciones tiene una fila por medición, con las
+columnas t [min], x [m], y [m] y concentración [kg/m^3]. Los tiempos
+deben ser múltiplos de 'DT'.
+
+Cada evaluación es una corrida directa que sólo guarda la serie en los
+nodos de medición, hasta la última medición, junto con la sensibilidad
+tangente lineal (ver 'cna_tp1_sensib.py'), que da el jacobiano con la
+misma factorización de A. Los resultados se guardan por vector de
+parámetros, de modo que el residuo y el jacobiano de un mismo punto
+cuestan una única corrida. Los parámetros se ajustan en escala
+logarítmica, que los mantiene positivos, con
+'scipy.optimize.least_squares'.
+
+Modo de uso:
+    cna_tp1_calib.py <archivo_input> <archivo_obs> [PARAM ...]
+
+Los valores de 'archivo_input' son el punto de partida. Con AUTO_DT = SI
+el paso se calcula con esos valores y se mantiene fijo en la calibración.
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_func as cna_func
+import cna_tp1_sensib as cna_sensib
+
+import contextlib
+import io
+import numpy as np
+import os
+import scipy.optimize as optimize
+import sys
+import time
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def leer_observaciones(archivo_obs):
+    """
+    Función que lee el archivo de observaciones y devuelve los arreglos
+    de tiempos [min], coordenadas x e y [m] y concentraciones [kg/m^3].
+    """
+
+    datos = np.loadtxt(archivo_obs, ndmin=2)
+
+    if datos.shape[1] != 4 or datos.shape[0]==0:
+        print("Archivo de observaciones '{}' mal ".format(archivo_obs) +
+              "especificado: deben ser columnas t x y concentración")
+        sys.exit(1)
+    else:
+        pass
+
+    # Fin función 'leer_observaciones'
+    return datos[:,0], datos[:,1], datos[:,2], datos[:,3]
+#%%
+
+#%%
+def armar_modelo(vs, obs, nombres):
+    """
+    Función que devuelve la función 'modelo(valores)' que, para los
+    valores de los parámetros 'nombres', devuelve la concentración del
+    modelo en las observaciones 'obs' (ver 'leer_observaciones') y su
+    derivada respecto de cada parámetro, de forma (n_obs, n_par).
+
+    Los resultados se guardan por vector de parámetros y la salida por
+    pantalla de las corridas se descarta. La función 'modelo' tiene el
+    atributo 'corridas', con la cantidad de corridas efectuadas.
+    """
+
+    t_obs, x_obs, y_obs, _ = obs
+
+    p_ini = cna_main.parametros(vs)
+    dt = p_ini['dt']
+
+    # Paso fijo en la calibración
+    vs = dict(vs, AUTO_DT="NO", DT=dt)
+
+    pasos_obs = np.rint(t_obs*60/dt).astype(int)
+    if not np.allclose(pasos_obs*dt, t_obs*60) or pasos_obs.min() < 1:
+        print("Los tiempos de observación deben ser múltiplos " +
+              "positivos de DT = {:.1f} s".format(dt))
+        sys.exit(1)
+    else:
+        pass
+
+    pos_x, pos_y = cna_func.nodos_sondas(
+        sondas=np.column_stack((x_obs, y_obs)), x_ini=vs['X_INI'],
+        y_ini=vs['Y_INI'], delta_x=p_ini['dx'], delta_y=p_ini['dy'],
+        n_el_x=p_ini['nx'], n_el_y=p_ini['ny'])
+    nodos_obs = pos_x + p_ini['nx']*pos_y
+
+    columnas = [cna_sensib.PARAMETROS.index(nombre) for nombre in nombres]
+
+    memoria = {}
+
+    def modelo(valores):
+        clave = tuple(valores)
+        if clave in memoria:
+            return memoria[clave]
+
+        vs_k = dict(vs, **dict(zip(nombres, valores)))
+        p = cna_main.parametros(vs_k)
+
+        derivadas = cna_sensib.derivadas_M(vs_k, p)
+        with contextlib.redirect_stdout(io.StringIO()):
+            paso = cna_sensib.armar_paso_sensibilidad(
+                p, [derivadas[col] for col in columnas])
+
+        u_ini = np.zeros(p['nt'])
+        s_ini = np.zeros((p['nt'], len(columnas)))
+
+        conc = np.zeros(len(t_obs))
+        sens = np.zeros((len(t_obs), len(columnas)))
+
+        for n in range(1, pasos_obs.max()+1):
+            u_ini, s_ini = paso(u_ini, s_ini)
+
+            en_paso = pasos_obs==n
+            if np.any(en_paso):
+                conc[en_paso] = u_ini[nodos_obs[en_paso]]/p['v_cel']
+                sens[en_paso] = s_ini[nodos_obs[en_paso]]/p['v_cel']
+
+        memoria[clave] = (conc, sens)
+        modelo.corridas += 1
+
+        return conc, sens
+
+    modelo.corridas = 0
+
+    # Fin función 'armar_modelo'
+    return modelo
+#%%
+
+#**** PROGRAMA ****#
+
+def main(archivo_input, archivo_obs, nombres=('E_L', 'E_T')):
+
+    print("Ejecutando programa " + __file__)
+
+    vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
+
+    for nombre in nombres:
+        if nombre not in cna_sensib.PARAMETROS:
+            print("Parámetro '{}' no calibrable. ".format(nombre) +
+                  "Opciones: {}".format(", ".join(cna_sensib.PARAMETROS)))
+            sys.exit(1)
+        elif vs[nombre] <= 0:
+            print("El valor inicial de '{}' debe ser ".format(nombre) +
+                  "positivo")
+            sys.exit(1)
+        else:
+            pass
+
+    if p['integrador']!='THETA' or vs['TOL_PASO'] > 0:
+        print("La calibración requiere el integrador 'THETA' " +
+              "con paso fijo (TOL_PASO = 0)")
+        sys.exit(1)
+    else:
+        pass
+
+    obs = leer_observaciones(archivo_obs)
+    c_obs = obs[3]
+
+    modelo = armar_modelo(vs, obs, nombres)
+
+    # Residuo relativo a la mayor observación, en función del logaritmo
+    # de los parámetros
+    escala = max(np.abs(c_obs).max(), np.finfo(float).tiny)
+
+    def residuo(log_valores):
+        conc, _ = modelo(np.exp(log_valores))
+        return (conc - c_obs)/escala
+
+    def jacobiano(log_valores):
+        valores = np.exp(log_valores)
+        _, sens = modelo(valores)
+        return sens*valores/escala
+
+    val_ini = np.array([vs[nombre] for nombre in nombres], dtype=float)
+
+    print("\nCalibración de {} con {:d} observaciones".
+          format(", ".join(nombres), len(c_obs)))
+    print("Valores iniciales: " +
+          ", ".join("{} = {:.4e}".format(nombre, val)
+                    for nombre, val in zip(nombres, val_ini)))
+
+    t_ini = time.perf_counter()
+    ajuste = optimize.least_squares(residuo, np.log(val_ini),
+                                    jac=jacobiano, method='trf',
+                                    x_scale='jac', verbose=1)
+    t_calib = time.perf_counter() - t_ini
+
+    val_fin = np.exp(ajuste.x)
+    conc, sens = modelo(val_fin)
+
+    # Desvío estándar aproximado de los parámetros, con la covarianza
+    # (J^T J)^-1 s^2 del modelo linealizado
+    n_obs, n_par = sens.shape
+    var_res = ((conc - c_obs)**2).sum() / max(n_obs - n_par, 1)
+    try:
+        covarianza = np.linalg.inv(sens.T @ sens) * var_res
+        desvio = np.sqrt(np.abs(np.diag(covarianza)))
+    except np.linalg.LinAlgError:
+        desvio = np.full(n_par, np.nan)
+
+    print("\nResultado: {}".format(ajuste.message))
+    print("\tCorridas directas: {:d}, tiempo: {:.2f} s".
+          format(modelo.corridas, t_calib))
+    print("\tRaíz del error cuadrático medio: {:.3e} kg/m^3".
+          format(np.sqrt(((conc - c_obs)**2).mean())))
+    for nombre, val, desv in zip(nombres, val_fin, desvio):
+        print("\t{} = {:.4e} +/- {:.2e}".format(nombre, val, desv))
+
+    dir_calib = p['dir_sol'] + "_calib"
+    os.makedirs(dir_calib, exist_ok=True)
+    ruta = os.path.join(os.getcwd(), dir_calib, "ajuste")
+
+    encabezado = "Calibración con '{}'\n".format(archivo_obs) +\
+    ", ".join("{} = {:.6e}".format(nombre, val)
+              for nombre, val in zip(nombres, val_fin)) + "\n" +\
+    "t[min] x[m] y[m] c_obs[kg/m^3] c_modelo[kg/m^3]"
+
+    np.savetxt(ruta, np.column_stack((*obs, conc)), fmt='%.6e',
+               header=encabezado)
+
+    print("\nAjuste guardado en '{}'".format(ruta))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ +
+              " <archivo_input> <archivo_obs> [PARAM ...]")
+        sys.exit(1)
+
+    if len(sys.argv) > 3:
+        main(sys.argv[1], sys.argv[2],
+             [nombre.upper() for nombre in sys.argv[3:]])
+    else:
+        main(sys.argv[1], sys.argv[2])
+
+#**** FIN PROGRAMA ****#
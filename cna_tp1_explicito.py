@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_explicito.py'
+
+Contiene el motor de avance temporal explícito (theta = 0) sin matrices.
+
+Con theta = 0 la matriz A es la identidad, por lo que cada paso se reduce
+a u_n1 = B u_ini + forzante. En lugar de armar B, el paso se calcula
+directamente sobre el campo de forma (ny, nx) con operaciones vectorizadas
+de un esquema de 5 puntos: el nodo central y sus vecinos en 'x' (oeste y
+este) y en 'y' (sur y norte).
+
+Los coeficientes del esquema son las diagonales de las matrices 1D de
+derivación de 'cna_tp1_armado.py', por lo que los términos advectivo,
+difusivos y los bordes Neumann coinciden con los de la formulación
+matricial. Los bordes Dirichlet mantienen el valor del paso anterior,
+tal como las filas que impone cb_Dir_mascara.
+"""
+
+import numpy as np
+import cna_tp1_armado as cna_armado
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_paso_explicito(n_el_x=1, n_el_y=1, delta_x=1, delta_y=1,
+                         delta_t=1, vel=0, dif_long=0, dif_trans=0,
+                         c_dec=0, upwinding='NO', mascara_Dir=None,
+                         val_forz=0, pos_x=1, pos_y=1):
+    """
+    Función que devuelve una función 'paso(u_ini)' que avanza un paso
+    temporal explícito el campo u_ini, de forma (ny, nx), y devuelve el
+    campo u_n1.
+
+    El paso equivale a u_n1 = B u_ini + forzante con
+    B = I + dt*(D2x + D2y - I*c_dec - D1x) y las filas Dirichlet de
+    'mascara_Dir' (ver 'cna_tp1_func.mascara_Dir') reemplazadas por la
+    identidad.
+
+    La forzante 'val_forz' se suma en el nodo (pos_y, pos_x). Pueden
+    darse arreglos de igual largo para 'val_forz', 'pos_x' y 'pos_y',
+    con varias fuentes que se suman a la vez en cada paso. Con N campos,
+    'val_forz' puede tener forma (N, n_fuentes), una fila por campo. Con
+    'paso(u_ini, val_forz)' la forzante del paso reemplaza a 'val_forz',
+    en los mismos nodos.
+
+    Los parámetros 'vel', 'dif_long', 'dif_trans' y 'c_dec' pueden ser
+    escalares o arreglos de forma (N, 1, 1), en cuyo caso se avanzan N
+    campos a la vez con u_ini de forma (N, ny, nx).
+
+    El campo devuelto se guarda en un arreglo interno que se reutiliza
+    en los pasos siguientes, nunca en u_ini. Si se lo quiere conservar,
+    debe copiarse.
+    """
+
+    # Diagonales de las matrices 1D de derivación sobre una única línea
+    # de nodos
+    d1x = cna_armado.coeficientes_1D(
+        orden=1, n_el=n_el_x, delta=delta_x, upwinding=upwinding)
+    d2x = cna_armado.coeficientes_1D(
+        orden=2, n_el=n_el_x, delta=delta_x, upwinding=upwinding)
+    d2y = cna_armado.coeficientes_1D(
+        orden=2, n_el=n_el_y, delta=delta_y, upwinding=upwinding)
+
+    # Coeficientes del esquema de 5 puntos, multiplicados por 'dt'.
+    # Los coeficientes en 'x' varían según columna y los de 'y' según
+    # fila del campo
+    coef_oeste = delta_t * (dif_long*d2x[0] - vel*d1x[0])
+    coef_este = delta_t * (dif_long*d2x[2] - vel*d1x[2])
+    coef_sur = delta_t * dif_trans*d2y[0].reshape(-1,1)
+    coef_norte = delta_t * dif_trans*d2y[2].reshape(-1,1)
+
+    coef_ppal = 1 + delta_t * (dif_long*d2x[1] - vel*d1x[1] +
+                               dif_trans*d2y[1].reshape(-1,1) - c_dec)
+
+    # Recorte de los coeficientes de vecinos a los nodos que los tienen
+    coef_oeste = coef_oeste[..., 1:]
+    coef_este = coef_este[..., :-1]
+    coef_sur = coef_sur[..., 1:, :]
+    coef_norte = coef_norte[..., :-1, :]
+
+    # Nodos con condición Dirichlet, como índices (fila, columna) del
+    # campo
+    if mascara_Dir is None:
+        nodos_Dir = (np.array([], dtype=int), np.array([], dtype=int))
+    else:
+        nodos_Dir = np.nonzero(mascara_Dir)
+
+    # Arreglos de trabajo, creados en el primer paso según la forma del
+    # campo
+    trabajo = {}
+
+    def paso(u_ini, val_forz=val_forz):
+        if 'aux' not in trabajo:
+            forma = np.broadcast(coef_ppal, u_ini).shape
+            trabajo['u_a'] = np.empty(forma)
+            trabajo['u_b'] = np.empty(forma)
+            trabajo['aux'] = np.empty(forma)
+
+        # Selección del arreglo de salida, distinto de 'u_ini'
+        u_n1 = trabajo['u_a']
+        if u_n1 is u_ini:
+            u_n1 = trabajo['u_b']
+
+        aux = trabajo['aux']
+
+        # Nodo central
+        np.multiply(coef_ppal, u_ini, out=u_n1)
+
+        # Vecinos oeste y este
+        np.multiply(coef_oeste, u_ini[..., :, :-1], out=aux[..., :, 1:])
+        u_n1[..., :, 1:] += aux[..., :, 1:]
+        np.multiply(coef_este, u_ini[..., :, 1:], out=aux[..., :, :-1])
+        u_n1[..., :, :-1] += aux[..., :, :-1]
+
+        # Vecinos sur y norte
+        np.multiply(coef_sur, u_ini[..., :-1, :], out=aux[..., 1:, :])
+        u_n1[..., 1:, :] += aux[..., 1:, :]
+        np.multiply(coef_norte, u_ini[..., 1:, :], out=aux[..., :-1, :])
+        u_n1[..., :-1, :] += aux[..., :-1, :]
+
+        # Condición Dirichlet: el valor del borde se mantiene
+        u_n1[(Ellipsis,) + nodos_Dir] = u_ini[(Ellipsis,) + nodos_Dir]
+
+        # Forzante, en uno o varios nodos
+        np.add.at(u_n1, (Ellipsis, pos_y, pos_x), val_forz)
+
+        return u_n1
+
+    # Fin función 'armar_paso_explicito'
+    return paso
+#%%
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_exponencial.py'
+
+Contiene el integrador exponencial del sistema semidiscreto
+
+    du/dt = L u + q
+
+con L = D2x + D2y - I*c_dec - D1x y q la descarga por segundo. Como L y q
+no cambian en el tiempo, la solución exacta en el tiempo es
+
+    u(t + T) = exp(T L) u(t) + T phi_1(T L) q
+
+con phi_1(z) = (exp(z) - 1)/z. Ambos términos se obtienen con una única
+acción de la exponencial de la matriz aumentada
+
+    L_aum = [[L, q],
+             [0, 0]]
+
+sobre el vector [u, 1], con 'expm_multiply' de scipy. No hay error de
+discretización temporal ni restricción de estabilidad, por lo que se
+puede avanzar directamente de un tiempo de escritura al siguiente.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as splinalg
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_avance_exponencial(matriz_L, vec_q, mascara_Dir=None):
+    """
+    Función que devuelve una función 'avanzar(u_ini, intervalo)' que
+    avanza el vector u_ini un intervalo de tiempo 'intervalo', en
+    segundos, con la solución exacta del sistema du/dt = L u + q.
+
+    En los nodos Dirichlet de 'mascara_Dir' las filas de L y los valores
+    de q se anulan, de modo que esos nodos mantienen su valor, tal como
+    con las filas identidad del método theta.
+    """
+
+    matriz_L = sp.csr_matrix(matriz_L)
+    vec_q = np.array(vec_q, dtype=float).ravel()
+
+    if mascara_Dir is not None:
+        libres = 1 - np.ravel(mascara_Dir)
+        matriz_L = sp.diags(libres) @ matriz_L
+        vec_q = libres * vec_q
+
+    # Matriz aumentada con la fuente como columna adicional
+    n_el_total = matriz_L.shape[0]
+    L_aum = sp.bmat([[matriz_L, sp.csr_matrix(vec_q.reshape(-1,1))],
+                     [None, sp.csr_matrix((1,1))]], format='csr')
+
+    def avanzar(u_ini, intervalo):
+        v_aum = np.append(np.ravel(u_ini), 1.0)
+        v_aum = splinalg.expm_multiply(intervalo * L_aum, v_aum)
+
+        return v_aum[:n_el_total]
+
+    # Fin función 'armar_avance_exponencial'
+    return avanzar
+#%%
+
+#**** FIN PROGRAMA ****#
@@ -18,7 +18,8 @@ derivación primera y segunda en diferencias finitas sobre el vector con el
 estado actual deldominio.
 
 La función cb_Dir aplica condición de borde Dirichlet sobre la matriz
-final de la discretización del problema.
+final de la discretización del problema. Las funciones mascara_Dir y
+cb_Dir_mascara la aplican sobre todos los bordes a la vez.
 """
 
 import sys
@@ -409,7 +410,7 @@ def d_dy(orden=None, n_el_x=1, n_el_y=1, delta_y=1, upwinding='NO'):
         if upwinding=='SI':
             matriz_final = (1/delta_y) * matriz_final
         else: # upwinding=='SI':
-            matriz_final = (1/2*delta_y) * matriz_final
+            matriz_final = (1/(2*delta_y)) * matriz_final
 
     else: # orden==2:
         matriz_final = (1/delta_y**2) * matriz_final
@@ -418,7 +419,68 @@ def d_dy(orden=None, n_el_x=1, n_el_y=1, delta_y=1, upwinding='NO'):
     return matriz_final
 #%%
 
-##%%
+#%%
+def mascara_Dir(bordes=(), n_el_x=1, n_el_y=1):
+    """
+    Función que devuelve una máscara booleana de forma (ny, nx), igual a
+    True en los nodos con condición de Dirichlet de los bordes indicados.
+
+    La máscara aplanada ('mascara.ravel()') corresponde al orden del
+    vector solución, con los elementos de coord 'x' primero. Sirve tanto
+    para modificar las filas de las matrices del sistema (cb_Dir_mascara)
+    como para mantener los valores de borde en el avance sin matrices.
+    """
+
+    mascara = np.zeros((n_el_y, n_el_x), dtype=bool)
+
+    for borde in bordes:
+        if borde=='x_ini':
+            mascara[:,0] = True
+        elif borde=='x_fin':
+            mascara[:,-1] = True
+        elif borde=='y_ini':
+            mascara[0,:] = True
+        elif borde=='y_fin':
+            mascara[-1,:] = True
+        else:
+            print("Error en función 'mascara_Dir'")
+            print("Borde de aplicación de condición de borde mal " +
+                  "especificado. Debe ser alguna de estas opciones:\n" +
+                  "'x_ini'\n'x_fin'\n'y_ini'\n'y_fin'")
+            sys.exit(1)
+
+    # Fin función 'mascara_Dir'
+    return mascara
+#%%
+
+#%%
+def cb_Dir_mascara(matriz_aplicacion, mascara):
+    """
+    Función que aplica la condición de Dirichlet sobre las filas de una
+    matriz indicadas por la máscara de 'mascara_Dir', en una única
+    operación para todos los bordes.
+
+    Las filas de la máscara se anulan por escalado de filas y luego se
+    suma la identidad en esos nodos, de modo que cada fila Dirichlet
+    queda con un único coeficiente igual a 1 en la diagonal.
+
+    Devuelve la matriz en formato 'csr'.
+    """
+
+    mascara = np.asarray(mascara, dtype=float).ravel()
+
+    # Escalado de filas: (I - diag(m)) * matriz + diag(m)
+    matriz_aplicacion = sp.diags(1 - mascara) @ \
+        sp.csr_matrix(matriz_aplicacion) + sp.diags(mascara)
+
+    matriz_aplicacion = matriz_aplicacion.tocsr()
+    matriz_aplicacion.eliminate_zeros()
+
+    # Fin función 'cb_Dir_mascara'
+    return matriz_aplicacion
+#%%
+
+#%%
 def cb_Dir(matriz_aplicacion, borde=None, valor=0,n_el_x=1, n_el_y=1):
     """
     Función que aplica sobre una matriz los coeficientes necesarios para
@@ -435,7 +497,8 @@ def cb_Dir(matriz_aplicacion, borde=None, valor=0,n_el_x=1, n_el_y=1):
     condiciones de borde aplicadas distintas (uno Dirichlet y otro
     Neumann), en la esquina prevalece siempre la condición de Dirichlet.
     
-    Modifica de a un borde por vez.
+    Modifica de a un borde por vez. Para aplicar todos los bordes en una
+    única operación, usar 'mascara_Dir' y 'cb_Dir_mascara'.
     """
 
     if borde==None:
@@ -452,31 +515,10 @@ def cb_Dir(matriz_aplicacion, borde=None, valor=0,n_el_x=1, n_el_y=1):
     else:
         pass
 
-    # Conversión de la matriz a formato 'lil'
-    # (scipy de manera automática convierte a 'csr' luego de aplicar sumas
-    # y eso impide la modificación de bordes que aquí se efectúa.)
-    matriz_aplicacion = matriz_aplicacion.tolil()
-
     # Aplicación de la condición de borde
-    n_el_total = n_el_x * n_el_y
+    mascara = mascara_Dir(bordes=[borde], n_el_x=n_el_x, n_el_y=n_el_y)
 
-    if borde=='y_ini':
-        cb = sp.eye(m=n_el_x, n=n_el_total, k=0)
-        matriz_aplicacion[0:n_el_x] = cb
-
-    elif borde=='y_fin':
-        cb = sp.eye(m=n_el_x, n=n_el_total, k=n_el_x*(n_el_y-1))
-        matriz_aplicacion[n_el_x*(n_el_y-1):] = cb
-
-    elif borde=='x_ini':
-        for i in range(0,n_el_total,n_el_x):
-            cb = sp.eye(m=1, n=n_el_total, k=i)
-            matriz_aplicacion[i] = cb
-
-    elif borde=='x_fin':
-        for i in range(n_el_x-1,n_el_total,n_el_x):
-            cb = sp.eye(m=1, n=n_el_total, k=i)
-            matriz_aplicacion[i] = cb
+    matriz_aplicacion = cb_Dir_mascara(matriz_aplicacion, mascara)
 
     # Fin función 'cb_Dir'
     return matriz_aplicacion
@@ -496,6 +538,13 @@ def vector_rhs(mat_ind=None,
     el vector de términos independientes. Luego suma a este vector la
     forzante en el nodo correspodiente.
 
+    'val_forz', 'pos_x' y 'pos_y' pueden ser arreglos de igual largo,
+    con una forzante por nodo. Todas se suman a la vez; si un nodo se
+    repite, sus valores se acumulan.
+
+    'vec_ini' puede ser una matriz de forma (nx*ny, k), con k escenarios
+    por columna. En ese caso 'val_forz' tiene forma (n_fuentes, k).
+
     La construcción de este vector se realiza al inicio de la solución
     iterativa.
     """
@@ -503,11 +552,11 @@ def vector_rhs(mat_ind=None,
         print("Error en función 'vector_rhs'")
         print("Matriz de términos independientes no especificada")
         sys.exit(1)
-    elif vec_ini[0]==None:
+    elif vec_ini is None:
         print("Error en función 'vector_rhs'")
         print("Vector inicial no especificado")
         sys.exit(1)
-    elif val_forz==None:
+    elif val_forz is None:
         print("Error en función 'cb_For'")
         print("Valor de la forzante no especificado")
         sys.exit(1)
@@ -521,11 +570,11 @@ def vector_rhs(mat_ind=None,
     vec_ind = mat_ind.dot(vec_ini)
 
     # Determinación de la posición de la forzante
-    pos_forzante = pos_x + n_el_x*np.int(pos_y)
+    pos_forzante = np.asarray(pos_x) + n_el_x*np.asarray(pos_y, dtype=int)
 
     # Suma del valor de la forzante al vector de términos independientes en
     # el nodo correspodiente
-    vec_ind[pos_forzante] += val_forz
+    np.add.at(vec_ind, pos_forzante, val_forz)
 
     # Fin función 'vector_rhs'
     return vec_ind
@@ -611,6 +660,92 @@ def pos_forz(pos_x='INI', pos_y='INI', n_el_x=1, n_el_y=1):
     return x_forz, y_forz
 #%%
 
+#%%
+def nodos_fuentes(fuentes=(), x_ini=0, y_ini=0, delta_x=1, delta_y=1,
+                  n_el_x=1, n_el_y=1):
+    """
+    Función que ubica las fuentes de 'fuentes' en los nodos de cálculo y
+    devuelve los arreglos (pos_x, pos_y, descarga), con un único valor por
+    nodo (las descargas de fuentes en un mismo nodo se suman).
+
+    Cada fuente es una tupla (x, y, descarga), puntual, que se asigna a
+    la celda que contiene al punto (x, y), o (x_ini, y_ini, x_fin, y_fin,
+    descarga), distribuida en partes iguales entre las celdas cuyo centro
+    está dentro del rectángulo (o, si no hay ninguna, en la celda que
+    contiene a su centro). Las coordenadas están en metros, en el mismo
+    sistema que 'X_INI' e 'Y_INI'. La descarga conserva sus unidades.
+    """
+
+    vec_desc = np.zeros(n_el_x * n_el_y)
+
+    # Coordenadas de los centros de celda
+    x_cen = x_ini + (np.arange(n_el_x) + 0.5) * delta_x
+    y_cen = y_ini + (np.arange(n_el_y) + 0.5) * delta_y
+
+    for fuente in fuentes:
+        *coords, descarga = fuente
+
+        if len(coords) == 2:
+            x_a, y_a = coords
+            x_b, y_b = coords
+        else:
+            x_a, y_a, x_b, y_b = coords
+            x_a, x_b = sorted((x_a, x_b))
+            y_a, y_b = sorted((y_a, y_b))
+
+        x_f = np.nonzero((x_cen >= x_a) & (x_cen <= x_b))[0]
+        y_f = np.nonzero((y_cen >= y_a) & (y_cen <= y_b))[0]
+
+        if len(x_f) == 0 or len(y_f) == 0:
+            # Celda que contiene al centro de la fuente
+            x_f = np.array([int(np.floor(((x_a+x_b)/2 - x_ini)/delta_x))])
+            y_f = np.array([int(np.floor(((y_a+y_b)/2 - y_ini)/delta_y))])
+
+        if x_f.min() < 0 or x_f.max() >= n_el_x or \
+           y_f.min() < 0 or y_f.max() >= n_el_y:
+            print("Error en función 'nodos_fuentes'")
+            print("Fuente {} fuera del dominio".format(fuente))
+            sys.exit(1)
+        else:
+            pass
+
+        nodos = (x_f[np.newaxis,:] + n_el_x*y_f[:,np.newaxis]).ravel()
+        vec_desc[nodos] += descarga / len(nodos)
+
+    nodos = np.nonzero(vec_desc)[0]
+
+    # Fin función 'nodos_fuentes'
+    return nodos % n_el_x, nodos // n_el_x, vec_desc[nodos]
+#%%
+
+#%%
+def nodos_sondas(sondas=(), x_ini=0, y_ini=0, delta_x=1, delta_y=1,
+                 n_el_x=1, n_el_y=1):
+    """
+    Función que ubica los puntos de control (x, y) de 'sondas' en las
+    celdas que los contienen y devuelve los arreglos (pos_x, pos_y), con
+    un nodo por sonda, en el orden de 'sondas'.
+    """
+
+    coords = np.array(sondas, dtype=float).reshape(-1, 2)
+
+    pos_x = np.floor((coords[:,0] - x_ini)/delta_x).astype(int)
+    pos_y = np.floor((coords[:,1] - y_ini)/delta_y).astype(int)
+
+    fuera = (pos_x < 0) | (pos_x >= n_el_x) | (pos_y < 0) | \
+        (pos_y >= n_el_y)
+    if np.any(fuera):
+        print("Error en función 'nodos_sondas'")
+        print("Sonda {} fuera del dominio".format(
+              tuple(coords[np.argmax(fuera)])))
+        sys.exit(1)
+    else:
+        pass
+
+    # Fin función 'nodos_sondas'
+    return pos_x, pos_y
+#%%
+
 #%%
 def auto_dt(delta_x=1, delta_y=1, incremento=0.5, t_final=1,
             lim_estabilidad=0.25, dif_long=1, dif_trans=1,
@@ -624,8 +759,10 @@ def auto_dt(delta_x=1, delta_y=1, incremento=0.5, t_final=1,
     a elección. Se sugieren pasos 'redondos' para facilitar la lectura de la
     solución.
     
-    Se efectúa una resta entre el paso temporal que cumple la condición de
-    estabilidad r_x o r_y =1/4 y un vector de los posibles tiempos entre
+    El paso seleccionado es el mayor múltiplo de 'incremento' que cumple
+    la condición de estabilidad r_x y r_y <= 'lim_estabilidad', limitado
+    por 't_final'. Se calcula directamente, sin armar el vector de
+    los posibles pasos temporales.
     
     Variables:
     'dif_long' es el coeficiente de difusividad longitudinal (alineado a 'x')
@@ -638,25 +775,35 @@ def auto_dt(delta_x=1, delta_y=1, incremento=0.5, t_final=1,
     # Conversión a segundos de t_final
     t_final_seg = t_final * 60
 
-    # Pasos temporales para comparar
-    delta_ts = np.arange(incremento,
-                         t_final_seg+incremento,
-                         incremento)
-
     # Delta_t de prueba para delta_x y delta_y
     prueba_delta_tx = delta_x**2 * lim_estabilidad / dif_long
     prueba_delta_ty = delta_y**2 * lim_estabilidad / dif_trans
 
-    # Resta de los delta_tx y delta_ty de prueba del arreglo con
-    # los posibles pasos temporales
-    delta_ts_x = delta_ts - prueba_delta_tx
-    delta_ts_y = delta_ts - prueba_delta_ty
-
-    # Selección del delta
-    delta_tx = delta_ts[np.where(delta_ts_x<=0)].max()
-    delta_ty = delta_ts[np.where(delta_ts_y<=0)].max()
+    prueba_delta_t = min(prueba_delta_tx, prueba_delta_ty)
+
+    # Cantidad de incrementos del mayor paso que no supera al de prueba,
+    # corregida por redondeo
+    n_inc = int(np.floor(prueba_delta_t / incremento))
+    if incremento + n_inc*incremento <= prueba_delta_t:
+        n_inc += 1
+    elif incremento + (n_inc-1)*incremento > prueba_delta_t:
+        n_inc -= 1
+
+    # Límite por el tiempo final, con la cantidad de elementos de
+    # 'np.arange(incremento, t_final_seg+incremento, incremento)'
+    n_inc_max = int(np.ceil((t_final_seg+incremento-incremento) /
+                            incremento))
+    n_inc = min(n_inc, n_inc_max)
+
+    if n_inc < 1:
+        print("Error en función 'auto_dt'")
+        print("El paso temporal estable es menor a 'incremento'")
+        sys.exit(1)
+    else:
+        pass
 
-    delta_t = np.minimum(delta_tx, delta_ty)
+    # Mismo redondeo que los elementos de 'np.arange(incremento, ...)'
+    delta_t = incremento + (n_inc-1)*incremento
 
     # Fin de función 'auto_dt'
     return delta_t
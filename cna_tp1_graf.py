@@ -12,17 +12,109 @@ Trabajo Práctico n.° 1
 archivo: 'cna_tp1_graf.py'
 
 Programa auxiliar que grafica cortes de la solución a lo largo del eje
-'x'. Se puede elegir la coordenada 'y' para el corte en el archivo input.
+'x', en los nodos 'y' de 'Y_IMG', y, opcionalmente, cortes transversales
+a lo largo del eje 'y', en los nodos 'x' de 'X_IMG'. Ambas variables
+admiten varios nodos separados por espacios.
+
+Cada solución del almacén se lee una única vez y se grafican a partir de
+ella todos los cortes pedidos. La figura de cada corte se arma una única
+vez y en cada tiempo se actualizan sólo la curva y el título.
 """
 
 import cna_tp1_in as cna_in
-import cna_tp1_func as cna_func
+import cna_tp1_main as cna_main
+import cna_tp1_almacen as cna_almacen
+import cna_tp1_graf_2D as cna_graf_2D
 
 import numpy as np
 import matplotlib.pyplot as plt
 import os
 import sys
 
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_corte(datos, eje, nodo):
+    """
+    Función que arma la figura del corte de la solución en el nodo 'nodo'
+    de la coordenada 'eje' ('y': corte a lo largo de 'x'; 'x': corte
+    transversal, a lo largo de 'y'), con los datos de
+    'cna_tp1_graf_2D.datos_grafico' y las coordenadas de los centros de
+    celda 'xs' e 'ys', y devuelve la función 'graficar(t, solucion)' que
+    grafica a archivo el corte de la solución [kg/m^3], de forma (ny, nx),
+    del tiempo t [s].
+    """
+
+    dx, dy, dt = datos['dx'], datos['dy'], datos['dt']
+    metodo, conc_ini = datos['metodo'], datos['conc_ini']
+
+    if eje=='y':
+        pos = nodo*dy         # Posición del corte [m]
+        coords = datos['xs']  # Variable independiente [m]
+        nom_x = "L$_x$ [m]"
+
+        def extraer(solucion):
+            return solucion[nodo]
+
+    else: # eje=='x'
+        pos = nodo*dx
+        coords = datos['ys']
+        nom_x = "L$_y$ [m]"
+
+        def extraer(solucion):
+            return solucion[:,nodo]
+
+    # Directorio de imágenes
+    dir_img = os.path.join(datos['dir_sol'],
+                           "imagenes_1D_{}{:.1f}m".format(eje,pos))
+
+    os.makedirs(dir_img, exist_ok=True)
+
+    # ADIMENSIONAL
+    # Texto para el gráfico
+    nom_y = "C/C$_{forz}$"
+    c_inf = 0
+    c_sup = 5
+    texto = "C$_{forz}$: " + "{:.3e} kg/m$^3$".\
+            format(conc_ini) +\
+            "\n$\Delta$x: {:04.1f} m".format(dx) +\
+            "\n$\Delta$y: {:04.1f} m".format(dy) +\
+            "\n$\Delta$t: {:.1f} s".format(dt)
+    x_texto = (coords[0]+coords[-1])*0.875
+    y_texto = (c_inf+c_sup)*0.5
+    etiqueta="Concentración"
+
+    # Figura del corte, común a todos los tiempos
+    fig = plt.figure()
+    ax = fig.gca()
+    ax.set_xlabel(nom_x)
+    ax.set_ylabel(nom_y)
+    ax.set_ylim(c_inf,c_sup)
+    ax.text(x_texto, y_texto, texto,
+            va="center", ha="center")
+    curva, = ax.plot(coords, np.zeros(len(coords)), "r", label=etiqueta)
+    ax.legend(loc="upper right", framealpha=1)
+
+    def graficar(t, solucion):
+        arch_img = "sol_{}_{}{:03.1f}m.png".\
+                   format(cna_graf_2D.etiqueta_tiempo(t),eje,pos)
+
+        titulo = "Método {}".format(metodo) + \
+                 " (t = {:5.1f} min, {} = {:03.1f}0 m)".\
+                 format(t/60, eje, pos)
+
+        curva.set_ydata(extraer(solucion) / conc_ini)
+        ax.set_title(titulo)
+
+        fig.savefig(os.path.join(os.getcwd(),dir_img,arch_img))
+
+    # Fin función 'armar_corte'
+    return graficar
+#%%
+
+#**** PROGRAMA ****#
+
 def main(archivo_input):
     #if (len(sys.argv) != 2):
     #    print("Error: número incorrecto de argumentos")
@@ -33,233 +125,68 @@ def main(archivo_input):
 
     #**** DATOS DEL PROBLEMA ****#
 
-    # Lectura de variables del archivo input
+    # Lectura de variables del archivo input y parámetros del programa
+    # principal
     vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
 
-    # Geometría [metros]
-    x_ini = vs['X_INI']
-    x_fin = vs['X_FIN']
-    y_ini = vs['Y_INI']
-    y_fin = vs['Y_FIN']
-
-    # Parámetros de modelado
-    vel = vs['VEL'] # [m/s]
-    h = vs['H']     # [m]
-    f = vs['F']     # [adim]
-    e_l = vs['E_L'] # [adim]
-    e_t = vs['E_T'] # [adim]
-
-    D_l = e_l * h * vel * f # difusividad longitudinal [m^2/s]
-    D_t = e_t * h * vel * f # difusividad transversal [m^2/s]
-
-    # Parámetros de la descarga de contaminante
-    desc_cont = vs['DESC_CONT'] # Descarga continua [kg/día]
-
-    # Tiempo total a simular [minutos]
-    t_total = vs['T_TOTAL']
-
-    #**** DISCRETIZACIÓN DEL PROBLEMA ****#
-
-    dx = vs['DX']
-    dy = vs['DY']
-
-    # Selección de paso temporal
-    auto_dt = vs['AUTO_DT']
-    
-    if auto_dt=="NO":
-        dt = vs['DT']
-
-    else: # auto_dt=="SI"
-        dt = cna_func.auto_dt(delta_x=dx, delta_y=dy,
-                              t_final=t_total,
-                              dif_long=D_l,dif_trans=D_t)
-
-    Lx = x_fin - x_ini
-    Ly = y_fin - y_ini
-
-    print("\nDatos de discretización")
-    print("-------------------")
-    print("Longitud en 'x' del dominio: {:.1f} m".format(Lx))
-    print("Longitud en 'y' del dominio: {:.1f} m".format(Ly))
-    print("")
-    print("Intervalo 'dt' de {:.1f} s".format(dt))
-    print("Discretización en 'x' de {:.1f} m".format(dx))
-    print("Discretización en 'y' de {:.1f} m".format(dy))
-    print("")
-
-    ## Los nodos de cálculo se ubican en el las esquinas de las celdas
-    #nx = np.int(Lx/dx + 1)
-    #ny = np.int(Ly/dy + 1)
-    
-    # Los nodos de cálculo se ubican en el centro de las celdas
-    nx = np.int(Lx/dx)
-    ny = np.int(Ly/dy)
-    nt = np.int(nx*ny)
+    datos = cna_graf_2D.datos_grafico(vs, p)
 
-    xs = np.arange(x_ini+dx/2, x_fin,dx)
+    dx, dy, nx, ny = p['dx'], p['dy'], p['nx'], p['ny']
 
-    print("Cantidad de nodos totales en 'x': {:d}".format(nx))
-    print("Cantidad de nodos totales en 'y': {:d}".format(ny))
-    print("")
+    # Los nodos de cálculo se ubican en el centro de las celdas
+    datos['xs'] = np.arange(vs['X_INI']+dx/2, vs['X_FIN'], dx)[:nx]
+    datos['ys'] = np.arange(vs['Y_INI']+dy/2, vs['Y_FIN'], dy)[:ny]
 
-    # Volumen de celda utilizado para calcular concentración por m^3
-    v_cel = dx*dy*h # [m^3]
+    print("\nCorrida con theta = {:.1f}".format(p['theta']))
+    print("\nCorrida con upwinding: {}".format(p['upw']))
 
-    #Conversión de unidades para descarga y decaimiento de contaminante
-    cu = 1 / (3600 * 24) # día / (3600 seg/hora * 24 hora/día)
+    #**** IMPRESIÓN ITERATIVA A GRÁFICO ****#
+    # Dimensión de gráfico: 1D o 2D
+    if datos['dim_img']!=1:
+        print("Impresión en gráfico implementada sólo en 1D")
+        sys.exit(1)
+    else:
+        pass
 
-    # Aporte de contaminante
-    cu_desc_cont = desc_cont * cu # [kg/seg]
+    # Nodos 'y' y 'x' de los cortes
+    cortes = [('y', int(nodo)) for nodo in vs['Y_IMG']] +\
+             [('x', int(nodo)) for nodo in vs['X_IMG']]
 
-    # Forzante
-    vforz = cu_desc_cont * dt
+    for eje, nodo in cortes:
+        n_nodos = ny if eje=='y' else nx
+        if not 0 <= nodo < n_nodos:
+            print("Nodo '{}' {:d} fuera del dominio: ".format(eje, nodo) +
+                  "debe estar entre 0 y {:d}".format(n_nodos-1))
+            sys.exit(1)
+        else:
+            pass
 
-    ## Datos para estabilidad
-    #rx = D_l * dt / (dx**2)
-    #ry = D_t * dt / (dy**2)
+    print("\nEjecutando bucle de salida a gráfico para " +
+          ", ".join("{} = {:.1f} m".format(eje, nodo*(dy if eje=='y'
+                                                       else dx))
+                    for eje, nodo in cortes) + ":")
 
-    # Selección de método
-    #theta = 1.0 --> Fuertemente implícito
-    #theta = 0.5 --> Crank-Nicolson
-    #theta = 0.0 --> Explícito centrado
-    theta = vs['THETA']
+    graficadores = [armar_corte(datos, eje, nodo) for eje, nodo in cortes]
 
-    if theta==0.0:
-        metodo = "Explícito Centrado"
-    elif theta==0.5:
-        metodo = "Crank-Nicolson"
-    elif theta==1.0:
-        metodo = "Fuertemente Implícito"
-    else:
-        pass
-    
-    print("\nCorrida con theta = {:.1f}".format(theta))
+    # Soluciones en los tiempos de escritura, leídas del almacén binario
+    # del programa principal (ver 'cna_tp1_almacen.py')
+    tiempos, soluciones, _ = cna_almacen.leer_almacen(p['dir_sol'])
 
-    # Selección de upwinding
-    upw = vs['UPWINDING']
-    
-    print("\nCorrida con upwinding: {}".format(upw))
+    # Bucle de salida a gráfico: cada solución se lee una única vez para
+    # todos los cortes
+    for t, solucion in zip(tiempos, soluciones):
+        solucion = np.array(solucion)
+        for graficar in graficadores:
+            graficar(t, solucion)
 
-    #**** IMPRESIÓN ITERATIVA A GRÁFICO ****#
-    # Dimensión de gráfico: 1D o 2D
-    dim_img = np.int(vs['DIM_IMG'])
-
-    if dim_img!=1:
-        print("Impresión en gráfico implementada sólo en 1D")
-        sys.exit(1)
-    else:
-        pass
+    plt.close('all')
 
-    # Nodo 'y' a lo largo del que se grafica
-    y_img = np.int(vs['Y_IMG'])
-
-    print("\nEjecutando bucle de salida a gráfico para y = {:.1f} m:".
-          format(y_img*dy))
-    
-    # Intervalo en el que se imprime gráfico
-    t_sol = vs['T_SOL'] # [min]
-
-
-    # Conversión del tiempo final a segundos
-    t_final = t_total*60
-
-    # Cantidad de pasos
-    n_pasos = np.arange(dt, t_final+dt,dt)
-
-    # Bucle de solución
-    for t in n_pasos:
-
-        # Directorio con las soluciones guardadas
-        dir_sol = "cna_tp1_sol_dx{}_dy{}_dt{}_theta{}".\
-            format(dx,dy,dt,theta)
-
-        # Directorio de imágenes
-        dir_img = os.path.join(dir_sol,"imagenes_{}D_y{:.1f}m".format(dim_img,y_img*dy))
-
-        # Impresión según intervalo de tiempo     
-        if (t/60)%t_sol==0:
-            arch_sol = "sol_{:.1f}".format(t)
-            arch_img = "sol_{:03d}min_y{:03.1f}m.png".format(np.int(t/60),y_img*dy)
-            ruta_sol = os.path.join(os.getcwd(),dir_sol,arch_sol)
-            ruta_img = os.path.join(os.getcwd(),dir_img,arch_img)
-
-            try:
-                os.mkdir(dir_img)
-            except OSError as error:
-                pass
-
-            # Datos de solución para el gráfico
-            solucion = np.loadtxt(ruta_sol)
-
-            ## DIMENSIONAL
-            ## Texto para el gráfico
-            #titulo = "Método {}".format(metodo) + \
-                     #" (t = {:5.1f} min, y = {:03.1f}0 m)".\
-                     #format(t/60, y_img*dy)
-            #nom_x = "L$_x$ [m]"
-            #nom_y = "C [kg/m$^3$]"
-            #c_inf = 0
-            #orden = np.abs(np.int(np.floor(np.log10(vforz/v_cel))))
-            #c_sup = np.around(vforz*1e1/v_cel,decimals=orden)
-            #texto = "{}".format(metodo) +\
-                    #"\n$\Delta$x: {:04.1f} m".format(dx) +\
-                    #"\n$\Delta$y: {:04.1f} m".format(dy) +\
-                    #"\n$\Delta$t: {:.1f} s".format(dt)
-            #x_texto = (x_ini+x_fin)*0.875
-            #y_texto = (c_inf+c_sup)*0.5
-            #etiqueta="Concentración"
-
-            ## Impresión del gráfico
-            #plt.figure()
-            #plt.title(titulo)
-            #plt.xlabel(nom_x)
-            #plt.ylabel(nom_y)
-            #plt.ylim(c_inf,c_sup)
-            #plt.text(x_texto, y_texto, texto, 
-                     #va="center", ha="center")
-            #plt.plot(xs, solucion[y_img], "r", label=etiqueta)
-            #plt.legend(loc="upper right", framealpha=1)
-            #plt.savefig(ruta_img)
-            #plt.clf()
-            #plt.close()
-
-            # ADIMENSIONAL
-            # Texto para el gráfico
-            titulo = "Método {}".format(metodo) + \
-                     " (t = {:5.1f} min, y = {:03.1f}0 m)".\
-                     format(t/60, y_img*dy)
-            nom_x = "L$_x$ [m]"
-            nom_y = "C/C$_{forz}$"
-            c_inf = 0
-            #orden = np.abs(np.int(np.floor(np.log10(vforz/v_cel))))
-            #c_sup = np.around(vforz*1e1/v_cel,decimals=orden)
-            c_sup = 5
-            texto = "C$_{forz}$: " + "{:.3e} kg/m$^3$".\
-                    format(vforz/v_cel) +\
-                    "\n$\Delta$x: {:04.1f} m".format(dx) +\
-                    "\n$\Delta$y: {:04.1f} m".format(dy) +\
-                    "\n$\Delta$t: {:.1f} s".format(dt)
-            x_texto = (x_ini+x_fin)*0.875
-            y_texto = (c_inf+c_sup)*0.5
-            etiqueta="Concentración"
-
-            # Impresión del gráfico
-            sol_adim = solucion[y_img] / (vforz/v_cel)
-            plt.figure()
-            plt.title(titulo)
-            plt.xlabel(nom_x)
-            plt.ylabel(nom_y)
-            plt.ylim(c_inf,c_sup)
-            plt.text(x_texto, y_texto, texto, 
-                     va="center", ha="center")
-            plt.plot(xs, sol_adim, "r", label=etiqueta)
-            plt.legend(loc="upper right", framealpha=1)
-            plt.savefig(ruta_img)
-            plt.clf()
-            plt.close()
+    print("\n{:d} cortes graficados en {:d} tiempos".
+          format(len(cortes), len(tiempos)))
 
     #**** FIN MAIN ****#
-    
+
 if __name__ == "__main__":
     if (len(sys.argv) != 2):
         print("Error: número incorrecto de argumentos")
@@ -267,5 +194,5 @@ if __name__ == "__main__":
         sys.exit(1)
     else:
         main(sys.argv[1])
-    
+
 #**** FIN PROGRAMA ****#
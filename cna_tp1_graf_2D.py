@@ -9,123 +9,52 @@ Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
 
 Trabajo Práctico n.° 1
 
-archivo: 'cna_tp1_graf.py'
+archivo: 'cna_tp1_graf_2D.py'
 
-Programa auxiliar que grafica cortes de la solución a lo largo del eje
-'x'. Se puede elegir la coordenada 'y' para el corte en el archivo input.
+Programa auxiliar que grafica la solución: cortes a lo largo del eje 'x'
+(DIM_IMG = 1), en la coordenada 'y' elegida en el archivo input, o mapas
+de contorno de la vista superior del dominio (DIM_IMG = 2).
+
+Como programa, grafica las soluciones del almacén del programa principal
+(ver 'cna_tp1_almacen.py'), repartidas entre procesos: cada uno arma la
+figura una única vez y actualiza sólo los datos en cada cuadro. Con
+'armar_observador' los gráficos se producen durante la simulación, a
+partir del campo en memoria, en un proceso aparte (ver 'GRAF_EN_LINEA'
+en el archivo de entrada).
+
+Modo de uso:
+    cna_tp1_graf_2D.py <archivo_input> [<n_procesos>]
+
+Por defecto, un proceso por procesador.
 """
 
 import cna_tp1_in as cna_in
-import cna_tp1_func as cna_func
+import cna_tp1_main as cna_main
+import cna_tp1_almacen as cna_almacen
 
+import multiprocessing
 import numpy as np
 import matplotlib.pyplot as plt
 import os
 import sys
+import time
 
-def main(archivo_input):
-    #if (len(sys.argv) != 2):
-    #    print("Error: número incorrecto de argumentos")
-    #    print("Modo de uso: " + __file__ + " <archivo_input>")
-    #    sys.exit(1)
+#**** FUNCIONES DEL PROGRAMA ****#
 
-    print("Ejecutando programa " + __file__)
-
-    #**** DATOS DEL PROBLEMA ****#
 
-    # Lectura de variables del archivo input
-    vs = cna_in.datos_input(archivo_input)
-
-    # Geometría [metros]
-    x_ini = vs['X_INI']
-    x_fin = vs['X_FIN']
-    y_ini = vs['Y_INI']
-    y_fin = vs['Y_FIN']
-
-    # Parámetros de modelado
-    vel = vs['VEL'] # [m/s]
-    h = vs['H']     # [m]
-    f = vs['F']     # [adim]
-    e_l = vs['E_L'] # [adim]
-    e_t = vs['E_T'] # [adim]
-
-    D_l = e_l * h * vel * f # difusividad longitudinal [m^2/s]
-    D_t = e_t * h * vel * f # difusividad transversal [m^2/s]
-    print(type(D_l))
-    print(type(D_t))
-
-    # Parámetros de la descarga de contaminante
-    desc_cont = vs['DESC_CONT'] # Descarga continua [kg/día]
-
-    # Tiempo total a simular [minutos]
-    t_total = vs['T_TOTAL']
-
-    #**** DISCRETIZACIÓN DEL PROBLEMA ****#
-
-    dx = vs['DX']
-    dy = vs['DY']
-
-    # Selección de paso temporal
-    auto_dt = vs['AUTO_DT']
-    
-    if auto_dt=="NO":
-        dt = vs['DT']
-
-    else: # auto_dt=="SI"
-        dt = cna_func.auto_dt(delta_x=dx, delta_y=dy,
-                              t_final=t_total,
-                              dif_long=D_l,dif_trans=D_t)
-
-    Lx = x_fin - x_ini
-    Ly = y_fin - y_ini
-
-    print("\nDatos de discretización")
-    print("-------------------")
-    print("Longitud en 'x' del dominio: {:.1f} m".format(Lx))
-    print("Longitud en 'y' del dominio: {:.1f} m".format(Ly))
-    print("")
-    print("Intervalo 'dt' de {:.1f} s".format(dt))
-    print("Discretización en 'x' de {:.1f} m".format(dx))
-    print("Discretización en 'y' de {:.1f} m".format(dy))
-    print("")
-
-    ## Los nodos de cálculo se ubican en el las esquinas de las celdas
-    #nx = np.int(Lx/dx + 1)
-    #ny = np.int(Ly/dy + 1)
-    
-    # Los nodos de cálculo se ubican en el centro de las celdas
-    nx = np.int(Lx/dx)
-    ny = np.int(Ly/dy)
-    nt = np.int(nx*ny)
-
-    xs = np.arange(x_ini+dx/2, x_fin,dx)
-    ys = np.arange(y_ini+dy/2, y_fin,dy)
-
-    print("Cantidad de nodos totales en 'x': {:d}".format(nx))
-    print("Cantidad de nodos totales en 'y': {:d}".format(ny))
-    print("")
-
-    # Volumen de celda utilizado para calcular concentración por m^3
-    v_cel = dx*dy*h # [m^3]
-
-    #Conversión de unidades para descarga y decaimiento de contaminante
-    cu = 1 / (3600 * 24) # día / (3600 seg/hora * 24 hora/día)
-
-    # Aporte de contaminante
-    cu_desc_cont = desc_cont * cu # [kg/seg]
-
-    # Forzante
-    vforz = cu_desc_cont * dt
-
-    ## Datos para estabilidad
-    #rx = D_l * dt / (dx**2)
-    #ry = D_t * dt / (dy**2)
+#%%
+def datos_grafico(vs, p):
+    """
+    Función que devuelve el diccionario de datos de los gráficos a partir
+    de las variables del archivo de entrada 'vs' y los parámetros 'p' del
+    programa principal (ver 'cna_tp1_main.parametros').
+    """
 
     # Selección de método
     #theta = 1.0 --> Fuertemente implícito
     #theta = 0.5 --> Crank-Nicolson
     #theta = 0.0 --> Explícito centrado
-    theta = vs['THETA']
+    theta = p['theta']
 
     if theta==0.0:
         metodo = "Explícito Centrado"
@@ -134,169 +63,357 @@ def main(archivo_input):
     elif theta==1.0:
         metodo = "Fuertemente Implícito"
     else:
-        pass
-    
-    print("\nCorrida con theta = {:.1f}".format(theta))
+        metodo = "Theta = {:.2f}".format(theta)
+
+    datos = {clave: p[clave] for clave in ('dx', 'dy', 'dt', 'nx', 'ny',
+                                           'dir_sol')}
+    datos['metodo'] = metodo
+
+    # Concentración de la forzante en un intervalo 'dt'
+    datos['conc_ini'] = p['cu_desc_cont']*p['dt']/p['v_cel']
+
+    # Dimensión de gráfico: 1D o 2D, y nodo 'y' del corte 1D (el primero
+    # de 'Y_IMG'; para varios cortes, ver 'cna_tp1_graf.py')
+    datos['dim_img'] = int(vs['DIM_IMG'])
+    datos['y_img'] = int(vs['Y_IMG'][0])
+
+    # Fin función 'datos_grafico'
+    return datos
+#%%
+
+#%%
+def etiqueta_tiempo(t):
+    """
+    Función que devuelve la etiqueta del tiempo t [s] para los nombres de
+    las imágenes: los minutos enteros ('005min'), o con un decimal si t
+    no es un número entero de minutos ('011.5min'), de modo que un corte
+    anticipado del bucle no reemplace la imagen del tiempo de escritura
+    anterior, o 'estacionario' para la solución estacionaria (t = inf).
+    """
+
+    if not np.isfinite(t):
+        etiqueta = "estacionario"
+    elif (t/60)%1==0:
+        etiqueta = "{:03d}min".format(int(t/60))
+    else:
+        etiqueta = "{:05.1f}min".format(t/60)
+
+    # Fin función 'etiqueta_tiempo'
+    return etiqueta
+#%%
+
+#%%
+def armar_graficador(datos):
+    """
+    Función que arma una única vez la figura, los ejes, el texto y, en
+    2D, la barra de colores, con los datos de 'datos_grafico', y devuelve
+    la función 'graficar(t, solucion)' que grafica a archivo la solución
+    'solucion' [kg/m^3], de forma (ny, nx), del tiempo t [s]. Cada cuadro
+    actualiza sólo la curva o el mapa de contornos y el título.
+    """
+
+    dx, dy, dt = datos['dx'], datos['dy'], datos['dt']
+    nx, ny = datos['nx'], datos['ny']
+    dim_img, y_img = datos['dim_img'], datos['y_img']
+    dir_sol, metodo = datos['dir_sol'], datos['metodo']
+
+    # Directorio de imágenes
+    if dim_img == 1:
+        dir_img = os.path.join(dir_sol,"imagenes_{}D_y{:.1f}m".
+                               format(dim_img,y_img*dy))
+    else:
+        dir_img = os.path.join(dir_sol,"imagenes_{}D".format(dim_img))
+
+    os.makedirs(dir_img, exist_ok=True)
+
+    # ADIMENSIONAL
+    # ------------
+    conc_ini = datos['conc_ini'] # Concentración inicial de la forzante
+
+    # Dimensiones de los gráficos
+    c_inf = 0 # Nivel inferior de concentración relativa
+    c_sup = 3 # Nivel superior de concentración relativa
 
-    # Selección de upwinding
-    upw = vs['UPWINDING']
-    
-    print("\nCorrida con upwinding: {}".format(upw))
+    xs_adim = np.linspace(0,1,nx)
 
-    #**** IMPRESIÓN ITERATIVA A GRÁFICO ****#
-    # Dimensión de gráfico: 1D o 2D
-    dim_img = np.int(vs['DIM_IMG'])
+    if dim_img==2:
+        y_sup = 0.25 # Un cuarto del dominio en 'y'
+        lim_plot_y = int(ny*y_sup)
+        ys_adim = np.linspace(0,y_sup,lim_plot_y)
+
+    # Texto para gráficos
+    texto = "C$_{forz}$: " + "{:.3e} kg/m$^3$".\
+            format(conc_ini) +\
+            "\n$\Delta$x: {:04.1f} m".format(dx) +\
+            "\n$\Delta$y: {:04.1f} m".format(dy) +\
+            "\n$\Delta$t: {:.1f} s".format(dt)
+
+    x_texto = (xs_adim[-1] - xs_adim[0])*0.875
+    etiqueta="C/C$_{forz}$"
+    nom_x = "L/L$_x$"
 
     if dim_img==1:
-        # Nodo 'y' a lo largo del que se grafica
-        y_img = np.int(vs['Y_IMG'])
+        y_texto = (c_sup-c_inf)*0.5
+        nom_y = "C/C$_{forz}$"
 
-        print("\nEjecutando bucle de salida a gráfico 1D, y = {:.1f} m:".
-              format(y_img*dy))
+    else: #dim_img==2
+        y_texto = (ys_adim[-1] - ys_adim[0])*0.75
+        nom_y = "L/L$_y$"
+
+    # Figura del gráfico adimensional, común a todos los cuadros
+    fig = plt.figure(figsize=(12,6))
+    ax = fig.gca()
+    ax.set_xlabel(nom_x)
+    ax.set_ylabel(nom_y)
+
+    if dim_img==1:
+        ax.set_ylim(c_inf,c_sup)
+        ax.text(x_texto, y_texto, texto,
+                va="center", ha="center")
+        curva, = ax.plot(xs_adim, np.zeros(nx), "r", label=etiqueta)
+        ax.legend(loc="upper right", framealpha=1)
 
     else: #dim_img==2
-        print("\nEjecutando bucle de salida a gráfico 2D")
-    
-    # Intervalo en el que se imprime gráfico
-    t_sol = vs['T_SOL'] # [min]
+        # Ejes
+        ax.set_xlim(xs_adim[0],xs_adim[-1])
+        ax.set_ylim(ys_adim[0],ys_adim[-1])
+
+        # Texto
+        ax.text(x_texto, y_texto, texto,
+                bbox=dict(fill=True,facecolor="white",alpha=1.0),
+                va="center", ha="center")
+
+        # Mapa de contornos, con niveles fijos: la barra de colores se
+        # arma con el mapa de un campo nulo, que se reemplaza en cada
+        # cuadro
+        paso_plot = 0.25
+        niv_contourf = np.arange(c_inf,
+                                 c_sup+paso_plot,
+                                 paso_plot)
+
+        niv_colorbar = np.arange(c_inf,
+                                 c_sup+paso_plot,
+                                 2*paso_plot)
+
+        contornos = {'mapa': ax.contourf(xs_adim, ys_adim,
+                                         np.zeros((lim_plot_y, nx)),
+                                         cmap="coolwarm",
+                                         levels=niv_contourf)}
+
+        cbar = fig.colorbar(contornos['mapa'], ticks=niv_colorbar)
+        cbar.ax.set_ylabel(etiqueta)
+
+    def graficar(t, solucion):
+        if dim_img==1:
+            arch_img = "sol_{}_y{:03.1f}m.png".\
+                       format(etiqueta_tiempo(t),y_img*dy)
+            titulo = "Método {}\n".format(metodo) + \
+                     "t = {:5.1f} min, y = {:03.1f}0 m".\
+                     format(t/60, y_img*dy)
+
+            curva.set_ydata(solucion[y_img]/(conc_ini))
+
+        else: #dim_img==2
+            arch_img = "sol_{}_map.png".format(etiqueta_tiempo(t))
+            titulo = "Método {}\n".format(metodo) + \
+                     "t = {:5.1f} min".format(t/60)
+
+            # Solución
+            sol_adim = solucion[:lim_plot_y] / (conc_ini)
+
+            contornos['mapa'].remove()
+            contornos['mapa'] = ax.contourf(xs_adim, ys_adim, sol_adim,
+                                            cmap="coolwarm",
+                                            levels=niv_contourf)
+
+        ax.set_title(titulo)
+
+        # Salida a archivo
+        fig.savefig(os.path.join(os.getcwd(),dir_img,arch_img))
+
+    # Fin función 'armar_graficador'
+    return graficar
+#%%
+
+#%%
+# Estado de cada proceso de la salida a gráfico en paralelo: la función
+# de 'armar_graficador' y el almacén abierto (ver 'iniciar_trabajador')
+_estado_trabajador = {}
+
+def iniciar_trabajador(datos):
+    """
+    Función de inicio de cada proceso de 'graficar_almacen': arma la
+    figura y abre el almacén de soluciones, una única vez por proceso.
+    """
+
+    # Salida sólo a archivo
+    plt.switch_backend('Agg')
+
+    _estado_trabajador['graficar'] = armar_graficador(datos)
+    _estado_trabajador['tiempos'], _estado_trabajador['soluciones'], _ =\
+        cna_almacen.leer_almacen(datos['dir_sol'])
+
+    # Fin función 'iniciar_trabajador'
+#%%
+
+#%%
+def graficar_cuadro(k):
+    """
+    Función que grafica, en un proceso de 'graficar_almacen', la solución
+    k del almacén.
+    """
+
+    _estado_trabajador['graficar'](_estado_trabajador['tiempos'][k],
+                                   _estado_trabajador['soluciones'][k])
+
+    # Fin función 'graficar_cuadro'
+#%%
+
+#%%
+def graficar_almacen(datos, n_procesos=None):
+    """
+    Función que grafica todas las soluciones del almacén del directorio
+    'dir_sol' de 'datos', repartidas entre 'n_procesos' procesos (por
+    defecto, la cantidad de procesadores). Cada proceso arma su figura
+    una única vez y lee las soluciones que le tocan directamente del
+    almacén, de modo que no se copian campos entre procesos. Devuelve la
+    cantidad de cuadros graficados.
+    """
+
+    tiempos, soluciones, _ = cna_almacen.leer_almacen(datos['dir_sol'])
+    n_cuadros = len(tiempos)
+
+    if n_procesos is None:
+        n_procesos = os.cpu_count() or 1
+
+    n_procesos = max(1, min(int(n_procesos), n_cuadros))
+
+    if n_procesos==1:
+        graficar = armar_graficador(datos)
+        for t, solucion in zip(tiempos, soluciones):
+            graficar(t, solucion)
+        plt.close('all')
+
+    else:
+        # Bloques de cuadros consecutivos, varios por proceso para
+        # repartir la carga
+        bloque = max(1, n_cuadros // (4*n_procesos))
+
+        with multiprocessing.Pool(n_procesos,
+                                  initializer=iniciar_trabajador,
+                                  initargs=(datos,)) as pool:
+            for _ in pool.imap_unordered(graficar_cuadro,
+                                         range(n_cuadros), bloque):
+                pass
 
+    # Fin función 'graficar_almacen'
+    return n_cuadros
+#%%
 
-    # Conversión del tiempo final a segundos
-    t_final = t_total*60
+#%%
+def trabajador_graficos(cola, datos):
+    """
+    Función del proceso de gráficos: grafica los pares (t, solucion) de
+    'cola' hasta recibir None.
+    """
 
-    # Cantidad de pasos
-    n_pasos = np.arange(dt, t_final+dt,dt)
+    # Salida sólo a archivo
+    plt.switch_backend('Agg')
 
-    # Bucle de solución
-    for t in n_pasos:
+    graficar = armar_graficador(datos)
 
-        # Directorio con las soluciones guardadas
-        dir_sol = "cna_tp1_sol_dx{}_dy{}_dt{}_theta{}".\
-            format(dx,dy,dt,theta)
+    while True:
+        elemento = cola.get()
+        if elemento is None:
+            break
+        graficar(*elemento)
 
-        # Impresión según intervalo de tiempo     
-        if (t/60)%t_sol==0:
-            arch_sol = "sol_{:.1f}".format(t)
+    plt.close('all')
 
-            # Directorio de imágenes y archivo imagen
-            if dim_img == 1:
-                dir_img = os.path.join(dir_sol,"imagenes_{}D_y{:.1f}m".format(dim_img,y_img*dy))
-                arch_img = "sol_{:03d}min_y{:03.1f}m.png".format(np.int(t/60),y_img*dy)
+    # Fin función 'trabajador_graficos'
+#%%
 
-            else:
-                dir_img = os.path.join(dir_sol,"imagenes_{}D".format(dim_img))
-                arch_img = "sol_{:03d}min_map.png".format(np.int(t/60))
+#%%
+def armar_observador(datos, capacidad=4):
+    """
+    Función que inicia el proceso de gráficos y devuelve las funciones
+    'observador(t, campo)', que envía el campo [kg/m^3] del tiempo t [s]
+    para graficarlo, y 'cerrar()', que espera a que se grafiquen todos
+    los campos enviados y termina el proceso.
 
-            ruta_sol = os.path.join(os.getcwd(),dir_sol,arch_sol)
-            ruta_img = os.path.join(os.getcwd(),dir_img,arch_img)
+    Se envían a lo sumo 'capacidad' campos sin graficar: si el proceso
+    de gráficos no da abasto, 'observador' espera.
+    """
 
-            try:
-                os.mkdir(dir_img)
-            except OSError as error:
-                pass
+    cola = multiprocessing.Queue(maxsize=max(int(capacidad), 1))
+    proceso = multiprocessing.Process(target=trabajador_graficos,
+                                      args=(cola, datos), daemon=True)
+    proceso.start()
+
+    # El envío se efectúa en un hilo de la cola: se envía una copia
+    def observador(t, campo):
+        cola.put((t, np.array(campo, copy=True)))
+
+    def cerrar():
+        cola.put(None)
+        proceso.join()
+        if proceso.exitcode != 0:
+            print("Advertencia: el proceso de gráficos terminó con " +
+                  "código {}".format(proceso.exitcode))
+
+    # Fin función 'armar_observador'
+    return observador, cerrar
+#%%
+
+#**** PROGRAMA ****#
+
+def main(archivo_input, n_procesos=None):
+    #if (len(sys.argv) != 2):
+    #    print("Error: número incorrecto de argumentos")
+    #    print("Modo de uso: " + __file__ + " <archivo_input>")
+    #    sys.exit(1)
+
+    print("Ejecutando programa " + __file__)
+
+    #**** DATOS DEL PROBLEMA ****#
+
+    # Lectura de variables del archivo input y parámetros del programa
+    # principal
+    vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
+
+    datos = datos_grafico(vs, p)
+
+    print("\nCorrida con theta = {:.1f}".format(p['theta']))
+    print("\nCorrida con upwinding: {}".format(p['upw']))
+
+    #**** IMPRESIÓN A GRÁFICO ****#
+    if datos['dim_img']==1:
+        print("\nEjecutando bucle de salida a gráfico 1D, y = {:.1f} m:".
+              format(datos['y_img']*datos['dy']))
+
+    else: #dim_img==2
+        print("\nEjecutando bucle de salida a gráfico 2D")
+
+    # Soluciones en los tiempos de escritura, leídas del almacén binario
+    # del programa principal (ver 'cna_tp1_almacen.py'), graficadas en
+    # paralelo
+    t_ini = time.perf_counter()
+    n_cuadros = graficar_almacen(datos, n_procesos)
 
-            # Datos de solución para el gráfico
-            solucion = np.loadtxt(ruta_sol)
-
-            # ADIMENSIONAL
-            # ------------
-            conc_ini = vforz/v_cel # Concentración inicial de la forzante
-
-            # Dimensiones de los gráficos
-            c_inf = 0 # Nivel inferior de concentración relativa
-            c_sup = 3 # Nivel superior de concentración relativa
-
-            xs_adim = np.linspace(0,1,nx)
-            
-            if dim_img==1:
-                plt.ylim(c_inf,c_sup)
-
-            else: #dim_img==2
-                y_sup = 0.25 # Un cuarto del dominio en 'y'
-                lim_plot_y = np.int(ny*y_sup)
-                ys_adim = np.linspace(0,y_sup,lim_plot_y)
-
-            # Texto para gráficos
-            texto = "C$_{forz}$: " + "{:.3e} kg/m$^3$".\
-                    format(conc_ini) +\
-                    "\n$\Delta$x: {:04.1f} m".format(dx) +\
-                    "\n$\Delta$y: {:04.1f} m".format(dy) +\
-                    "\n$\Delta$t: {:.1f} s".format(dt)
-
-            x_texto = (xs_adim[-1] - xs_adim[0])*0.875
-            etiqueta="C/C$_{forz}$"
-            nom_x = "L/L$_x$"
-            
-            if dim_img==1:
-                y_texto = (c_sup-c_inf)*0.5
-                titulo = "Método {}\n".format(metodo) + \
-                         "t = {:5.1f} min, y = {:03.1f}0 m".\
-                         format(t/60, y_img*dy)
-                nom_y = "C/C$_{forz}$"
-
-            else: #dim_img==2
-                y_texto = (ys_adim[-1] - ys_adim[0])*0.75
-                titulo = "Método {}\n".format(metodo) + \
-                         "t = {:5.1f} min".format(t/60)
-                nom_y = "L/L$_y$"
-            
-            # Impresión del gráfico adimensional
-            plt.figure(figsize=(12,6))
-            plt.tight_layout()
-            plt.title(titulo)
-            plt.xlabel(nom_x)
-            plt.ylabel(nom_y)
-
-            if dim_img==1:
-                plt.ylim(c_inf,c_sup)
-                plt.text(x_texto, y_texto, texto,
-                         va="center", ha="center")
-                plt.plot(xs_adim,
-                         solucion[y_img]/(conc_ini),
-                         "r", label=etiqueta)
-                plt.legend(loc="upper right", framealpha=1)
-
-            else: #dim_img==2
-                # Ejes
-                plt.xlim(xs_adim[0],xs_adim[-1])
-                plt.ylim(ys_adim[0],ys_adim[-1])
-
-                # Solución
-                sol_adim = solucion[:lim_plot_y] / (conc_ini)
-
-                # Texto
-                plt.text(x_texto, y_texto, texto,
-                         bbox=dict(fill=True,facecolor="white",alpha=1.0),
-                         va="center", ha="center")
-
-                # Mapa de contornos
-                paso_plot = 0.25
-                niv_contourf = np.arange(c_inf,
-                                         c_sup+paso_plot,
-                                         paso_plot)
-
-                niv_colorbar = np.arange(c_inf,
-                                         c_sup+paso_plot,
-                                         2*paso_plot)
-
-                plt.contourf(xs_adim, ys_adim, sol_adim,
-                             cmap="coolwarm", levels=niv_contourf)
-                
-                cbar = plt.colorbar(ticks=niv_colorbar)
-                cbar.ax.set_ylabel(etiqueta)
-
-            # Salida a archivo
-            plt.savefig(ruta_img)
-            plt.clf()
-            plt.close()
+    print("\n{:d} cuadros graficados en {:.2f} s".
+          format(n_cuadros, time.perf_counter() - t_ini))
 
     #**** FIN MAIN ****#
 
 if __name__ == "__main__":
-    if (len(sys.argv) != 2):
+    if len(sys.argv) not in (2, 3):
         print("Error: número incorrecto de argumentos")
-        print("Modo de uso: " + __file__ + " <archivo_input>")
+        print("Modo de uso: " + __file__ +
+              " <archivo_input> [<n_procesos>]")
         sys.exit(1)
+    elif len(sys.argv)==3:
+        main(sys.argv[1], int(sys.argv[2]))
     else:
         main(sys.argv[1])
 
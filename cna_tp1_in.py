@@ -27,6 +27,19 @@ def datos_input(archivo_input, comentario='#'):
     requeridas por el programa principal.
 
     Informa si alguno de los valores de input no es válido.
+
+    Las variables opcionales que no figuren en el archivo de entrada
+    toman su valor por defecto.
+
+    Las líneas 'FUENTE', que pueden repetirse, se devuelven en la clave
+    'FUENTES' como lista de tuplas (x, y, descarga) o (x_ini, y_ini,
+    x_fin, y_fin, descarga).
+
+    Las líneas 'SONDA', que pueden repetirse, se devuelven en la clave
+    'SONDAS' como lista de tuplas (x, y).
+
+    Las variables de 'nom_var_lista' admiten varios valores separados
+    por espacios y se devuelven como lista.
     """
 
     # Nombres de variables numéricas que usa
@@ -66,23 +79,75 @@ def datos_input(archivo_input, comentario='#'):
                          'upwinding'
                         ]
 
+    # Variables alfabéticas opcionales, con su valor por defecto. Si no
+    # se especifican en 'archivo_input' se les asigna ese valor
+    dict_opc_alfa = {
+                     'INTEGRADOR': 'THETA',
+                     'SOLVER': 'LU',
+                     'PRECOND': 'ILU',
+                     'NORMA_ESTAC': 'MAX',
+                     'GRAF_EN_LINEA': 'NO'
+                    }
+
+    # Opciones válidas para las variables alfabéticas opcionales
+    opciones_opc_alfa = {
+                         'INTEGRADOR': ('THETA', 'ADI', 'ESTACIONARIO',
+                                        'EXPONENCIAL'),
+                         'SOLVER': ('SPSOLVE', 'LU', 'GMRES', 'BICGSTAB',
+                                    'KRON', 'BANDA', 'MULTIGRID'),
+                         'PRECOND': ('ILU', 'JACOBI', 'MULTIGRID',
+                                     'NINGUNO'),
+                         'NORMA_ESTAC': ('MAX', 'L2'),
+                         'GRAF_EN_LINEA': ('SI', 'NO')
+                        }
+
+    # Variables numéricas que admiten una lista de valores separados por
+    # espacios (nodos de los cortes de la salida a gráfico 1D)
+    nom_var_lista = ('Y_IMG', 'X_IMG')
+
+    # Variables numéricas opcionales, con su valor por defecto
+    dict_opc_num = {
+                    'TOL_KRYLOV': 1e-10,
+                    'TOL_ESTAC': 0.0,
+                    'TOL_PASO': 0.0,
+                    'T_RESP': 1.0,
+                    'N_MC': 100,
+                    'LOTE_MC': 100,
+                    'SEMILLA_MC': 0,
+                    'CV_E_L': 0.0,
+                    'CV_E_T': 0.0,
+                    'CV_F': 0.0,
+                    'C_LIMITE': 0.0,
+                    'N_MODOS': 40,
+                    'TOL_POD': 1e-8,
+                    'TOL_ROM': 1e-3,
+                    'X_IMG': []
+                   }
+
     # Conversión a mayúsculas de los nombres de variables en
     # 'nom_var_prog'. Variables a ser leídas de 'archivo_input'
     nom_var_num_in = [var.upper() for var in nom_var_num_prog]
-    nom_var_alfa_in = [var.upper() for var in nom_var_alfa_prog]    
+    nom_var_alfa_in = [var.upper() for var in nom_var_alfa_prog]
 
     # Lectura de líneas de 'archivo_input' y captura de datos
     dict_valores_num = {}
     dict_valores_alfa = {}
+    dict_valores_opc = {}
+    lista_fuentes = []
+    lista_sondas = []
     with open(archivo_input, 'r') as a_in:
         # Lista para comprobar que las variables no han sido
         # especificadas más de una vez o estén faltantes
         variables_encontradas = []
         for linea in a_in:
             if not linea.startswith(comentario):
+                # Nombre de la variable, a la izquierda del '='. Los
+                # valores (p. ej. 'INTEGRADOR = THETA') no se confunden
+                # con nombres de variables
+                clave = linea.split('=')[0]
                 # Adición de variables numéricas
                 for var_num in nom_var_num_in:
-                    if re.search(r'\b' + var_num + r'\b', linea):
+                    if re.search(r'\b' + var_num + r'\b', clave):
                         variables_encontradas.append(var_num)
                         try:
                             val_num = linea.split('=')[-1].strip()
@@ -94,7 +159,7 @@ def datos_input(archivo_input, comentario='#'):
                             sys.exit(1)
                 # Adición de variables alfabéticas
                 for var_alfa in nom_var_alfa_in:
-                    if re.search(r'\b' + var_alfa + r'\b', linea):
+                    if re.search(r'\b' + var_alfa + r'\b', clave):
                         variables_encontradas.append(var_alfa)
                         try:
                             val_alfa = linea.split('=')[-1].strip()
@@ -104,6 +169,42 @@ def datos_input(archivo_input, comentario='#'):
                                   "'{}' ".format(var_alfa) +\
                                   "sin especificar")
                             sys.exit(1)
+                # Adición de fuentes adicionales, en cualquier cantidad
+                if re.search(r'\bFUENTE\b', clave):
+                    try:
+                        valores = [float(val) for val in
+                                   linea.split('=')[-1].split()]
+                    except ValueError:
+                        valores = []
+                    if len(valores) not in (3, 5):
+                        print("Fuente mal especificada: " +
+                              "'{}'".format(linea.strip()))
+                        print("Debe ser 'FUENTE = x y descarga' o " +
+                              "'FUENTE = x_ini y_ini x_fin y_fin " +
+                              "descarga'")
+                        sys.exit(1)
+                    else:
+                        lista_fuentes.append(tuple(valores))
+                # Adición de puntos de control, en cualquier cantidad
+                if re.search(r'\bSONDA\b', clave):
+                    try:
+                        valores = [float(val) for val in
+                                   linea.split('=')[-1].split()]
+                    except ValueError:
+                        valores = []
+                    if len(valores) != 2:
+                        print("Sonda mal especificada: " +
+                              "'{}'".format(linea.strip()))
+                        print("Debe ser 'SONDA = x y'")
+                        sys.exit(1)
+                    else:
+                        lista_sondas.append(tuple(valores))
+                # Adición de variables opcionales
+                for var_opc in [*dict_opc_alfa, *dict_opc_num]:
+                    if re.search(r'\b' + var_opc + r'\b', clave):
+                        variables_encontradas.append(var_opc)
+                        val_opc = linea.split('=')[-1].strip()
+                        dict_valores_opc.update({var_opc:val_opc})
 
         # Comprobación de que las variables requeridas no estén
         # faltantes o hayan sido especificadas más de una vez
@@ -129,6 +230,14 @@ def datos_input(archivo_input, comentario='#'):
             else:
                 pass
 
+        for var_opc in [*dict_opc_alfa, *dict_opc_num]:
+            if variables_encontradas.count(var_opc) > 1:
+                print("Variable opcional {} ".format(var_opc) +\
+                      "especificada más de una vez")
+                sys.exit(1)
+            else:
+                pass
+
     # Verifica si las variables alfabéticas cumplen
     # con el tipo necesario
     for key in dict_valores_alfa:
@@ -182,6 +291,15 @@ def datos_input(archivo_input, comentario='#'):
         if val.isalpha():
             print("La variable {} debe ser numérica".format(key))
             sys.exit(1)
+        elif key in nom_var_lista:
+            try:
+                dict_valores_num[key] = [float(v) for v in val.split()]
+            except ValueError:
+                dict_valores_num[key] = []
+            if len(dict_valores_num[key])==0:
+                print("La variable {} debe ser numérica, ".format(key) +
+                      "con uno o más valores separados por espacios")
+                sys.exit(1)
         else:
             dict_valores_num[key] = float(val)
 
@@ -200,8 +318,37 @@ def datos_input(archivo_input, comentario='#'):
     else:
         pass
 
+    # Verificación de las variables opcionales. Las no especificadas
+    # toman su valor por defecto
+    for key in dict_opc_alfa:
+        if key not in dict_valores_opc:
+            dict_valores_opc[key] = dict_opc_alfa[key]
+        elif dict_valores_opc[key] not in opciones_opc_alfa[key]:
+            print("Variable opcional {} mal especificada".format(key))
+            print("La selección debe ser alguna de estas opciones: " +
+                  ", ".join(opciones_opc_alfa[key]))
+            sys.exit(1)
+        else:
+            pass
+
+    for key in dict_opc_num:
+        if key not in dict_valores_opc:
+            dict_valores_opc[key] = dict_opc_num[key]
+        else:
+            try:
+                if key in nom_var_lista:
+                    dict_valores_opc[key] = [float(v) for v in
+                                             dict_valores_opc[key].split()]
+                else:
+                    dict_valores_opc[key] = float(dict_valores_opc[key])
+            except ValueError:
+                print("La variable {} debe ser numérica".format(key))
+                sys.exit(1)
+
     # Construcción del diccionario final para el programa 'v2_main_tp1.py'
-    dicc_prog = {**dict_valores_alfa, **dict_valores_num}
+    dicc_prog = {**dict_valores_alfa, **dict_valores_num,
+                 **dict_valores_opc, 'FUENTES': lista_fuentes,
+                 'SONDAS': lista_sondas}
     
     return dicc_prog
 
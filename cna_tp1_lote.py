@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_lote.py'
+
+Programa que resuelve a la vez varios escenarios que comparten las
+matrices del problema y sólo difieren en las fuentes (posición de la
+forzante, descarga o líneas 'FUENTE').
+
+Los k escenarios se apilan como columnas de una matriz de estado de forma
+(nx*ny, k) con el método theta, o como un campo de forma (k, ny, nx) con
+ADI o el método explícito. En cada paso se efectúa un único producto
+B @ U y una única solución con k lados derechos, con los factores de A
+calculados una sola vez, por lo que k escenarios cuestan poco más que
+uno.
+
+Modo de uso:
+    cna_tp1_lote.py <archivo_input_1> <archivo_input_2> ...
+
+Las soluciones de cada escenario se guardan en el almacén del programa
+principal (ver 'cna_tp1_almacen.py'), en el directorio de salida de este
+seguido del nombre de su archivo de entrada.
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_almacen as cna_almacen
+
+import numpy as np
+import os
+import sys
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def firma_matrices(vs, p):
+    """
+    Función que devuelve los parámetros de los que dependen las matrices
+    y el bucle temporal, que deben coincidir entre los escenarios de un
+    lote.
+    """
+
+    claves = ('vel', 'D_l', 'D_t', 'cu_c_dec', 'dx', 'dy', 'dt', 'nx',
+              'ny', 'theta', 'upw', 'integrador', 'solver', 'precond',
+              'tol_krylov', 't_total')
+
+    dicc_firma = {clave: p[clave] for clave in claves}
+    dicc_firma['bordes_Dir'] = sorted(p['bordes_Dir'])
+    dicc_firma['T_SOL'] = vs['T_SOL']
+
+    # Fin función 'firma_matrices'
+    return dicc_firma
+#%%
+
+#%%
+def verificar_escenario(vs, p):
+    """
+    Función que verifica que el escenario de 'vs' y 'p' pueda resolverse
+    por lotes: integrador 'THETA' o 'ADI' con paso fijo hasta T_TOTAL.
+    """
+
+    if p['integrador'] not in ('THETA', 'ADI'):
+        print("El modo por lotes requiere el integrador " +
+              "'THETA' o 'ADI'")
+        sys.exit(1)
+    elif vs['TOL_PASO'] > 0 or vs['TOL_ESTAC'] > 0:
+        print("El modo por lotes usa paso fijo hasta T_TOTAL: " +
+              "TOL_PASO y TOL_ESTAC deben ser 0")
+        sys.exit(1)
+    else:
+        pass
+
+    # Fin función 'verificar_escenario'
+#%%
+
+#%%
+def fuentes_lote(lista_p):
+    """
+    Función que reúne las fuentes de los escenarios de 'lista_p' en los
+    nodos de todos ellos y devuelve los arreglos (pos_x, pos_y, descarga),
+    con la descarga [kg/seg] de forma (n_nodos, k): una columna por
+    escenario, nula en los nodos sin fuente del escenario.
+    """
+
+    nx = lista_p[0]['nx']
+
+    nodos_esc = [p['fuentes'][0] + nx*p['fuentes'][1] for p in lista_p]
+    nodos = np.unique(np.concatenate(nodos_esc))
+
+    descarga = np.zeros((len(nodos), len(lista_p)))
+    for k, p in enumerate(lista_p):
+        descarga[np.searchsorted(nodos, nodos_esc[k]), k] = p['fuentes'][2]
+
+    # Fin función 'fuentes_lote'
+    return nodos % nx, nodos // nx, descarga
+#%%
+
+#%%
+def resolver_lote(lista_p, t_sol=5, guardar=None, informar=True):
+    """
+    Función que avanza a la vez, con paso fijo 'dt' hasta 't_total', los
+    escenarios de 'lista_p' (ver 'cna_tp1_main.parametros'), que deben
+    compartir las matrices del problema.
+
+    En cada tiempo múltiplo de 't_sol' [min] llama a 'guardar(t, campos)'
+    con el tiempo en segundos y la concentración [kg/m^3] de cada
+    escenario, de forma (k, ny, nx). Con 'informar' se imprime cada
+    minuto el valor máximo de concentración de cada escenario.
+    """
+
+    p = lista_p[0]
+    n_esc = len(lista_p)
+    nx, ny, nt = p['nx'], p['ny'], p['nt']
+    dt, v_cel = p['dt'], p['v_cel']
+
+    # Estado del lote: columnas con el método theta, primer eje con ADI o
+    # el método explícito
+    por_campo = p['integrador']=='ADI' or p['theta']==0.0
+
+    pos_x, pos_y, descarga = fuentes_lote(lista_p)
+    if por_campo:
+        descarga = descarga.T
+
+    paso = cna_main.armar_paso(p, dt, fuentes=(pos_x, pos_y, descarga))
+
+    if por_campo:
+        u_ini = np.zeros((n_esc, ny, nx))
+    else:
+        u_ini = np.zeros((nt, n_esc))
+
+    t_final = p['t_total']*60
+    n_pasos = np.arange(dt, t_final+dt, dt)
+
+    for t in n_pasos:
+        u_n1 = paso(u_ini)
+        u_ini = u_n1
+
+        # Campo de cada escenario, como (k, ny, nx) o (k, nx*ny)
+        campos = u_n1 if por_campo else u_n1.T
+
+        if informar and (t/60)%1==0:
+            sol_max = campos.reshape(n_esc, -1).max(axis=1)/v_cel
+            print("\nTiempo: {:.1f} min".format(t/60))
+            print("\tValor máximo de concentración por escenario " +
+                  "[kg/m^3]:")
+            print("\t" + ", ".join("{:.3e}".format(val)
+                                   for val in sol_max))
+
+        if guardar is not None and (t/60)%t_sol==0:
+            guardar(t, campos.reshape(n_esc, ny, nx)/v_cel)
+
+    # Fin función 'resolver_lote'
+#%%
+
+#**** PROGRAMA ****#
+
+def main(archivos_input):
+
+    print("Ejecutando programa " + __file__)
+
+    lista_vs = [cna_in.datos_input(archivo) for archivo in archivos_input]
+    lista_p = [cna_main.parametros(vs) for vs in lista_vs]
+
+    vs, p = lista_vs[0], lista_p[0]
+
+    # Verificación de que todos los escenarios comparten las matrices
+    for archivo, vs_k, p_k in zip(archivos_input, lista_vs, lista_p):
+        if firma_matrices(vs_k, p_k) != firma_matrices(vs, p):
+            print("El escenario '{}' no comparte ".format(archivo) +
+                  "las matrices del problema con " +
+                  "'{}'".format(archivos_input[0]))
+            print("Sólo pueden diferir las fuentes")
+            sys.exit(1)
+        else:
+            verificar_escenario(vs_k, p_k)
+
+    theta = p['theta']
+    ny, nx = p['ny'], p['nx']
+
+    print("\nLote de {:d} escenarios, ".format(len(lista_p)) +
+          "fuentes en {:d} nodos".format(len(fuentes_lote(lista_p)[0])))
+    print("Integrador: {}, theta = {:.1f}, dt = {:.1f} s".
+          format(p['integrador'], theta, p['dt']))
+
+    if not (p['integrador']=='ADI' or theta==0.0):
+        print("\nCorriendo con solver: {}".format(p['solver']))
+
+    # Directorios de salida de cada escenario
+    dirs_sol = [p['dir_sol'] + "_" +
+                os.path.splitext(os.path.basename(archivo))[0]
+                for archivo in archivos_input]
+
+    # Almacén de soluciones de cada escenario (ver 'cna_tp1_almacen.py')
+    n_max = int(p['t_total'] // vs['T_SOL'])
+    agregar = [cna_almacen.crear_almacen(
+                   dir_sol, forma=(ny,nx), n_max=n_max,
+                   meta={'dx': p['dx'], 'dy': p['dy'], 'dt': p['dt'],
+                         'theta': theta,
+                         'descripcion': "Theta = {:.1f}".format(theta)})
+               for dir_sol in dirs_sol]
+
+    def guardar(t, campos):
+        for agregar_k, campo in zip(agregar, campos):
+            agregar_k(t, campo)
+
+    print("\nEjecutando bucle de solución:")
+    print("-----------------------------")
+
+    resolver_lote(lista_p, t_sol=vs['T_SOL'], guardar=guardar)
+
+    print("\nEscenarios guardados en:")
+    for dir_sol in dirs_sol:
+        print("\t" + dir_sol)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ +
+              " <archivo_input_1> <archivo_input_2> ...")
+        sys.exit(1)
+
+    main(sys.argv[1:])
+
+#**** FIN PROGRAMA ****#
@@ -18,14 +18,199 @@ en un río de geometría rectangular.
 
 import cna_tp1_func as cna_func
 import cna_tp1_in as cna_in
+import cna_tp1_solver as cna_solver
+import cna_tp1_explicito as cna_explicito
+import cna_tp1_armado as cna_armado
+import cna_tp1_adi as cna_adi
+import cna_tp1_theta as cna_theta
+import cna_tp1_adaptativo as cna_adapt
+import cna_tp1_exponencial as cna_exp
+import cna_tp1_almacen as cna_almacen
 
 import numpy as np
-import scipy.sparse as sp
-import scipy.sparse.linalg as splinalg
 import os
 import sys
 
-def main(archivo_input):
+#%%
+def parametros(vs):
+    """
+    Función que calcula, a partir del diccionario de variables de
+    'cna_tp1_in.datos_input', los parámetros derivados del problema:
+    difusividades, paso temporal, cantidad de nodos, volumen de celda,
+    conversión de unidades, máscara Dirichlet, nodo de la forzante,
+    fuentes, puntos de control y directorio de salida.
+
+    Devuelve un diccionario con esos parámetros y las selecciones de
+    método del archivo de entrada. No imprime información.
+    """
+
+    p = {}
+
+    # Parámetros de modelado
+    p['vel'] = vs['VEL'] # [m/s]
+    p['h'] = vs['H']     # [m]
+
+    # Difusividades longitudinal y transversal [m^2/s]
+    p['D_l'] = vs['E_L'] * vs['H'] * vs['VEL'] * vs['F']
+    p['D_t'] = vs['E_T'] * vs['H'] * vs['VEL'] * vs['F']
+
+    # Tiempo total a simular [minutos]
+    p['t_total'] = vs['T_TOTAL']
+
+    # Discretización espacial y temporal
+    p['dx'] = vs['DX']
+    p['dy'] = vs['DY']
+
+    if vs['AUTO_DT']=="NO":
+        p['dt'] = vs['DT']
+
+    else: # vs['AUTO_DT']=="SI"
+        p['dt'] = cna_func.auto_dt(delta_x=p['dx'], delta_y=p['dy'],
+                                   t_final=p['t_total'],
+                                   lim_estabilidad=0.25,
+                                   dif_long=p['D_l'], dif_trans=p['D_t'])
+
+    p['Lx'] = vs['X_FIN'] - vs['X_INI']
+    p['Ly'] = vs['Y_FIN'] - vs['Y_INI']
+
+    # Los nodos de cálculo se ubican en el centro de las celdas
+    p['nx'] = int(p['Lx']/p['dx'])
+    p['ny'] = int(p['Ly']/p['dy'])
+    p['nt'] = int(p['nx']*p['ny'])
+
+    # Con un único nodo en una dirección, la sustitución de los nodos
+    # fantasmas de Neumann deja coeficientes hacia vecinos inexistentes
+    # (ver 'cna_tp1_armado.coeficientes_1D'), y con nx = 1 los
+    # desfazajes en 'x' (±1) y en 'y' (±nx) de las matrices coinciden
+    if p['nx'] < 2 or p['ny'] < 2:
+        print("Error: la malla debe tener al menos 2 nodos en cada " +
+              "dirección (nx = {:d}, ny = {:d})".format(p['nx'], p['ny']))
+        print("Deben reducirse DX o DY respecto del largo del dominio")
+        sys.exit(1)
+    else:
+        pass
+
+    # Volumen de celda utilizado para calcular concentración por m^3
+    p['v_cel'] = p['dx']*p['dy']*p['h'] # [m^3]
+
+    #Conversión de unidades para descarga y decaimiento de contaminante
+    cu = 1 / (3600 * 24) # día / (3600 seg/hora * 24 hora/día)
+
+    p['cu_desc_cont'] = vs['DESC_CONT'] * cu # [kg/seg]
+    p['cu_c_dec'] = vs['C_DEC'] * cu # [1/seg]
+
+    # Selección de método
+    p['theta'] = vs['THETA']
+    p['upw'] = vs['UPWINDING']
+    p['integrador'] = vs['INTEGRADOR']
+    p['solver'] = vs['SOLVER']
+    p['precond'] = vs['PRECOND']
+    p['tol_krylov'] = vs['TOL_KRYLOV']
+
+    # Bordes con condición Dirichlet y máscara de sus nodos
+    p['bordes_Dir'] = [key.lower().replace('cb_','') for key in vs.keys()
+                       if vs[key] == 'DIR']
+    p['mascara_Dir'] = cna_func.mascara_Dir(bordes=p['bordes_Dir'],
+                                            n_el_x=p['nx'], n_el_y=p['ny'])
+
+    # Nodo de la forzante
+    p['xforz'], p['yforz'] = cna_func.pos_forz(pos_x=vs['POS_X_FORZ'],
+                                               pos_y=vs['POS_Y_FORZ'],
+                                               n_el_x=p['nx'],
+                                               n_el_y=p['ny'])
+
+    # Fuentes adicionales de las líneas 'FUENTE' [kg/seg], y conjunto de
+    # todas las fuentes con la forzante, como arreglos (pos_x, pos_y,
+    # descarga) con un valor por nodo
+    p['fuentes_adic'] = cna_func.nodos_fuentes(
+        fuentes=[(*fuente[:-1], fuente[-1]*cu) for fuente in vs['FUENTES']],
+        x_ini=vs['X_INI'], y_ini=vs['Y_INI'], delta_x=p['dx'],
+        delta_y=p['dy'], n_el_x=p['nx'], n_el_y=p['ny'])
+
+    vec_fuentes = np.zeros(p['nt'])
+    np.add.at(vec_fuentes,
+              p['fuentes_adic'][0] + p['nx']*p['fuentes_adic'][1],
+              p['fuentes_adic'][2])
+    vec_fuentes[p['xforz'] + p['nx']*p['yforz']] += p['cu_desc_cont']
+
+    nodos = np.nonzero(vec_fuentes)[0]
+    p['fuentes'] = (nodos % p['nx'], nodos // p['nx'], vec_fuentes[nodos])
+
+    if np.any(p['mascara_Dir'][p['fuentes'][1], p['fuentes'][0]]):
+        print("Error: hay fuentes en nodos con condición Dirichlet")
+        sys.exit(1)
+    else:
+        pass
+
+    # Nodos de los puntos de control de las líneas 'SONDA'
+    p['sondas'] = cna_func.nodos_sondas(
+        sondas=vs['SONDAS'], x_ini=vs['X_INI'], y_ini=vs['Y_INI'],
+        delta_x=p['dx'], delta_y=p['dy'], n_el_x=p['nx'], n_el_y=p['ny'])
+
+    # Directorio de salida de las soluciones. Los integradores distintos
+    # del método theta agregan su nombre, de modo que no reemplacen el
+    # almacén de una corrida theta de igual discretización
+    p['dir_sol'] = "cna_tp1_sol_dx{}_dy{}_dt{}_theta{}".\
+    format(p['dx'],p['dy'],p['dt'],p['theta'])
+
+    if p['integrador']!='THETA':
+        p['dir_sol'] += "_" + p['integrador'].lower()
+
+    # Fin función 'parametros'
+    return p
+#%%
+
+#%%
+def armar_paso(p, delta_t, fuentes=None, registro=None):
+    """
+    Función que devuelve la función 'paso(u_ini)' que calcula el campo
+    solución de un paso 'delta_t' a partir del campo del paso anterior,
+    según el integrador y el método de 'p' (ver 'parametros').
+
+    Con el integrador ADI o theta = 0 el campo se maneja con la forma
+    (ny, nx). Con el método theta, como vector de nx*ny elementos.
+
+    'fuentes' son los arreglos (pos_x, pos_y, descarga), con la descarga
+    en kg/seg; por defecto, todas las fuentes de 'p'. En cada paso se
+    vuelca en cada nodo la descarga del intervalo 'delta_t'. Con
+    'paso(u_ini, val_forz)' se da en cambio la masa [kg] volcada en el
+    paso en cada nodo de 'fuentes', con el mismo integrador y la misma
+    factorización. 'registro' es el registro de iteraciones del solver
+    (ver 'cna_tp1_solver.armar_solver').
+    """
+
+    if fuentes is None:
+        fuentes = p['fuentes']
+
+    # Forzante: descarga en el intervalo 'delta_t'
+    pos_x, pos_y, descarga = fuentes
+    val_forz = np.asarray(descarga) * delta_t
+
+    args_paso = dict(n_el_x=p['nx'], n_el_y=p['ny'], delta_x=p['dx'],
+                     delta_y=p['dy'], delta_t=delta_t, vel=p['vel'],
+                     dif_long=p['D_l'], dif_trans=p['D_t'],
+                     c_dec=p['cu_c_dec'], upwinding=p['upw'],
+                     mascara_Dir=p['mascara_Dir'], val_forz=val_forz,
+                     pos_x=pos_x, pos_y=pos_y)
+
+    if p['integrador']=='ADI':
+        paso = cna_adi.armar_paso_adi(**args_paso)
+
+    elif p['theta']==0.0:
+        # Paso explícito
+        paso = cna_explicito.armar_paso_explicito(**args_paso)
+
+    else:
+        # Método theta
+        paso = cna_theta.armar_paso_theta(
+            theta=p['theta'], solver=p['solver'], precond=p['precond'],
+            tol=p['tol_krylov'], registro=registro, **args_paso)
+
+    # Fin función 'armar_paso'
+    return paso
+#%%
+
+def main(archivo_input, observadores=()):
     #if (len(sys.argv) != 2):
     #    print("Error: número incorrecto de argumentos")
     #    print("Modo de uso: " + __file__ + " <archivo_input>")
@@ -38,87 +223,52 @@ def main(archivo_input):
     # Lectura de variables del archivo input
     vs = cna_in.datos_input(archivo_input)
 
-    # Geometría [metros]
-    x_ini = vs['X_INI']
-    x_fin = vs['X_FIN']
-    y_ini = vs['Y_INI']
-    y_fin = vs['Y_FIN']
+    # Parámetros derivados del problema
+    p = parametros(vs)
 
     # Parámetros de modelado
-    vel = vs['VEL'] # [m/s]
-    h = vs['H']     # [m]
-    f = vs['F']     # [adim]
-    e_l = vs['E_L'] # [adim]
-    e_t = vs['E_T'] # [adim]
-
-    D_l = e_l * h * vel * f # difusividad longitudinal [m^2/s]
-    D_t = e_t * h * vel * f # difusividad transversal [m^2/s]
-
-    # Parámetros de la descarga de contaminante
-    desc_cont = vs['DESC_CONT'] # Descarga continua [kg/día]
-    c_dec = vs['C_DEC'] # Cte de decaimiento del contaminante [1/día]
+    vel = p['vel'] # [m/s]
+    D_l = p['D_l'] # difusividad longitudinal [m^2/s]
+    D_t = p['D_t'] # difusividad transversal [m^2/s]
 
     # Tiempo total a simular [minutos]
-    t_total = vs['T_TOTAL']
+    t_total = p['t_total']
 
     #**** DISCRETIZACIÓN DEL PROBLEMA ****#
 
-    dx = vs['DX']
-    dy = vs['DY']
-    
-    # Selección de paso temporal
-    auto_dt = vs['AUTO_DT']
-    
-    if auto_dt=="NO":
-        dt = vs['DT']
-
-    else: # auto_dt=="SI"
-        dt = cna_func.auto_dt(delta_x=dx, delta_y=dy,
-                              t_final=t_total,
-                              lim_estabilidad=0.25,
-                              dif_long=D_l,dif_trans=D_t)
-
-    Lx = x_fin - x_ini
-    Ly = y_fin - y_ini
+    dx = p['dx']
+    dy = p['dy']
+    dt = p['dt']
 
     print("\nDatos de discretización")
     print("-------------------")
-    if auto_dt=="SI":
+    if vs['AUTO_DT']=="SI":
         print("Selección automática de paso temporal")
         print("")
 
-    print("Longitud en 'x' del dominio: {:.1f} m".format(Lx))
-    print("Longitud en 'y' del dominio: {:.1f} m".format(Ly))
+    print("Longitud en 'x' del dominio: {:.1f} m".format(p['Lx']))
+    print("Longitud en 'y' del dominio: {:.1f} m".format(p['Ly']))
     print("")
     print("Intervalo 'dt' de {:.1f} s".format(dt))
     print("Discretización en 'x' de {:.1f} m".format(dx))
     print("Discretización en 'y' de {:.1f} m".format(dy))
     print("")
 
-    ## Los nodos de cálculo se ubican en el las esquinas de las celdas
-    #nx = np.int(Lx/dx + 1)
-    #ny = np.int(Ly/dy + 1)
-    
     # Los nodos de cálculo se ubican en el centro de las celdas
-    nx = np.int(Lx/dx)
-    ny = np.int(Ly/dy)
-    nt = np.int(nx*ny)
+    nx = p['nx']
+    ny = p['ny']
+    nt = p['nt']
 
     print("Cantidad de nodos totales en 'x': {:d}".format(nx))
     print("Cantidad de nodos totales en 'y': {:d}".format(ny))
     print("")
 
     # Volumen de celda utilizado para calcular concentración por m^3
-    v_cel = dx*dy*h # [m^3]
-
-    #Conversión de unidades para descarga y decaimiento de contaminante
-    cu = 1 / (3600 * 24) # día / (3600 seg/hora * 24 hora/día)
-
-    # Aporte de contaminante
-    cu_desc_cont = desc_cont * cu # [kg/seg]
+    v_cel = p['v_cel'] # [m^3]
 
-    # Decaimiento de contaminante
-    cu_c_dec = c_dec * cu # [1/seg]
+    # Aporte y decaimiento de contaminante, por segundo
+    cu_desc_cont = p['cu_desc_cont'] # [kg/seg]
+    cu_c_dec = p['cu_c_dec'] # [1/seg]
 
     # Datos para estabilidad
     rx = D_l * dt / (dx**2)
@@ -135,69 +285,65 @@ def main(archivo_input):
     #theta = 1.0 --> Fuertemente implícito
     #theta = 0.5 --> Crank-Nicolson
     #theta = 0.0 --> Explícito centrado
-    theta = vs['THETA']
+    theta = p['theta']
     
     print("\nCorriendo con theta = {:.1f}".format(theta))
 
     # Selección de upwinding
-    upw = vs['UPWINDING']
+    upw = p['upw']
     
     print("\nCorriendo con upwinding: {}".format(upw))
 
-    # Matriz del término advectivo
-    D1x = vel * cna_func.d_dx(
-        orden=1, n_el_x=nx, n_el_y=ny, delta_x=dx, upwinding=upw)
+    # Condiciones de borde (aplicación de Dirichlet = 0). Máscara de
+    # nodos Dirichlet, común a todos los bordes
+    print("\nBordes con condición Dirichlet: {}".
+          format(len(p['bordes_Dir'])))
 
-    # Matrices de los términos difusivos
-    D2x = D_l * cna_func.d_dx(
-        orden=2, n_el_x=nx, n_el_y=ny, delta_x=dx, upwinding=upw)
-    D2y = D_t * cna_func.d_dy(
-        orden=2, n_el_x=nx, n_el_y=ny, delta_y=dy, upwinding=upw)
+    mascara_Dir = p['mascara_Dir']
 
-    # Matriz identidad
-    I = sp.eye(nt)
+    # Selección del integrador temporal
+    # THETA ----------> Método theta
+    # ADI ------------> Direcciones alternadas implícitas (Peaceman-Rachford)
+    # ESTACIONARIO ---> Solución estacionaria, sin bucle temporal
+    # EXPONENCIAL ----> Solución exacta entre tiempos de escritura
+    integrador = vs['INTEGRADOR']
 
-    # Suma de matrices
-    M = dt * (D2x  + D2y - I*cu_c_dec - D1x)
+    print("\nCorriendo con integrador: {}".format(integrador))
 
-    # Matrices para solución LHS y RHS
-    A = I - theta * M
-    B = I + (1-theta) * M
+    # Con el integrador ADI o con theta = 0 el avance se calcula sin
+    # matrices globales (ver 'cna_tp1_adi.py' y 'cna_tp1_explicito.py').
+    # En otro caso el paso arma las matrices A y B del sistema (ver
+    # 'cna_tp1_theta.py')
+    if integrador=='ADI':
+        print("\nAvance ADI con soluciones tridiagonales por línea " +
+              "(no se tiene en cuenta theta)")
 
-    # Condiciones de borde (aplicación de Dirichlet = 0)
-    # Por defecto los bordes presentan u_x = 0 si son normales
-    # a la coordenada de la matriz de derivación dd_1
-    
-    # Recorre diccionario de variables buscando las que sean 'Dirichlet'
-    cont_borde = 0
-    for key in vs.keys():
-        if vs[key] == 'DIR':
-            # Registro de cantidad de bordes con condición Dirichlet
-            cont_borde += 1
-            # Construcción de la identificación del borde
-            borde_aplicacion = key.lower().replace('cb_','')
-
-            B = cna_func.cb_Dir(
-                B, borde=borde_aplicacion, n_el_x=nx, n_el_y=ny)
-            A = cna_func.cb_Dir(
-                A, borde=borde_aplicacion, n_el_x=nx, n_el_y=ny)
-                
-        else:
-            pass
-        
-    print("\nBordes con condición Dirichlet: {}".format(cont_borde))
+    elif integrador in ('ESTACIONARIO', 'EXPONENCIAL'):
+        # Diagonales del operador L = D2x + D2y - I*c_dec - D1x, que son
+        # las de M con dt = 1
+        diags_L, offsets_L = cna_armado.diagonales_M(
+            n_el_x=nx, n_el_y=ny, delta_x=dx, delta_y=dy, delta_t=1,
+            vel=vel, dif_long=D_l, dif_trans=D_t, c_dec=cu_c_dec,
+            upwinding=upw)
+
+        L = cna_armado.matriz_diagonales(diags_L, offsets_L)
+
+        # Sistema estacionario -L u = q, con filas identidad en los nodos
+        # Dirichlet
+        if integrador=='ESTACIONARIO':
+            K = cna_func.cb_Dir_mascara(-L, mascara_Dir)
+
+    elif theta==0.0:
+        print("\nAvance explícito sin matrices")
 
     # Vector solución. Concentración inicial en todos los puntos igual a 0
-    u_ini = np.zeros((nt,1))
-
-    # Forzante. Ubicado en el nodo adyacente a la esquina
-    # superior izquierda, sobre la fila de nodos 'y' adyacente
-    # al borde 'y_ini'
-    #xforz = 1
-    #yforz = 1
-    xforz, yforz = cna_func.pos_forz(pos_x=vs['POS_X_FORZ'],
-                                     pos_y=vs['POS_Y_FORZ'],
-                                     n_el_x=nx,n_el_y=ny)
+    u_ini = np.zeros(nt)
+
+    # Forzante. Ubicado en el nodo dado por 'POS_X_FORZ' y 'POS_Y_FORZ'
+    xforz, yforz = p['xforz'], p['yforz']
+
+    # Conjunto de fuentes (forzante y líneas 'FUENTE'), un valor por nodo
+    fuentes = p['fuentes']
     
     # ANTERIOR:
     # La descarga de contaminante, unidades kg/s, se multiplica por el
@@ -220,87 +366,263 @@ def main(archivo_input):
           format(dt) + " y nodo con volumen asociado {:.2f} m^3: ".
           format(v_cel) + "{:.3e} kg/m^3".format(vforz/v_cel))
 
+    if len(vs['FUENTES']) > 0:
+        print("Fuentes adicionales: {:d}, en {:d} nodos, ".
+              format(len(vs['FUENTES']), len(p['fuentes_adic'][0])) +
+              "{:.3e} kg/s en total".format(p['fuentes_adic'][2].sum()))
+
+
+    # Directorio de salida de las soluciones
+    dir_sol = p['dir_sol']
+
+    #**** SOLUCIÓN ESTACIONARIA ****#
+
+    # Pluma de largo plazo de la descarga continua: du/dt = 0, por lo que
+    # L u = -q con q la descarga por segundo en el nodo de la forzante. Se
+    # resuelve un único sistema, sin bucle temporal
+    if integrador=='ESTACIONARIO':
+        # El solver 'KRON' requiere la forma I - theta*M de la matriz
+        solver = p['solver'] if p['solver']!='KRON' else 'LU'
+
+        print("\nSolución estacionaria con solver: {}".format(solver))
 
-    #**** IMPRESIÓN DE MATRICES FINALES ****#    
-    np.set_printoptions(linewidth=1000)
-    #print("Matriz 'B'")
-    #print(B.toarray())
-    #print("\n\n\n")
-    #print("Matriz 'A'")
-    #print(A.toarray())
+        vec_q = np.zeros(nt)
+        vec_q[fuentes[0] + nx*fuentes[1]] = fuentes[2]
 
+        # Concentración nula en los nodos Dirichlet
+        vec_q[mascara_Dir.ravel()] = 0
+
+        resolver = cna_solver.armar_solver(K, metodo=solver,
+                                           precond=p['precond'],
+                                           tol=p['tol_krylov'],
+                                           mascara_Dir=mascara_Dir)
+        u_est = resolver(vec_q)
+
+        sol_concentracion = u_est/v_cel
+
+        print("\tValor máximo de concentración: " +
+              "\t{:.3e} kg/m^3".format(sol_concentracion.max()))
+
+        # Almacén de un único campo, con tiempo infinito (ver
+        # 'cna_tp1_almacen.py')
+        agregar = cna_almacen.crear_almacen(
+            dir_sol, forma=(ny,nx), n_max=1,
+            meta={'dx': dx, 'dy': dy, 'dt': None, 'theta': None,
+                  'descripcion': "Solución estacionaria, descarga " +
+                  "continua: {:.3e} kg/s".format(cu_desc_cont)})
+        agregar(np.inf, sol_concentracion.reshape(ny,nx))
+
+        print("\nSolución guardada en '{}'".format(
+              os.path.join(dir_sol, cna_almacen.ARCH_SOL)))
+
+        return
 
     #**** SOLUCIÓN ITERATIVA ****#
+
+    # Registro de iteraciones por paso de los métodos de Krylov
+    iteraciones = []
+
+    # Paso temporal adaptativo. Con TOL_PASO = 0 el paso es fijo
+    tol_paso = vs['TOL_PASO']
+    solver = p['solver']
+
+    if integrador=='THETA' and theta!=0.0:
+        print("\nCorriendo con solver: {}".format(solver))
+
+    # Función que devuelve el avance de un paso 'delta_t' (ver
+    # 'armar_paso'). El registro de iteraciones corresponde a pasos de
+    # igual 'dt', por lo que sólo se lleva con paso fijo
+    def armar_paso_main(delta_t):
+        return armar_paso(p, delta_t,
+                          registro=iteraciones if tol_paso==0 else None)
+
+    if integrador=='ADI' or theta==0.0:
+        u_ini = u_ini.reshape(ny,nx)
+
+    # Conversión del intervalo de escritura a segundos
+    t_sol_seg = vs['T_SOL'] * 60
+
+    if integrador=='EXPONENCIAL':
+        # Cada llamada a 'avanzar' cubre un intervalo de escritura con la
+        # acción de la exponencial de la matriz aumentada
+        print("\nAvance exponencial entre tiempos de escritura " +
+              "(no se tienen en cuenta theta ni DT)")
+
+        vec_q = np.zeros(nt)
+        vec_q[fuentes[0] + nx*fuentes[1]] = fuentes[2]
+
+        avance = cna_exp.armar_avance_exponencial(L, vec_q,
+                                                  mascara_Dir=mascara_Dir)
+
+        def avanzar(u_ini):
+            return avance(u_ini, t_sol_seg)
+
+        dt_bucle = t_sol_seg
+
+    elif tol_paso > 0:
+        # Con paso adaptativo, cada llamada a 'avanzar' cubre un intervalo
+        # de escritura. 'DT' es el paso de referencia: los pasos son
+        # DT * 2^k, con k entre -6 y el mayor que no supera a T_SOL
+        if not np.isclose(t_sol_seg/dt, round(t_sol_seg/dt)):
+            print("Error: con paso adaptativo T_SOL debe ser múltiplo " +
+                  "de DT")
+            sys.exit(1)
+        else:
+            pass
+
+        nivel_max = int(np.floor(np.log2(t_sol_seg/dt)))
+
+        # Orden de precisión temporal del integrador
+        orden = 2 if (integrador=='ADI' or theta==0.5) else 1
+
+        print("\nPaso temporal adaptativo con tolerancia " +
+              "{:.1e} y paso de referencia {:.1f} s".format(tol_paso, dt))
+
+        avance = cna_adapt.armar_avance_adaptativo(
+            armar_paso_main, delta_t=dt, tol=tol_paso, orden=orden,
+            nivel_min=min(-6, nivel_max), nivel_max=nivel_max)
+
+        def avanzar(u_ini):
+            return avance(u_ini, t_sol_seg)
+
+        dt_bucle = t_sol_seg
+
+    else:
+        avanzar = armar_paso_main(dt)
+        dt_bucle = dt
+
     print("\nEjecutando bucle de solución:")
     print("-----------------------------")
 
     # Conversión del tiempo final a segundos
     t_final = t_total*60
 
-    # Cantidad de pasos
-    n_pasos = np.arange(dt, t_final+dt,dt)
+    # Almacén binario de las soluciones, con lugar para todos los tiempos
+    # de escritura y el del estado estacionario (ver 'cna_tp1_almacen.py')
+    agregar = cna_almacen.crear_almacen(
+        dir_sol, forma=(ny,nx), n_max=int(t_final // t_sol_seg) + 1,
+        meta={'dx': dx, 'dy': dy, 'dt': dt, 'theta': theta,
+              'descripcion': "Theta = {:.1f}".format(theta)})
+
+    # Escritura en segundo plano: el bucle encola una copia del campo y
+    # sigue calculando, salvo que la cola esté llena
+    guardar, cerrar_escritura = cna_almacen.escritor_asincrono(agregar)
+
+    # Observadores del bucle: funciones 'observador(t, campo)' llamadas en
+    # cada tiempo de escritura con el campo [kg/m^3], de forma (ny, nx),
+    # además del almacén. Con GRAF_EN_LINEA = SI se agregan los gráficos
+    # en un proceso aparte (ver 'cna_tp1_graf_2D.armar_observador')
+    observadores = [guardar, *observadores]
+    cierres = [cerrar_escritura]
+
+    if vs['GRAF_EN_LINEA']=='SI':
+        import cna_tp1_graf_2D as cna_graf_2D
+
+        graficar, cerrar_graficos = cna_graf_2D.armar_observador(
+            cna_graf_2D.datos_grafico(vs, p))
+        observadores.append(graficar)
+        cierres.append(cerrar_graficos)
+
+    # Cantidad de pasos (de intervalos de escritura, con paso adaptativo)
+    n_pasos = np.arange(dt_bucle, t_final+dt_bucle, dt_bucle)
     #n_pasos = np.arange(dt, dt+dt,dt)
     
-    # Bucle de solución
-    for t in n_pasos:
-
-        #print("Vector 'u_rhs', t = {} s".format(t))
-        #print(u_rhs)
-
-        # Construcción del vector independiente con la forzante
-        u_rhs = cna_func.vector_rhs(mat_ind=B,
-                                    vec_ini=u_ini,
-                                    val_forz=vforz,
-                                    pos_x=xforz, pos_y=yforz,
-                                    n_el_x=nx, n_el_y=ny)
-        
-        # Cálculo del vector solución
-        u_n1 = splinalg.spsolve(A.tocsc(), u_rhs)
-
-        # Actualización del vector del lado derecho
-        u_ini = u_n1
-
-        # Impresión tiempo cada 1 minuto
-        if (t/60)%1==0:
-            ## ANTERIOR
-            #sol_concentracion = u_n1/(v_cel*dt)
-            # ACTUAL
-            sol_max = u_n1.max()/v_cel
-            print("\nTiempo: {:.1f} min".format(t/60))
-            print("\tValor máximo de concentración: " +
-                  "\t{:.3e} kg/m^3".format(sol_max))
-
-            print("")
-            print("\tValor máximo de concentración relativa [adim],\n" +
-                  "\tconc_max / conc_forz: {:.3e}".
-                  format(sol_max/(vforz/v_cel)))
-                  
-
-        # Guardar vector solución a archivo según el intervalo
-        # especificado
-        dir_sol = "cna_tp1_sol_dx{}_dy{}_dt{}_theta{}".\
-        format(dx,dy,dt,theta)
-
-        t_sol = vs['T_SOL'] # [min]
-
-        if (t/60)%t_sol==0:
-            sol_concentracion = u_n1/v_cel
-            arch_sol = "sol_{:.1f}".format(t)
-            ruta_sol = os.path.join(os.getcwd(),dir_sol,arch_sol)
-
-            try:
-                os.mkdir(dir_sol)
-            except OSError as error:
-                pass
-
-            encabezado = "Solución para concentración de " +\
-            "contaminante [kg/m^3]\n" +\
-            "Theta = {:.1f}\n".format(theta) +\
-            "t = {:.2f} min".format(t/60)
-
-            np.savetxt(ruta_sol,sol_concentracion.reshape(ny,nx),
-                       fmt='%.6e',header=encabezado)
-            
+    # Corte anticipado del bucle al alcanzar el estado estacionario: la
+    # variación relativa del campo en un paso, medida con la norma
+    # 'NORMA_ESTAC', es menor a 'TOL_ESTAC'. Con TOL_ESTAC = 0 no se corta
+    tol_estac = vs['TOL_ESTAC']
+    orden_norma = np.inf if vs['NORMA_ESTAC']=='MAX' else 2
+    estacionario = False
+
+    # Bucle de solución. Los observadores se cierran aun si el bucle
+    # termina con un error, con los campos ya encolados escritos
+    try:
+        for t in n_pasos:
+
+            #print("Vector 'u_rhs', t = {} s".format(t))
+            #print(u_rhs)
+
+            # Copia del campo anterior, ya que los integradores pueden
+            # reutilizar el arreglo de salida
+            if tol_estac > 0:
+                u_ant = u_ini.copy()
+
+            # Cálculo del campo solución
+            u_n1 = avanzar(u_ini)
+
+            # Variación relativa del campo en el paso
+            if tol_estac > 0:
+                u_ant -= u_n1
+                variacion = np.linalg.norm(np.ravel(u_ant), ord=orden_norma)/\
+                    max(np.linalg.norm(np.ravel(u_n1), ord=orden_norma),
+                        np.finfo(float).tiny)
+                estacionario = variacion < tol_estac
+
+            # Actualización del vector del lado derecho
+            u_ini = u_n1
+
+            # Impresión tiempo cada 1 minuto
+            if (t/60)%1==0:
+                ## ANTERIOR
+                #sol_concentracion = u_n1/(v_cel*dt)
+                # ACTUAL
+                sol_max = u_n1.max()/v_cel
+                print("\nTiempo: {:.1f} min".format(t/60))
+                print("\tValor máximo de concentración: " +
+                      "\t{:.3e} kg/m^3".format(sol_max))
+
+                print("")
+                print("\tValor máximo de concentración relativa [adim],\n" +
+                      "\tconc_max / conc_forz: {:.3e}".
+                      format(sol_max/(vforz/v_cel)))
+
+                if iteraciones:
+                    print("\tIteraciones de {} en el último paso: {:d}".
+                          format(solver, iteraciones[-1]))
+
+
+            # Guardar vector solución a archivo según el intervalo
+            # especificado, o al alcanzar el estado estacionario
+            t_sol = vs['T_SOL'] # [min]
+
+            if (t/60)%t_sol==0 or estacionario:
+                sol_concentracion = u_n1/v_cel
+                for observador in observadores:
+                    observador(t, sol_concentracion.reshape(ny,nx))
+
+            if estacionario:
+                print("\nEstado estacionario alcanzado en t = " +
+                      "{:.2f} min: variación relativa {:.3e} < {:.3e}".
+                      format(t/60, variacion, tol_estac))
+                break
+    finally:
+        # Escritura de los campos pendientes en la cola y gráficos
+        # pendientes
+        for cerrar in cierres:
+            cerrar()
+
+    print("\nSoluciones guardadas en '{}'".format(
+          os.path.join(dir_sol, cna_almacen.ARCH_SOL)))
+
+    # Registro a archivo de las iteraciones de cada paso
+    if iteraciones:
+        print("\nIteraciones de {}: ".format(solver) +
+              "media {:.1f}, máximo {:d}".
+              format(np.mean(iteraciones), np.max(iteraciones)))
+
+        os.makedirs(dir_sol, exist_ok=True)
+        ruta_iter = os.path.join(os.getcwd(),dir_sol,"iteraciones_krylov")
+
+        encabezado = "Iteraciones de {} ".format(solver) +\
+        "por paso temporal\n" +\
+        "Precondicionador: {}\n".format(p['precond']) +\
+        "t [s]    iteraciones"
+
+        np.savetxt(ruta_iter,
+                   np.column_stack((n_pasos[:len(iteraciones)],
+                                    iteraciones)),
+                   fmt=['%.1f','%d'], header=encabezado)
+
     #**** FIN MAIN ****#
     
 if __name__ == "__main__":
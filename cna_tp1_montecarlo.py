@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_montecarlo.py'
+
+Programa que estima por Monte Carlo la incertidumbre de la concentración
+debida a los coeficientes de difusión 'E_L', 'E_T' y al factor de
+fricción 'F'.
+
+Se sortean 'N_MC' juegos de parámetros lognormales, con mediana igual al
+valor del archivo de entrada y coeficientes de variación 'CV_E_L',
+'CV_E_T' y 'CV_F'. Los miembros del conjunto se avanzan juntos, de a
+'LOTE_MC', como un arreglo de forma (N, ny, nx) con el paso explícito o
+ADI vectorizados (ver 'cna_tp1_explicito.py' y 'cna_tp1_adi.py').
+
+En cada tiempo de escritura se acumulan, sin guardar los miembros, la
+media, la varianza y la probabilidad de superar 'C_LIMITE' en cada nodo.
+Los lotes se combinan con las fórmulas de actualización de media y
+varianza por grupos (Chan et al.).
+
+Cada estadística se guarda en su propio almacén (ver
+'cna_tp1_almacen.py'), en los subdirectorios 'media', 'varianza' y
+'prob_exc' del directorio de salida '<dir_sol>_mc', junto con la tabla de
+parámetros de los miembros, 'muestras'.
+
+Modo de uso:
+    cna_tp1_montecarlo.py <archivo_input>
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_almacen as cna_almacen
+
+import numpy as np
+import os
+import sys
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def muestras_parametros(vs, n_miembros=1, semilla=0):
+    """
+    Función que sortea 'n_miembros' juegos de (E_L, E_T, F) lognormales,
+    con mediana igual al valor de 'vs' y coeficiente de variación
+    'CV_E_L', 'CV_E_T' y 'CV_F', y los devuelve como arreglo de forma
+    (n_miembros, 3).
+    """
+
+    generador = np.random.default_rng(int(semilla))
+
+    medianas = np.array([vs['E_L'], vs['E_T'], vs['F']])
+    coef_var = np.array([vs['CV_E_L'], vs['CV_E_T'], vs['CV_F']])
+
+    # Desvío del logaritmo para el coeficiente de variación dado
+    sigma = np.sqrt(np.log1p(coef_var**2))
+
+    # Fin función 'muestras_parametros'
+    return medianas * np.exp(sigma *
+                             generador.standard_normal((n_miembros, 3)))
+#%%
+
+#%%
+def dt_estable(dif_long, dif_trans, vel=0, delta_x=1, delta_y=1,
+               upwinding='NO'):
+    """
+    Función que devuelve el mayor paso temporal [s] estable del método
+    explícito para cada par de difusividades 'dif_long' y 'dif_trans'
+    (escalares o arreglos de igual forma), con velocidad 'vel'.
+
+    Con r = dt*(D_l/dx^2 + D_t/dy^2) y número de Courant C = vel*dt/dx,
+    el esquema centrado requiere r <= 1/2 y C^2 <= 2*D_l*dt/dx^2 (límite
+    advectivo, dt <= 2*D_l/vel^2), y el esquema con 'upwinding' requiere
+    C + 2*r <= 1.
+    """
+
+    r_dt = dif_long/delta_x**2 + dif_trans/delta_y**2
+
+    if upwinding=='SI':
+        dt_max = 1 / (2*r_dt + abs(vel)/delta_x)
+
+    else: # upwinding=='NO'
+        dt_max = 1 / (2*r_dt)
+        if vel != 0:
+            dt_max = np.minimum(dt_max, 2*dif_long/vel**2)
+
+    # Fin función 'dt_estable'
+    return dt_max
+#%%
+
+#%%
+def armar_estadisticas(n_tiempos, forma, c_limite=0.0):
+    """
+    Función que devuelve las funciones 'acumular(i_t, campos)' y
+    'resultados(i_t)' de las estadísticas por nodo en 'n_tiempos'
+    tiempos de escritura.
+
+    'acumular' agrega los campos de concentración de un lote de miembros,
+    de forma (N, ny, nx), al tiempo i_t. 'resultados' devuelve la media,
+    la varianza (muestral) y la probabilidad de superar 'c_limite' de
+    todos los miembros acumulados al tiempo i_t.
+    """
+
+    cantidad = np.zeros(n_tiempos, dtype=int)
+    media = np.zeros((n_tiempos,) + forma)
+    suma_cuad = np.zeros((n_tiempos,) + forma)
+    superan = np.zeros((n_tiempos,) + forma, dtype=int)
+
+    def acumular(i_t, campos):
+        n_lote = campos.shape[0]
+        media_lote = campos.mean(axis=0)
+        suma_cuad_lote = ((campos - media_lote)**2).sum(axis=0)
+
+        # Combinación del lote con lo acumulado
+        n_ant = cantidad[i_t]
+        n_tot = n_ant + n_lote
+        delta = media_lote - media[i_t]
+
+        media[i_t] += delta * n_lote / n_tot
+        suma_cuad[i_t] += suma_cuad_lote + delta**2 * n_ant * n_lote / n_tot
+        superan[i_t] += (campos > c_limite).sum(axis=0)
+        cantidad[i_t] = n_tot
+
+    def resultados(i_t):
+        n_tot = cantidad[i_t]
+        return media[i_t], suma_cuad[i_t] / max(n_tot - 1, 1), \
+            superan[i_t] / n_tot
+
+    # Fin función 'armar_estadisticas'
+    return acumular, resultados
+#%%
+
+#**** PROGRAMA ****#
+
+def main(archivo_input):
+
+    print("Ejecutando programa " + __file__)
+
+    vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
+
+    if not (p['integrador']=='ADI' or
+            (p['integrador']=='THETA' and p['theta']==0.0)):
+        print("El conjunto de Monte Carlo requiere THETA = 0 " +
+              "(método explícito) o INTEGRADOR = ADI")
+        sys.exit(1)
+    else:
+        pass
+
+    n_miembros = int(vs['N_MC'])
+    n_lote = max(int(vs['LOTE_MC']), 1)
+    c_limite = vs['C_LIMITE']
+
+    muestras = muestras_parametros(vs, n_miembros=n_miembros,
+                                   semilla=vs['SEMILLA_MC'])
+
+    # Difusividades de cada miembro [m^2/s]
+    factor = vs['H'] * vs['VEL']
+    dif_long = muestras[:,0] * muestras[:,2] * factor
+    dif_trans = muestras[:,1] * muestras[:,2] * factor
+
+    nx, ny, dx, dy, dt = p['nx'], p['ny'], p['dx'], p['dy'], p['dt']
+    t_sol = vs['T_SOL'] # [min]
+
+    # Número de Péclet de celda de cada miembro: con el esquema centrado,
+    # mayor a 2 produce oscilaciones (no depende del paso temporal)
+    peclet = vs['VEL'] * dx / dif_long
+    if p['upw']=='NO' and np.any(peclet > 2):
+        print("Advertencia: {:d} miembros con número de Péclet ".
+              format(np.count_nonzero(peclet > 2)) +
+              "de celda mayor a 2 (máximo {:.2f}): ".format(peclet.max()) +
+              "la solución centrada puede oscilar. Ver 'UPWINDING'")
+
+    # Estabilidad del método explícito para todos los miembros, con
+    # difusión y advección. Con AUTO_DT = SI el paso se reduce al del
+    # miembro más restrictivo, como múltiplo de 0.5 s divisor de 'T_SOL'.
+    # Con AUTO_DT = NO, un paso inestable es un error
+    if p['integrador']!='ADI':
+        dt_lim = dt_estable(dif_long, dif_trans, vel=vs['VEL'],
+                            delta_x=dx, delta_y=dy,
+                            upwinding=p['upw']).min()
+
+        if dt > dt_lim and vs['AUTO_DT']=='SI':
+            incremento = 0.5
+            n_inc = int(np.floor(dt_lim / incremento))
+            while n_inc > 0 and (t_sol*60) % (n_inc*incremento) != 0:
+                n_inc -= 1
+
+            if n_inc < 1:
+                print("El paso estable del conjunto, {:.3e} s, ".
+                      format(dt_lim) + "es menor a {:.1f} s ".
+                      format(incremento) + "o no divide a T_SOL")
+                sys.exit(1)
+            else:
+                pass
+
+            print("Paso reducido de {:.1f} s a {:.1f} s ".
+                  format(dt, n_inc*incremento) +
+                  "por la estabilidad del miembro más restrictivo")
+
+            # Parámetros con el paso del conjunto (y su directorio)
+            vs = dict(vs, AUTO_DT="NO", DT=n_inc*incremento)
+            p = cna_main.parametros(vs)
+            dt = p['dt']
+
+        elif dt > dt_lim:
+            print("Paso DT = {:.1f} s inestable para ".format(dt) +
+                  "el conjunto: el miembro más restrictivo requiere " +
+                  "dt <= {:.3e} s. Reducir DT o usar ".format(dt_lim) +
+                  "AUTO_DT = SI")
+            sys.exit(1)
+        else:
+            pass
+
+    print("\nConjunto de Monte Carlo de {:d} miembros, ".
+          format(n_miembros) + "en lotes de {:d}".format(n_lote))
+    print("Integrador: {}".format('ADI' if p['integrador']=='ADI'
+                                  else 'explícito'))
+    for nombre, columna in zip(('E_L', 'E_T', 'F'), muestras.T):
+        print("\t{}: media {:.3e}, desvío {:.3e}, rango [{:.3e}, {:.3e}]".
+              format(nombre, columna.mean(), columna.std(),
+                     columna.min(), columna.max()))
+
+    print("Paso temporal: {:.1f} s".format(dt))
+
+    # Tiempos de escritura
+    t_final = p['t_total']*60
+    n_pasos = np.arange(dt, t_final+dt, dt)
+    t_escritura = [t for t in n_pasos if (t/60)%t_sol==0]
+
+    acumular, resultados = armar_estadisticas(len(t_escritura), (ny, nx),
+                                              c_limite=c_limite)
+
+    print("\nEjecutando bucle de solución:")
+    print("-----------------------------")
+
+    for inicio in range(0, n_miembros, n_lote):
+        fin = min(inicio + n_lote, n_miembros)
+
+        # Parámetros del lote, de forma (N, 1, 1)
+        p_lote = dict(p, D_l=dif_long[inicio:fin,np.newaxis,np.newaxis],
+                      D_t=dif_trans[inicio:fin,np.newaxis,np.newaxis])
+
+        paso = cna_main.armar_paso(p_lote, dt)
+
+        u_ini = np.zeros((fin-inicio, ny, nx))
+        i_t = 0
+        for t in n_pasos:
+            u_ini = paso(u_ini)
+
+            if (t/60)%t_sol==0:
+                acumular(i_t, u_ini/p['v_cel'])
+                i_t += 1
+
+        print("\tMiembros {:d} a {:d} de {:d}".
+              format(inicio+1, fin, n_miembros))
+
+    # Escritura de las estadísticas
+    dir_mc = p['dir_sol'] + "_mc"
+    os.makedirs(dir_mc, exist_ok=True)
+
+    np.savetxt(os.path.join(os.getcwd(), dir_mc, "muestras"), muestras,
+               fmt='%.6e', header="Parámetros de cada miembro\nE_L E_T F")
+
+    archivos = [("media", "Media de la concentración [kg/m^3]"),
+                ("varianza", "Varianza de la concentración [(kg/m^3)^2]")]
+    if c_limite > 0:
+        archivos.append(("prob_exc", "Probabilidad de superar " +
+                         "{:.3e} kg/m^3".format(c_limite)))
+
+    # Un almacén por estadística
+    almacenes = [cna_almacen.crear_almacen(
+        os.path.join(dir_mc, nombre), forma=(ny, nx),
+        n_max=len(t_escritura),
+        meta={'dx': p['dx'], 'dy': p['dy'], 'dt': dt,
+              'theta': p['theta'], 'n_miembros': n_miembros,
+              'descripcion': descripcion + ", conjunto de " +
+              "{:d} miembros".format(n_miembros)})
+        for nombre, descripcion in archivos]
+
+    for i_t, t in enumerate(t_escritura):
+        campos = resultados(i_t)
+
+        for agregar, campo in zip(almacenes, campos):
+            agregar(t, campo)
+
+        print("\nTiempo: {:.1f} min".format(t/60))
+        print("\tMáximo de la media: {:.3e} kg/m^3, ".
+              format(campos[0].max()) +
+              "máximo del desvío: {:.3e} kg/m^3".
+              format(np.sqrt(campos[1].max())))
+        if c_limite > 0:
+            print("\tNodos con probabilidad de superar el límite " +
+                  "mayor a 0.5: {:d}".format(np.count_nonzero(
+                      campos[2] > 0.5)))
+
+    print("\nEstadísticas guardadas en '{}'".format(dir_mc))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ + " <archivo_input>")
+        sys.exit(1)
+
+    main(sys.argv[1])
+
+#**** FIN PROGRAMA ****#
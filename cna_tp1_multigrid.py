@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_multigrid.py'
+
+Contiene el solver multigrilla geométrico del sistema A u = b sobre la
+malla rectangular uniforme de nx*ny celdas del programa principal.
+
+La jerarquía de mallas se obtiene agrupando celdas de a 2 en cada
+dirección (o sólo en la que tenga más de 'n_min' celdas). La
+prolongación P es la interpolación bilineal de celdas centradas, producto
+kronecker de las interpolaciones 1D, y la matriz de cada malla gruesa es
+la de Galerkin, A_g = P^T A P, por lo que las condiciones Neumann de
+cualquier combinación de bordes se heredan sin tratamiento especial. Los
+nodos Dirichlet (filas identidad) se excluyen de la interpolación, de modo
+que las mallas gruesas conservan el efecto de esos bordes.
+
+El suavizador es Gauss-Seidel por líneas en cebra, alternando líneas
+según 'x' y según 'y'. Cada grupo de líneas (pares o impares) se resuelve
+a la vez con el algoritmo de Thomas, de modo que la anisotropía entre
+E_L y E_T y el acoplamiento advectivo según 'x' quedan resueltos dentro
+de las líneas. La malla más gruesa se resuelve con LU.
+
+El costo de cada ciclo V es proporcional a la cantidad de celdas.
+"""
+
+import sys
+import time
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as splinalg
+import cna_tp1_adi as cna_adi
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def prolongacion_1D(n_el_fino=2):
+    """
+    Función que devuelve la matriz de prolongación 1D, de forma
+    (n_el_fino, ceil(n_el_fino/2)), de la interpolación lineal de celdas
+    centradas: la celda fina 2I toma 3/4 de la gruesa I y 1/4 de la I-1,
+    y la celda 2I+1 toma 3/4 de la gruesa I y 1/4 de la I+1. En los bordes
+    el peso de la celda gruesa inexistente pasa a la celda I.
+    """
+
+    n_el_grueso = (n_el_fino + 1) // 2
+
+    fino = np.arange(n_el_fino)
+    grueso = fino // 2
+
+    # Celda gruesa vecina: la anterior para celdas finas pares y la
+    # siguiente para las impares
+    vecino = np.where(fino % 2 == 0, grueso - 1, grueso + 1)
+    en_borde = (vecino < 0) | (vecino >= n_el_grueso)
+
+    filas = np.concatenate((fino, fino[~en_borde]))
+    cols = np.concatenate((grueso, vecino[~en_borde]))
+    pesos = np.concatenate((np.where(en_borde, 1.0, 0.75),
+                            np.full(np.count_nonzero(~en_borde), 0.25)))
+
+    # Fin función 'prolongacion_1D'
+    return sp.csr_matrix((pesos, (filas, cols)),
+                         shape=(n_el_fino, n_el_grueso))
+#%%
+
+#%%
+def armar_suavizador(matriz_A, forma):
+    """
+    Función que devuelve una función 'suavizar(vec_b, vec_x)' que efectúa
+    un barrido de Gauss-Seidel por líneas en cebra sobre vec_x (que se
+    modifica): líneas 'x' pares, 'x' impares, 'y' pares e 'y' impares.
+
+    'forma' es la forma (ny, nx) del campo, numerado con 'x' más rápida.
+    """
+
+    n_el_y, n_el_x = forma
+    matriz_A = sp.csr_matrix(matriz_A)
+    n_el_total = n_el_x * n_el_y
+
+    diag_ppal = matriz_A.diagonal()
+
+    # Acoplamientos dentro de las líneas 'x' (desfazajes -1, 1, sin
+    # pasar de una línea a la siguiente)
+    inf_x = np.zeros(n_el_total)
+    sup_x = np.zeros(n_el_total)
+    inf_x[1:] = matriz_A.diagonal(-1)
+    sup_x[:-1] = matriz_A.diagonal(1)
+    inf_x[0::n_el_x] = 0
+    sup_x[n_el_x-1::n_el_x] = 0
+
+    # Acoplamientos dentro de las líneas 'y' (desfazajes -nx, nx)
+    inf_y = np.zeros(n_el_total)
+    sup_y = np.zeros(n_el_total)
+    if n_el_y > 1:
+        inf_y[n_el_x:] = matriz_A.diagonal(-n_el_x)
+        sup_y[:-n_el_x] = matriz_A.diagonal(n_el_x)
+
+    # Resto de la matriz, fuera de las líneas de cada dirección
+    def resto(inf, sup, desfazaje):
+        matriz_T = sp.diags([inf[desfazaje:], diag_ppal, sup[:-desfazaje]],
+                            [-desfazaje, 0, desfazaje],
+                            shape=matriz_A.shape, format='csr')
+        matriz_R = (matriz_A - matriz_T).tocsr()
+        matriz_R.eliminate_zeros()
+        return matriz_R
+
+    resto_x = resto(inf_x, sup_x, 1)
+    resto_y = resto(inf_y, sup_y, n_el_x) if n_el_y > 1 else \
+        (matriz_A - sp.diags(diag_ppal)).tocsr()
+
+    # Sistemas de cada grupo de líneas. Líneas 'x': eje 0 a lo largo de
+    # 'x' (campo transpuesto). Líneas 'y': eje 0 a lo largo de 'y'
+    grupos_x = []
+    grupos_y = []
+    for paridad in (0, 1):
+        if paridad < n_el_y:
+            grupos_x.append((paridad, cna_adi.armar_thomas(
+                *[np.ascontiguousarray(d.reshape(forma)[paridad::2].T)
+                  for d in (inf_x, diag_ppal, sup_x)])))
+        if paridad < n_el_x:
+            grupos_y.append((paridad, cna_adi.armar_thomas(
+                *[np.ascontiguousarray(d.reshape(forma)[:,paridad::2])
+                  for d in (inf_y, diag_ppal, sup_y)])))
+
+    def suavizar(vec_b, vec_x):
+        campo_x = vec_x.reshape(forma)
+
+        # Líneas 'x', pares e impares
+        for paridad, thomas in grupos_x:
+            vec_r = (vec_b - resto_x @ vec_x).reshape(forma)
+            campo_x[paridad::2] = thomas(
+                np.ascontiguousarray(vec_r[paridad::2].T)).T
+
+        # Líneas 'y', pares e impares
+        for paridad, thomas in grupos_y:
+            vec_r = (vec_b - resto_y @ vec_x).reshape(forma)
+            campo_x[:,paridad::2] = thomas(
+                np.ascontiguousarray(vec_r[:,paridad::2]))
+
+        return vec_x
+
+    # Fin función 'armar_suavizador'
+    return suavizar
+#%%
+
+#%%
+def armar_multigrilla(matriz_A, forma, n_min=4, n_el_grueso=2000):
+    """
+    Función que arma la jerarquía de mallas y devuelve una función
+    'ciclo_v(vec_b, vec_x=None)' que efectúa un ciclo V sobre A x = b,
+    partiendo de vec_x (o de 0), y devuelve la nueva aproximación.
+
+    'forma' es la forma (ny, nx) del campo. Se engrosa una dirección
+    mientras tenga más de 'n_min' celdas, hasta que la malla tenga a lo
+    sumo 'n_el_grueso' celdas. Esa malla se resuelve con LU.
+    """
+
+    t_ini = time.perf_counter()
+
+    matriz_A = sp.csr_matrix(matriz_A)
+
+    # Niveles de la jerarquía: (A, forma, suavizador, P)
+    niveles = []
+    while True:
+        n_el_y, n_el_x = forma
+        engrosar_x = n_el_x > n_min
+        engrosar_y = n_el_y > n_min
+
+        if n_el_x*n_el_y <= n_el_grueso or \
+           not (engrosar_x or engrosar_y):
+            break
+
+        P_x = prolongacion_1D(n_el_x) if engrosar_x else \
+            sp.identity(n_el_x, format='csr')
+        P_y = prolongacion_1D(n_el_y) if engrosar_y else \
+            sp.identity(n_el_y, format='csr')
+
+        # Numeración con 'x' más rápida: P = P_y (x) P_x
+        P = sp.kron(P_y, P_x, format='csr')
+
+        # Los nodos fijos (filas identidad, como las Dirichlet) no se
+        # interpolan: su valor es exacto tras el suavizado. Así la matriz
+        # gruesa sólo acopla nodos libres y conserva el efecto del borde
+        matriz_A.eliminate_zeros()
+        fijos = (np.diff(matriz_A.indptr) == 1) & \
+            (matriz_A.diagonal() != 0)
+        P = (sp.diags((~fijos).astype(float)) @ P).tocsr()
+
+        niveles.append((matriz_A, forma, armar_suavizador(matriz_A, forma),
+                        P))
+
+        # Matriz de Galerkin. Las celdas gruesas sin nodos libres quedan
+        # desacopladas, con diagonal unitaria
+        matriz_A = (P.T @ matriz_A @ P).tocsr()
+        vacias = np.asarray(abs(P).sum(axis=0)).ravel() == 0
+        matriz_A = (matriz_A + sp.diags(vacias.astype(float))).tocsr()
+        forma = (P_y.shape[1], P_x.shape[1])
+
+    factor_grueso = splinalg.splu(matriz_A.tocsc())
+
+    t_armado = time.perf_counter() - t_ini
+
+    print("\nMultigrilla geométrica de la matriz 'A'")
+    print("\tNiveles: {:d}, malla más gruesa: {:d} x {:d}".
+          format(len(niveles)+1, forma[1], forma[0]))
+    print("\tTiempo de armado: {:.3f} s".format(t_armado))
+
+    def ciclo(nivel, vec_b, vec_x):
+        if nivel == len(niveles):
+            return factor_grueso.solve(vec_b)
+
+        matriz_A, _, suavizar, P = niveles[nivel]
+
+        # Pre-suavizado, corrección en la malla gruesa y post-suavizado
+        suavizar(vec_b, vec_x)
+        vec_r = P.T @ (vec_b - matriz_A @ vec_x)
+        vec_x += P @ ciclo(nivel+1, vec_r, np.zeros(P.shape[1]))
+        suavizar(vec_b, vec_x)
+
+        return vec_x
+
+    def ciclo_v(vec_b, vec_x=None):
+        vec_b = np.ravel(vec_b)
+        if vec_x is None:
+            vec_x = np.zeros(vec_b.shape)
+        else:
+            vec_x = np.array(vec_x, dtype=float).ravel()
+
+        return ciclo(0, vec_b, vec_x)
+
+    # Fin función 'armar_multigrilla'
+    return ciclo_v
+#%%
+
+#%%
+def armar_solver_multigrilla(matriz_A, forma, tol=1e-10, max_ciclos=100,
+                             registro=None):
+    """
+    Función que prepara la solución del sistema A x = b con ciclos V de
+    multigrilla (ver 'armar_multigrilla') y devuelve una función
+    'resolver(vec_b, vec_x0=None)'.
+
+    Los ciclos se repiten, partiendo de 'vec_x0', hasta que el residuo
+    relativo sea menor a 'tol' o hasta 'max_ciclos' ciclos. Si se pasa
+    una lista en 'registro', se agrega a ella la cantidad de ciclos de
+    cada solución.
+    """
+
+    if forma is None:
+        print("Error en función 'armar_solver_multigrilla'")
+        print("Forma del campo no especificada")
+        sys.exit(1)
+    else:
+        pass
+
+    matriz_A = sp.csr_matrix(matriz_A)
+    ciclo_v = armar_multigrilla(matriz_A, forma)
+
+    def resolver(vec_b, vec_x0=None):
+        vec_b = np.ravel(vec_b)
+        norma_b = max(np.linalg.norm(vec_b), np.finfo(float).tiny)
+
+        vec_x = np.zeros(vec_b.shape) if vec_x0 is None else \
+            np.array(vec_x0, dtype=float).ravel()
+
+        ciclos = 0
+        residuo = np.linalg.norm(vec_b - matriz_A @ vec_x) / norma_b
+        while residuo > tol and ciclos < max_ciclos:
+            vec_x = ciclo_v(vec_b, vec_x)
+            residuo = np.linalg.norm(vec_b - matriz_A @ vec_x) / norma_b
+            ciclos += 1
+
+        if residuo > tol:
+            print("\tAdvertencia: MULTIGRID no convergió a la " +
+                  "tolerancia pedida ({:d} ciclos)".format(ciclos))
+
+        if registro is not None:
+            registro.append(ciclos)
+
+        return vec_x
+
+    # Fin función 'armar_solver_multigrilla'
+    return resolver
+#%%
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_respuesta.py'
+
+Programa que calcula y evalúa la biblioteca de respuestas a un pulso
+unitario de descarga en el nodo de la forzante.
+
+El sistema discreto del programa principal es lineal e invariante en el
+tiempo, y la descarga sólo entra por el nodo de la forzante. Si la
+descarga es constante por bloques de 'T_RESP' minutos, el campo al fin del
+bloque n es
+
+    u_n = sum_b q_b R_(n-b)
+
+con q_b la descarga [kg/s] del bloque b y R_m el campo m bloques después
+de un pulso de 1 kg/s durante un único bloque. Las respuestas R_m se
+calculan una única vez con el integrador del archivo de entrada ('armar')
+y cada escenario de descarga se evalúa luego con la convolución, sin
+volver a simular ('evaluar'). Las fuentes adicionales ('FUENTE'), de
+descarga fija, se simulan también una única vez y su campo se suma al de
+cada escenario.
+
+Modo de uso:
+    cna_tp1_respuesta.py armar <archivo_input>
+    cna_tp1_respuesta.py evaluar <archivo_input> <tabla_descarga>
+
+La tabla de descarga tiene dos columnas: tiempo [min] y descarga
+[kg/día]. Cada valor rige desde su tiempo hasta el de la fila siguiente
+(antes de la primera fila la descarga es nula), y se evalúa al inicio de
+cada bloque.
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_almacen as cna_almacen
+
+import numpy as np
+import os
+import sys
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def firma(p):
+    """
+    Función que devuelve los parámetros de 'p' (ver
+    'cna_tp1_main.parametros') de los que depende la biblioteca de
+    respuestas, para verificar que corresponde al archivo de entrada.
+    """
+
+    claves = ('vel', 'D_l', 'D_t', 'cu_c_dec', 'dx', 'dy', 'dt', 'nx',
+              'ny', 'theta', 'upw', 'integrador', 'xforz', 'yforz')
+
+    dicc_firma = {clave: p[clave] for clave in claves}
+    dicc_firma['bordes_Dir'] = sorted(p['bordes_Dir'])
+    dicc_firma['fuentes_adic'] = [arreglo.tolist()
+                                  for arreglo in p['fuentes_adic']]
+
+    # Fin función 'firma'
+    return repr(dicc_firma)
+#%%
+
+#%%
+def ruta_biblioteca(p):
+    """
+    Función que devuelve la ruta del archivo de la biblioteca de
+    respuestas, en el directorio de trabajo.
+    """
+
+    # Fin función 'ruta_biblioteca'
+    return os.path.join(os.getcwd(), "cna_tp1_resp_dx{}_dy{}_dt{}_theta{}".
+                        format(p['dx'],p['dy'],p['dt'],p['theta']) +
+                        ".npz")
+#%%
+
+#%%
+def armar_biblioteca(p, t_bloque=1.0):
+    """
+    Función que calcula las respuestas R_m, m = 1, ..., M, a un pulso de
+    descarga de 1 kg/s durante un bloque de 't_bloque' minutos, hasta el
+    tiempo total 'p['t_total']'.
+
+    Devuelve un arreglo de forma (M, ny, nx), con R_m en la posición m-1,
+    en kg por nodo, y otro de igual forma con el campo de las fuentes
+    adicionales ('FUENTE'), de descarga fija, al fin de cada bloque.
+    """
+
+    if p['integrador'] not in ('THETA', 'ADI'):
+        print("Error en función 'armar_biblioteca'")
+        print("La biblioteca requiere el integrador 'THETA' o 'ADI'")
+        sys.exit(1)
+    else:
+        pass
+
+    dt = p['dt']
+    pasos_bloque = int(round(t_bloque*60/dt))
+
+    if pasos_bloque < 1 or \
+       not np.isclose(pasos_bloque*dt, t_bloque*60):
+        print("Error en función 'armar_biblioteca'")
+        print("T_RESP debe ser múltiplo de DT")
+        sys.exit(1)
+    else:
+        pass
+
+    n_bloques = int(np.ceil(p['t_total']/t_bloque - 1e-9))
+
+    # Un único paso, con la matriz factorizada una vez, en el nodo de la
+    # forzante (primera posición) y en los de las fuentes adicionales. La
+    # masa volcada en cada nodo se da en cada paso: pulso unitario de
+    # 1 kg/s en el nodo de la forzante, sin descarga o con las fuentes
+    # adicionales
+    pos_x = np.concatenate(([p['xforz']], p['fuentes_adic'][0]))
+    pos_y = np.concatenate(([p['yforz']], p['fuentes_adic'][1]))
+    paso = cna_main.armar_paso(
+        p, dt, fuentes=(pos_x.astype(int), pos_y.astype(int),
+                        np.zeros(len(pos_x))))
+
+    forz_libre = np.zeros(len(pos_x))
+    forz_pulso = np.copy(forz_libre)
+    forz_pulso[0] = dt
+    forz_fijas = np.concatenate(([0.0], p['fuentes_adic'][2])) * dt
+
+    hay_fijas = len(p['fuentes_adic'][0]) > 0
+
+    forma = (p['ny'], p['nx'])
+    respuestas = np.empty((n_bloques,) + forma)
+    fijas = np.zeros((n_bloques,) + forma)
+
+    u = np.zeros(forma) if (p['integrador']=='ADI' or p['theta']==0.0) \
+        else np.zeros(p['nt'])
+    u_fijas = np.copy(u)
+
+    for m in range(n_bloques):
+        forz = forz_pulso if m == 0 else forz_libre
+        for _ in range(pasos_bloque):
+            u = np.copy(paso(u, forz))
+            if hay_fijas:
+                u_fijas = np.copy(paso(u_fijas, forz_fijas))
+
+        respuestas[m] = np.reshape(u, forma)
+        fijas[m] = np.reshape(u_fijas, forma)
+
+        print("\tRespuesta al pulso, bloque {:d} de {:d}".
+              format(m+1, n_bloques))
+
+    # Fin función 'armar_biblioteca'
+    return respuestas, fijas
+#%%
+
+#%%
+def descarga_bloques(tabla, n_bloques, t_bloque=1.0):
+    """
+    Función que devuelve la descarga [kg/s] de cada uno de los
+    'n_bloques' bloques de 't_bloque' minutos, a partir de la tabla de
+    tiempos [min] y descargas [kg/día] (ver el encabezado del programa).
+    """
+
+    tabla = np.atleast_2d(tabla)
+    orden = np.argsort(tabla[:,0], kind='stable')
+    t_tabla = tabla[orden,0]
+    q_tabla = tabla[orden,1]
+
+    # Valor vigente al inicio de cada bloque
+    t_ini_bloques = np.arange(n_bloques) * t_bloque
+    fila = np.searchsorted(t_tabla, t_ini_bloques + 1e-9, side='right') - 1
+
+    q_dia = np.where(fila >= 0, q_tabla[np.maximum(fila, 0)], 0.0)
+
+    # Fin función 'descarga_bloques'
+    return q_dia / (3600 * 24)
+#%%
+
+#%%
+def convolucion(respuestas, q_bloques, n_fin):
+    """
+    Función que devuelve los campos al fin de los bloques 'n_fin' (lista
+    de enteros), con u_n = sum_b q_b R_(n-b), como arreglo de forma
+    (len(n_fin), ny, nx).
+
+    La suma para todos los tiempos es un único producto de la matriz de
+    descargas desfazadas por las respuestas.
+    """
+
+    n_bloques = respuestas.shape[0]
+    n_fin = np.asarray(n_fin)
+
+    # Matriz de descargas: fila i, columna m - 1 con q_(n_i - m)
+    m = np.arange(1, n_bloques+1)
+    indice = n_fin[:,np.newaxis] - m[np.newaxis,:]
+    matriz_q = np.where(indice >= 0, q_bloques[np.maximum(indice, 0)], 0.0)
+
+    campos = matriz_q @ respuestas.reshape(n_bloques, -1)
+
+    # Fin función 'convolucion'
+    return campos.reshape((len(n_fin),) + respuestas.shape[1:])
+#%%
+
+#**** PROGRAMA ****#
+
+def main(modo, archivo_input, archivo_tabla=None):
+
+    print("Ejecutando programa " + __file__)
+
+    vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
+
+    t_bloque = vs['T_RESP'] # [min]
+    ruta = ruta_biblioteca(p)
+
+    if modo=='armar':
+        print("\nBiblioteca de respuestas al pulso unitario")
+        print("Bloques de {:.2f} min hasta {:.1f} min".
+              format(t_bloque, p['t_total']))
+
+        respuestas, fijas = armar_biblioteca(p, t_bloque=t_bloque)
+
+        np.savez(ruta, respuestas=respuestas, fijas=fijas,
+                 t_bloque=t_bloque, firma=firma(p), v_cel=p['v_cel'])
+
+        print("\nBiblioteca guardada en '{}'".format(ruta))
+
+    else: # modo=='evaluar'
+        if not os.path.isfile(ruta):
+            print("Biblioteca '{}' inexistente. ".format(ruta) +
+                  "Debe armarse con el modo 'armar'")
+            sys.exit(1)
+        else:
+            pass
+
+        biblioteca = np.load(ruta)
+        if str(biblioteca['firma']) != firma(p) or \
+           float(biblioteca['t_bloque']) != t_bloque:
+            print("La biblioteca '{}' no corresponde ".format(ruta) +
+                  "al archivo de entrada")
+            sys.exit(1)
+        else:
+            pass
+
+        respuestas = biblioteca['respuestas']
+        n_bloques = respuestas.shape[0]
+
+        tabla = np.loadtxt(archivo_tabla, comments='#', ndmin=2)
+        q_bloques = descarga_bloques(tabla, n_bloques, t_bloque=t_bloque)
+
+        # Tiempos de escritura, múltiplos de T_SOL, en bloques
+        t_sol = vs['T_SOL'] # [min]
+        t_salida = np.arange(t_sol, p['t_total']+t_sol/2, t_sol)
+        n_fin = np.round(t_salida/t_bloque).astype(int)
+
+        if not np.allclose(n_fin*t_bloque, t_salida) or \
+           n_fin.max() > n_bloques:
+            print("T_SOL debe ser múltiplo de T_RESP")
+            sys.exit(1)
+        else:
+            pass
+
+        # Campo del escenario más el de las fuentes adicionales
+        campos = convolucion(respuestas, q_bloques, n_fin) + \
+            biblioteca['fijas'][n_fin-1]
+
+        nombre = os.path.splitext(os.path.basename(archivo_tabla))[0]
+        dir_esc = p['dir_sol'] + "_esc_" + nombre
+        guardar = cna_almacen.crear_almacen(
+            dir_esc, forma=(p['ny'], p['nx']), n_max=len(t_salida),
+            meta={'dx': p['dx'], 'dy': p['dy'], 'dt': p['dt'],
+                  'theta': p['theta'],
+                  'descripcion': "Escenario de descarga " +
+                  "'{}'".format(archivo_tabla)})
+
+        for t_min, campo in zip(t_salida, campos):
+            sol_concentracion = campo/p['v_cel']
+            guardar(t_min*60, sol_concentracion)
+
+            print("Tiempo: {:.1f} min, ".format(t_min) +
+                  "valor máximo de concentración: " +
+                  "{:.3e} kg/m^3".format(sol_concentracion.max()))
+
+        print("\nEscenario guardado en '{}'".format(dir_esc))
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == 'armar':
+        main(sys.argv[1], sys.argv[2])
+    elif len(sys.argv) == 4 and sys.argv[1] == 'evaluar':
+        main(sys.argv[1], sys.argv[2], sys.argv[3])
+    else:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ + " armar <archivo_input>")
+        print("             " + __file__ +
+              " evaluar <archivo_input> <tabla_descarga>")
+        sys.exit(1)
+
+#**** FIN PROGRAMA ****#
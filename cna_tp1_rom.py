@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_rom.py'
+
+Programa que arma y evalúa un modelo reducido POD/Galerkin del problema.
+
+La base POD V, de r modos ortonormales, se obtiene de la descomposición en
+valores singulares de las soluciones guardadas por el programa principal
+en los almacenes de uno o más directorios de entrenamiento ('armar', ver
+'cna_tp1_almacen.py'). Para cada escenario
+('evaluar') el operador L0 = D2x + D2y - D1x se proyecta sobre la base,
+L_r = V^T L0 V, y el método theta se aplica a los coeficientes a de
+u = V a, con matrices de r x r:
+
+    (I - theta dt (L_r - c_dec I)) a_n1 =
+        (I + (1-theta) dt (L_r - c_dec I)) a_n + dt V^T q
+
+El decaimiento, la descarga, las fuentes y el tiempo total pueden
+cambiar respecto del entrenamiento; la malla y los bordes no.
+
+Error estimado: el error e = u - V a respecto del método theta completo,
+con A = I - theta dt L y B = I + (1-theta) dt L, L = L0 - c_dec I y las
+filas Dirichlet nulas, cumple
+
+    A e_n1 = B e_n + dt f(theta a_n1 + (1-theta) a_n)
+
+con f(a) = (I - V V^T) (L V a + q), el residuo de Galerkin, fuera de la
+base. Con A^-1 y A^-1 B de norma cercana a 1 el error queda acotado por
+el residuo acumulado, ||e_n|| <= sum dt ||f(a_w)||. La norma del residuo
+es una forma cuadrática de a,
+
+    ||f(a)||^2 = a^T W^T W a + 2 a^T W^T f_q + ||f_q||^2
+
+con W = (I - V V^T) L V y f_q = (I - V V^T) q, cuyas proyecciones se
+calculan una única vez por escenario, por lo que la estimación tiene el
+costo r x r del avance. Se informa el error relativo estimado
+sum dt ||f|| / ||a|| en los tiempos de escritura. Si supera 'TOL_ROM' se
+recomienda el solver completo.
+
+Modo de uso:
+    cna_tp1_rom.py armar <archivo_input> <dir_sol_1> [<dir_sol_2> ...]
+    cna_tp1_rom.py evaluar <archivo_input>
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_armado as cna_armado
+import cna_tp1_almacen as cna_almacen
+
+import numpy as np
+import os
+import scipy.linalg as linalg
+import scipy.sparse as sp
+import sys
+import time
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def firma(p):
+    """
+    Función que devuelve los parámetros de malla y bordes de 'p' de los
+    que depende la base POD.
+    """
+
+    dicc_firma = {clave: p[clave] for clave in ('nx', 'ny', 'dx', 'dy')}
+    dicc_firma['bordes_Dir'] = sorted(p['bordes_Dir'])
+
+    # Fin función 'firma'
+    return repr(dicc_firma)
+#%%
+
+#%%
+def ruta_modelo(p):
+    """
+    Función que devuelve la ruta del archivo del modelo reducido, en el
+    directorio de trabajo.
+    """
+
+    # Fin función 'ruta_modelo'
+    return os.path.join(os.getcwd(), "cna_tp1_rom_dx{}_dy{}.npz".
+                        format(p['dx'], p['dy']))
+#%%
+
+#%%
+def armar_base(instantaneas, n_modos=40, tol_pod=1e-8):
+    """
+    Función que devuelve la base POD de las columnas de 'instantaneas',
+    de forma (nx*ny, r), y los valores singulares de todas ellas.
+
+    Se conservan los modos de valor singular relativo al primero mayor a
+    'tol_pod', hasta 'n_modos' modos.
+    """
+
+    base, val_sing, _ = np.linalg.svd(instantaneas, full_matrices=False)
+
+    n_sig = np.count_nonzero(val_sing > tol_pod * val_sing[0])
+    n_modos = max(min(int(n_modos), n_sig), 1)
+
+    # Fin función 'armar_base'
+    return base[:,:n_modos], val_sing
+#%%
+
+#%%
+def armar_reducido(p, base):
+    """
+    Función que proyecta sobre 'base' el operador L0 = D2x + D2y - D1x
+    del escenario 'p' (sin decaimiento) y devuelve L_r = V^T L0 V y el
+    operador completo L = L0 - c_dec I, con las filas Dirichlet nulas,
+    para el residuo de la estimación del error.
+    """
+
+    diags_L, offsets_L = cna_armado.diagonales_M(
+        n_el_x=p['nx'], n_el_y=p['ny'], delta_x=p['dx'], delta_y=p['dy'],
+        delta_t=1, vel=p['vel'], dif_long=p['D_l'], dif_trans=p['D_t'],
+        c_dec=0, upwinding=p['upw'])
+
+    mascara = np.ravel(p['mascara_Dir']).astype(float)
+    L0 = sp.diags(1.0 - mascara) @ cna_armado.matriz_diagonales(diags_L,
+                                                                 offsets_L)
+
+    L = sp.csc_matrix(L0 - p['cu_c_dec']*sp.diags(1.0 - mascara))
+
+    # Fin función 'armar_reducido'
+    return base.T @ (L0 @ base), L
+#%%
+
+#%%
+def avanzar_reducido(p, base, theta=0.5, t_sol=5, vec_q=None):
+    """
+    Función que avanza el modelo reducido de 'base' para el escenario 'p'
+    con paso fijo 'dt' hasta 't_total', con la descarga 'vec_q' [kg/seg
+    por nodo], y devuelve los tiempos de escritura (múltiplos de 't_sol'
+    minutos) [s], los coeficientes de la base en esos tiempos, de forma
+    (n_t, r), y el error relativo estimado en cada uno.
+    """
+
+    n_modos = base.shape[1]
+    dt = p['dt']
+    c_dec = p['cu_c_dec']
+
+    L_r, L = armar_reducido(p, base)
+    q_r = base.T @ vec_q
+
+    ident = np.identity(n_modos)
+    L_c = L_r - c_dec*ident
+    factor_A = linalg.lu_factor(ident - theta*dt*L_c)
+    B_r = ident + (1-theta)*dt*L_c
+
+    # Proyecciones del residuo de Galerkin fuera de la base, calculadas
+    # una única vez: ||f(a)||^2 = a^T G a + 2 a^T h + c
+    W = L @ base
+    W -= base @ (base.T @ W)
+    f_q = vec_q - base @ q_r
+    G = W.T @ W
+    h = W.T @ f_q
+    c = f_q @ f_q
+
+    t_final = p['t_total']*60
+    n_pasos = np.arange(dt, t_final+dt, dt)
+
+    a_ini = np.zeros(n_modos)
+    error = 0.0
+
+    tiempos = []
+    coefs = []
+    errores = []
+    for t in n_pasos:
+        a_n1 = linalg.lu_solve(factor_A, B_r @ a_ini + dt*q_r)
+
+        # Residuo acumulado del paso, con a_w = theta a_n1 + (1-theta) a_n
+        a_w = theta*a_n1 + (1-theta)*a_ini
+        error += dt*np.sqrt(max(a_w @ (G @ a_w) + 2*(a_w @ h) + c, 0.0))
+
+        if (t/60)%t_sol==0:
+            tiempos.append(t)
+            coefs.append(a_n1)
+
+            # ||V a|| = ||a||, con la base ortonormal
+            errores.append(error / max(np.linalg.norm(a_n1),
+                                       np.finfo(float).tiny))
+
+        a_ini = a_n1
+
+    # Fin función 'avanzar_reducido'
+    return np.array(tiempos), np.array(coefs), np.array(errores)
+#%%
+
+#**** PROGRAMA ****#
+
+def main(modo, archivo_input, dirs_entrenamiento=()):
+
+    print("Ejecutando programa " + __file__)
+
+    vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
+    ruta = ruta_modelo(p)
+
+    if modo=='armar':
+        # Soluciones de los almacenes de entrenamiento
+        campos = [cna_almacen.leer_almacen(dir_sol)[1]
+                  for dir_sol in dirs_entrenamiento]
+
+        if sum(len(campos_k) for campos_k in campos)==0:
+            print("No hay soluciones en los directorios de entrenamiento")
+            sys.exit(1)
+        else:
+            pass
+
+        # Una columna por solución
+        instantaneas = np.concatenate(
+            [campos_k.reshape(len(campos_k), -1) for campos_k in campos]).T
+
+        if instantaneas.shape[0] != p['nt']:
+            print("Las soluciones de entrenamiento no corresponden " +
+                  "a la malla del archivo de entrada")
+            sys.exit(1)
+        else:
+            pass
+
+        base, val_sing = armar_base(instantaneas, n_modos=vs['N_MODOS'],
+                                    tol_pod=vs['TOL_POD'])
+
+        energia = (val_sing[:base.shape[1]]**2).sum() / (val_sing**2).sum()
+
+        print("\nBase POD de {:d} soluciones de entrenamiento".
+              format(instantaneas.shape[1]))
+        print("\tModos: {:d}, energía conservada: 1 - {:.3e}".
+              format(base.shape[1], 1-energia))
+
+        np.savez(ruta, base=base, val_sing=val_sing, firma=firma(p))
+
+        print("\nModelo reducido guardado en '{}'".format(ruta))
+
+    else: # modo=='evaluar'
+        if not os.path.isfile(ruta):
+            print("Modelo reducido '{}' inexistente. ".format(ruta) +
+                  "Debe armarse con el modo 'armar'")
+            sys.exit(1)
+        else:
+            pass
+
+        modelo = np.load(ruta)
+        if str(modelo['firma']) != firma(p):
+            print("El modelo '{}' no corresponde a la ".format(ruta) +
+                  "malla y los bordes del archivo de entrada")
+            print("Se recomienda el solver completo ('cna_tp1_main.py')")
+            sys.exit(1)
+        elif p['integrador'] not in ('THETA', 'ADI'):
+            print("El modelo reducido requiere el integrador " +
+                  "'THETA' o 'ADI'")
+            sys.exit(1)
+        else:
+            pass
+
+        base = modelo['base']
+
+        # Con ADI se usa Crank-Nicolson, del mismo orden
+        theta = 0.5 if p['integrador']=='ADI' else p['theta']
+
+        vec_q = np.zeros(p['nt'])
+        np.add.at(vec_q, p['fuentes'][0] + p['nx']*p['fuentes'][1],
+                  p['fuentes'][2])
+
+        print("\nModelo reducido de {:d} modos, theta = {:.1f}, ".
+              format(base.shape[1], theta) +
+              "dt = {:.1f} s".format(p['dt']))
+
+        t_ini = time.perf_counter()
+        tiempos, coefs, errores = avanzar_reducido(
+            p, base, theta=theta, t_sol=vs['T_SOL'], vec_q=vec_q)
+        print("\tTiempo de cálculo: {:.3f} s".format(
+              time.perf_counter() - t_ini))
+
+        dir_rom = p['dir_sol'] + "_rom"
+        guardar = cna_almacen.crear_almacen(
+            dir_rom, forma=(p['ny'], p['nx']), n_max=len(tiempos),
+            meta={'dx': p['dx'], 'dy': p['dy'], 'dt': p['dt'],
+                  'theta': theta, 'error_estimado': errores.tolist(),
+                  'descripcion': "Modelo reducido de " +
+                  "{:d} modos".format(base.shape[1])})
+
+        for t, a_t, error in zip(tiempos, coefs, errores):
+            sol_concentracion = (base @ a_t).reshape(p['ny'], p['nx']) / \
+                p['v_cel']
+            guardar(t, sol_concentracion)
+
+            print("Tiempo: {:.1f} min, ".format(t/60) +
+                  "valor máximo de concentración: " +
+                  "{:.3e} kg/m^3, ".format(sol_concentracion.max()) +
+                  "error relativo estimado: {:.2e}".format(error))
+
+        print("\nSoluciones guardadas en '{}'".format(dir_rom))
+
+        if errores.max() > vs['TOL_ROM']:
+            print("\nEl error relativo estimado ({:.2e}) ".
+                  format(errores.max()) + "supera TOL_ROM " +
+                  "({:.1e}): se recomienda el ".format(vs['TOL_ROM']) +
+                  "solver completo ('cna_tp1_main.py') o agregar este " +
+                  "escenario al entrenamiento")
+        else:
+            print("\nError relativo estimado dentro de TOL_ROM " +
+                  "({:.1e})".format(vs['TOL_ROM']))
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == 'armar':
+        main(sys.argv[1], sys.argv[2], sys.argv[3:])
+    elif len(sys.argv) == 3 and sys.argv[1] == 'evaluar':
+        main(sys.argv[1], sys.argv[2])
+    else:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ +
+              " armar <archivo_input> <dir_sol_1> [<dir_sol_2> ...]")
+        print("             " + __file__ + " evaluar <archivo_input>")
+        sys.exit(1)
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo: 'cna_tp1_sensib.py'
+
+Programa que calcula la sensibilidad de la concentración en los puntos
+de control ('SONDA') respecto de 'VEL', 'E_L', 'E_T' y 'C_DEC', con el
+modelo tangente lineal del método theta.
+
+Derivando A u_n1 = B u_n + dt q respecto de un parámetro, con s = du/dp,
+
+    A s_n1 = B s_n + dM/dp (theta u_n1 + (1-theta) u_n)
+
+con la misma matriz A, cuya factorización se reutiliza: cada paso
+resuelve el estado y luego, con un único llamado al solver, las cuatro
+sensibilidades como columnas de una matriz de nx*ny x 4. Como M es
+lineal en vel, D_l, D_t y c_dec, dM/dp se arma con las diagonales de
+'cna_tp1_armado.diagonales_M' de cada término por separado. Las
+difusividades dependen de 'VEL', 'E_L' y 'E_T' (D = E * H * VEL * F).
+El paso 'dt' se considera fijo, aun con AUTO_DT = SI.
+
+Modo de uso:
+    cna_tp1_sensib.py <archivo_input>
+
+Se requiere el integrador 'THETA' con paso fijo y al menos una línea
+'SONDA = x y'. Las sensibilidades en los tiempos de escritura se guardan
+en el archivo 'sensibilidades' del directorio de salida seguido de
+'_sensib'.
+"""
+
+import cna_tp1_in as cna_in
+import cna_tp1_main as cna_main
+import cna_tp1_func as cna_func
+import cna_tp1_armado as cna_armado
+import cna_tp1_theta as cna_theta
+
+import numpy as np
+import os
+import scipy.sparse as sp
+import sys
+
+# Parámetros de la sensibilidad, en el orden de las columnas
+PARAMETROS = ('VEL', 'E_L', 'E_T', 'C_DEC')
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def derivadas_M(vs, p):
+    """
+    Función que devuelve la lista de matrices dM/dp de los parámetros de
+    'PARAMETROS', con M = dt*(D2x + D2y - I*c_dec - D1x) y las filas de
+    los nodos Dirichlet nulas.
+    """
+
+    args_M = dict(n_el_x=p['nx'], n_el_y=p['ny'], delta_x=p['dx'],
+                  delta_y=p['dy'], delta_t=p['dt'], upwinding=p['upw'])
+
+    # Términos de M por unidad de vel, D_l, D_t y c_dec
+    terminos = [cna_armado.matriz_diagonales(*cna_armado.diagonales_M(
+                    **args_M, **{nombre: 1}))
+                for nombre in ('vel', 'dif_long', 'dif_trans', 'c_dec')]
+    M_vel, M_long, M_trans, M_dec = terminos
+
+    # D_l = E_L * H * VEL * F y D_t = E_T * H * VEL * F
+    factor = vs['H'] * vs['F']
+    cu = 1 / (3600 * 24)
+
+    derivadas = [M_vel + factor*(vs['E_L']*M_long + vs['E_T']*M_trans),
+                 factor*vs['VEL']*M_long,
+                 factor*vs['VEL']*M_trans,
+                 cu*M_dec]
+
+    libres = sp.diags(1.0 - np.ravel(p['mascara_Dir']).astype(float))
+
+    # Fin función 'derivadas_M'
+    return [sp.csr_matrix(libres @ derivada) for derivada in derivadas]
+#%%
+
+#%%
+def armar_paso_sensibilidad(p, derivadas):
+    """
+    Función que devuelve la función 'paso(u_ini, s_ini)' que avanza un
+    paso del método theta el estado u_ini, de nx*ny elementos, y sus
+    sensibilidades s_ini, de forma (nx*ny, n_par), una columna por matriz
+    de 'derivadas', y devuelve (u_n1, s_n1). Ambos sistemas se resuelven
+    con la misma factorización de A.
+    """
+
+    theta = p['theta']
+    pos_x, pos_y, descarga = p['fuentes']
+
+    B, resolver = cna_theta.armar_sistema_theta(
+        n_el_x=p['nx'], n_el_y=p['ny'], delta_x=p['dx'],
+        delta_y=p['dy'], delta_t=p['dt'], vel=p['vel'],
+        dif_long=p['D_l'], dif_trans=p['D_t'], c_dec=p['cu_c_dec'],
+        upwinding=p['upw'], theta=theta, mascara_Dir=p['mascara_Dir'],
+        solver=p['solver'], precond=p['precond'], tol=p['tol_krylov'])
+
+    def paso(u_ini, s_ini):
+        u_rhs = cna_func.vector_rhs(mat_ind=B, vec_ini=u_ini,
+                                    val_forz=descarga*p['dt'],
+                                    pos_x=pos_x, pos_y=pos_y,
+                                    n_el_x=p['nx'], n_el_y=p['ny'])
+        u_n1 = resolver(u_rhs, u_ini)
+
+        # Término de la derivada de M, con el estado del paso
+        u_theta = theta*u_n1 + (1-theta)*u_ini
+        s_rhs = B.dot(s_ini) + np.column_stack(
+            [derivada.dot(u_theta) for derivada in derivadas])
+
+        return u_n1, resolver(s_rhs, s_ini)
+
+    # Fin función 'armar_paso_sensibilidad'
+    return paso
+#%%
+
+#**** PROGRAMA ****#
+
+def main(archivo_input):
+
+    print("Ejecutando programa " + __file__)
+
+    vs = cna_in.datos_input(archivo_input)
+    p = cna_main.parametros(vs)
+
+    if p['integrador']!='THETA' or vs['TOL_PASO'] > 0:
+        print("La sensibilidad requiere el integrador 'THETA' " +
+              "con paso fijo (TOL_PASO = 0)")
+        sys.exit(1)
+    elif len(vs['SONDAS'])==0:
+        print("No hay puntos de control: debe agregarse al menos " +
+              "una línea 'SONDA = x y'")
+        sys.exit(1)
+    else:
+        pass
+
+    nx, nt, dt, v_cel = p['nx'], p['nt'], p['dt'], p['v_cel']
+    nodos = p['sondas'][0] + nx*p['sondas'][1]
+    n_par = len(PARAMETROS)
+
+    print("\nSensibilidad respecto de {} ".format(", ".join(PARAMETROS)) +
+          "en {:d} puntos de control".format(len(nodos)))
+    print("Theta = {:.1f}, dt = {:.1f} s, solver: {}".
+          format(p['theta'], dt, p['solver']))
+
+    paso = armar_paso_sensibilidad(p, derivadas_M(vs, p))
+
+    u_ini = np.zeros(nt)
+    s_ini = np.zeros((nt, n_par))
+
+    t_sol = vs['T_SOL'] # [min]
+    t_final = p['t_total']*60
+    n_pasos = np.arange(dt, t_final+dt, dt)
+
+    print("\nEjecutando bucle de solución:")
+    print("-----------------------------")
+
+    filas = []
+    for t in n_pasos:
+        u_ini, s_ini = paso(u_ini, s_ini)
+
+        if (t/60)%t_sol==0:
+            conc = u_ini[nodos]/v_cel
+            sens = s_ini[nodos]/v_cel
+
+            print("\nTiempo: {:.1f} min".format(t/60))
+            for k, (x, y) in enumerate(vs['SONDAS']):
+                filas.append([t/60, k, x, y, conc[k], *sens[k]])
+                print("\tSonda ({:.1f}, {:.1f}): ".format(x, y) +
+                      "c = {:.3e} kg/m^3, ".format(conc[k]) +
+                      ", ".join("dc/d{} = {:.3e}".format(nombre, val)
+                                for nombre, val in zip(PARAMETROS,
+                                                       sens[k])))
+
+    dir_sens = p['dir_sol'] + "_sensib"
+    os.makedirs(dir_sens, exist_ok=True)
+    ruta = os.path.join(os.getcwd(), dir_sens, "sensibilidades")
+
+    encabezado = "Sensibilidad de la concentración [kg/m^3] en los " +\
+    "puntos de control\n" +\
+    "Theta = {:.1f}\n".format(p['theta']) +\
+    "t[min] sonda x[m] y[m] c " +\
+    " ".join("dc/d{}".format(nombre) for nombre in PARAMETROS)
+
+    np.savetxt(ruta, np.array(filas), fmt='%.6e', header=encabezado)
+
+    # Sensibilidades relativas al final: variación de c por variación
+    # unitaria relativa de cada parámetro
+    valores = np.array([vs[nombre] for nombre in PARAMETROS])
+    print("\nSensibilidad relativa p * dc/dp al tiempo final [kg/m^3]:")
+    for k, (x, y) in enumerate(vs['SONDAS']):
+        print("\tSonda ({:.1f}, {:.1f}): ".format(x, y) +
+              ", ".join("{} {:.3e}".format(nombre, val)
+                        for nombre, val in zip(PARAMETROS,
+                                               valores*s_ini[nodos[k]]/v_cel)))
+
+    print("\nSensibilidades guardadas en '{}'".format(ruta))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Error: número incorrecto de argumentos")
+        print("Modo de uso: " + __file__ + " <archivo_input>")
+        sys.exit(1)
+
+    main(sys.argv[1])
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_solver.py'
+
+Contiene las funciones que resuelven el sistema A u_n1 = u_rhs del bucle
+de solución del programa principal.
+
+La matriz A no cambia a lo largo de la simulación, por lo que la función
+armar_solver prepara la solución una única vez antes del bucle (por
+ejemplo, factorizando la matriz o armando un precondicionador) y devuelve
+una función que resuelve el sistema en cada paso temporal.
+"""
+
+import sys
+import time
+import inspect
+import numpy as np
+import scipy.linalg as linalg
+import scipy.sparse as sp
+import scipy.sparse.linalg as splinalg
+import cna_tp1_adi as cna_adi
+import cna_tp1_multigrid as cna_mg
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_precondicionador(matriz_A, precond='ILU', forma=None):
+    """
+    Función que arma el precondicionador para los métodos de Krylov, como
+    un operador lineal que aproxima la inversa de A.
+
+    Precondicionadores disponibles:
+    'ILU'       -> factorización LU incompleta ('spilu').
+    'JACOBI'    -> inversa de la diagonal de A.
+    'MULTIGRID' -> un ciclo V de multigrilla geométrica, sobre el campo
+                   de forma 'forma' (ny, nx) (ver 'cna_tp1_multigrid.py').
+    'NINGUNO'   -> sin precondicionador.
+    """
+
+    if precond=='ILU':
+        t_ini = time.perf_counter()
+        factor_ilu = splinalg.spilu(matriz_A.tocsc(),
+                                    drop_tol=1e-5, fill_factor=10)
+        t_prec = time.perf_counter() - t_ini
+
+        nnz_ilu = factor_ilu.L.nnz + factor_ilu.U.nnz
+
+        print("\nPrecondicionador ILU de la matriz 'A'")
+        print("\tTiempo de armado: {:.3f} s".format(t_prec))
+        print("\tRelleno (nnz(L+U)/nnz(A)): {:.2f}".
+              format(nnz_ilu/matriz_A.nnz))
+
+        precondicionador = splinalg.LinearOperator(
+            matriz_A.shape, matvec=factor_ilu.solve)
+
+    elif precond=='JACOBI':
+        inv_diag = 1 / matriz_A.diagonal()
+        precondicionador = sp.diags(inv_diag)
+
+    elif precond=='MULTIGRID':
+        if forma is None:
+            print("Error en función 'armar_precondicionador'")
+            print("El precondicionador 'MULTIGRID' requiere la forma " +
+                  "del campo")
+            sys.exit(1)
+        else:
+            pass
+
+        ciclo_v = cna_mg.armar_multigrilla(matriz_A, forma)
+
+        precondicionador = splinalg.LinearOperator(
+            matriz_A.shape, matvec=ciclo_v)
+
+    elif precond=='NINGUNO':
+        precondicionador = None
+
+    else:
+        print("Error en función 'armar_precondicionador'")
+        print("Precondicionador mal especificado: debe ser " +
+              "'ILU', 'JACOBI', 'MULTIGRID' o 'NINGUNO'")
+        sys.exit(1)
+
+    # Fin función 'armar_precondicionador'
+    return precondicionador
+#%%
+
+#%%
+def armar_solver_kron(matriz_A, factor_x, factor_y, mascara_Dir,
+                      cond_max=1e8):
+    """
+    Función que prepara la solución del sistema A x = b por
+    diagonalización rápida de la matriz separable
+
+        A = I - (I_y (x) T_x + T_y (x) I_x)
+
+    con T_x y T_y los factores densos de 'cna_tp1_armado.factores_kron'.
+    Devuelve una función 'resolver(vec_b, vec_x0=None)', o None si A no
+    es separable.
+
+    Los nodos Dirichlet de 'mascara_Dir' (filas identidad de A) deben
+    formar columnas y filas completas del campo. Sus valores son los de
+    b, y el sistema restante conserva la estructura de producto kronecker
+    con los factores T_x y T_y sin esas filas y columnas. Éstos se
+    descomponen en autovalores una única vez,
+
+        T_x = V_x diag(lambda_x) V_x^-1,  T_y = V_y diag(lambda_y) V_y^-1
+
+    y en cada paso el sistema se resuelve sobre el campo U de forma
+    (ny, nx) con productos de matrices densas:
+
+        W = V_y^-1 R V_x^-T / (1 - lambda_y,j - lambda_x,i)
+        U = V_y W V_x^T
+
+    con un costo por paso del orden de nx*ny*(nx+ny) y sin relleno.
+
+    Con advección dominante T_x está lejos de ser normal y sus
+    autovectores quedan mal condicionados. Si sólo una de las matrices de
+    autovectores tiene número de condición menor a 'cond_max', se
+    diagonaliza esa dirección y en la otra se resuelve, para cada
+    autovalor, un sistema tridiagonal con el algoritmo de Thomas.
+
+    Se verifica que A coincida con la matriz separable. Si no coincide, o
+    si ambas matrices de autovectores están mal condicionadas, se informa
+    el motivo y se devuelve None.
+    """
+
+    mascara_Dir = np.asarray(mascara_Dir, dtype=bool)
+    n_el_y, n_el_x = mascara_Dir.shape
+
+    # Columnas y filas del campo completamente Dirichlet
+    cols_Dir = mascara_Dir.all(axis=0)
+    filas_Dir = mascara_Dir.all(axis=1)
+
+    mascara_sep = cols_Dir[np.newaxis,:] | filas_Dir[:,np.newaxis]
+    if (mascara_sep != mascara_Dir).any():
+        print("\nLos nodos Dirichlet no forman filas y columnas " +
+              "completas: la matriz 'A' no es separable")
+        return None
+
+    cols_lib = np.flatnonzero(~cols_Dir)
+    filas_lib = np.flatnonzero(~filas_Dir)
+
+    # Nodos libres y Dirichlet, como índices del vector solución
+    nodos_lib = np.flatnonzero(~mascara_Dir)
+    nodos_Dir = np.flatnonzero(mascara_Dir)
+
+    # Factores sin las filas y columnas Dirichlet
+    factor_x = factor_x[np.ix_(cols_lib, cols_lib)]
+    factor_y = factor_y[np.ix_(filas_lib, filas_lib)]
+
+    # Verificación de la estructura de la matriz
+    matriz_A = sp.csr_matrix(matriz_A)
+    A_lib = matriz_A[nodos_lib][:,nodos_lib]
+    A_sep = sp.identity(len(nodos_lib)) - (
+        sp.kron(sp.identity(len(filas_lib)), sp.csr_matrix(factor_x)) +
+        sp.kron(sp.csr_matrix(factor_y), sp.identity(len(cols_lib))))
+
+    dif = abs(A_lib - A_sep).max() if A_lib.nnz else 0.0
+    if dif > 1e-12 * abs(A_lib).max():
+        print("\nLa matriz 'A' no coincide con el producto kronecker " +
+              "de sus factores: no es separable")
+        return None
+
+    # Filas Dirichlet de A iguales a la identidad
+    A_Dir = matriz_A[nodos_Dir]
+    if (A_Dir - sp.identity(matriz_A.shape[0],
+                            format='csr')[nodos_Dir]).nnz:
+        print("\nLas filas Dirichlet de 'A' no son la identidad")
+        return None
+
+    # Acoplamiento de los nodos libres con los nodos Dirichlet
+    A_acople = matriz_A[nodos_lib][:,nodos_Dir]
+
+    # Descomposición en autovalores de los factores
+    t_ini = time.perf_counter()
+
+    lambda_x, V_x = np.linalg.eig(factor_x)
+    lambda_y, V_y = np.linalg.eig(factor_y)
+
+    # Con autovalores reales se trabaja en aritmética real
+    if not np.imag(lambda_x).any():
+        lambda_x, V_x = np.real(lambda_x), np.real(V_x)
+    if not np.imag(lambda_y).any():
+        lambda_y, V_y = np.real(lambda_y), np.real(V_y)
+
+    cond_x = np.linalg.cond(V_x)
+    cond_y = np.linalg.cond(V_y)
+
+    print("\nDiagonalización de los factores de 'A'")
+    print("\tNúmero de condición de V_x, V_y: {:.1e}, {:.1e}".
+          format(cond_x, cond_y))
+
+    forma_lib = (len(filas_lib), len(cols_lib))
+
+    if max(cond_x, cond_y) <= cond_max:
+        # Diagonalización en ambas direcciones
+        inv_V_y = np.linalg.inv(V_y)
+        inv_V_x_T = np.linalg.inv(V_x).T
+        V_x_T = V_x.T
+
+        inv_lambda = 1 / (1 - lambda_y[:,np.newaxis] -
+                          lambda_x[np.newaxis,:])
+
+        def resolver_lib(R):
+            W = inv_V_y @ R @ inv_V_x_T
+            W *= inv_lambda
+            return (V_y @ W @ V_x_T).real
+
+    elif min(cond_x, cond_y) <= cond_max:
+        # Diagonalización en una dirección. En la otra, con autovectores
+        # mal condicionados (por ejemplo, por advección dominante), se
+        # resuelve un sistema tridiagonal por autovalor con Thomas
+        if cond_y <= cond_max:
+            factor_tri, lambda_diag, V_diag = factor_x, lambda_y, V_y
+        else:
+            factor_tri, lambda_diag, V_diag = factor_y, lambda_x, V_x
+
+        print("\tSe diagonaliza en '{}' ".format(
+              'y' if cond_y <= cond_max else 'x') +
+              "y se resuelven sistemas tridiagonales en '{}'".format(
+              'x' if cond_y <= cond_max else 'y'))
+
+        inv_V_diag = np.linalg.inv(V_diag)
+
+        # Diagonales de (1 - lambda_k) I - T, de forma (n_tri, n_diag):
+        # un sistema tridiagonal por cada autovalor lambda_k
+        n_tri = factor_tri.shape[0]
+        diag_inf = np.zeros(n_tri)
+        diag_sup = np.zeros(n_tri)
+        diag_inf[1:] = -np.diagonal(factor_tri, -1)
+        diag_sup[:-1] = -np.diagonal(factor_tri, 1)
+        diag_ppal = -np.diagonal(factor_tri)
+
+        thomas = cna_adi.armar_thomas(
+            np.repeat(diag_inf[:,np.newaxis], len(lambda_diag), axis=1),
+            1 - lambda_diag[np.newaxis,:] + diag_ppal[:,np.newaxis],
+            np.repeat(diag_sup[:,np.newaxis], len(lambda_diag), axis=1))
+
+        if cond_y <= cond_max:
+            def resolver_lib(R):
+                W = inv_V_diag @ R
+                W = thomas(np.ascontiguousarray(W.T)).T
+                return (V_diag @ W).real
+        else:
+            def resolver_lib(R):
+                W = R @ inv_V_diag.T
+                W = thomas(W)
+                return (W @ V_diag.T).real
+
+    else:
+        print("\tAutovectores de ambos factores mal condicionados")
+        return None
+
+    t_desc = time.perf_counter() - t_ini
+
+    print("\tTiempo de preparación: {:.3f} s".format(t_desc))
+
+    def resolver(vec_b, vec_x0=None):
+        vec_b = np.ravel(vec_b)
+        vec_x = np.empty(vec_b.shape)
+
+        # Nodos Dirichlet
+        vec_x[nodos_Dir] = vec_b[nodos_Dir]
+
+        # Nodos libres
+        vec_r = vec_b[nodos_lib] - A_acople @ vec_b[nodos_Dir]
+        vec_x[nodos_lib] = resolver_lib(vec_r.reshape(forma_lib)).ravel()
+
+        return vec_x
+
+    # Fin función 'armar_solver_kron'
+    return resolver
+#%%
+
+#%%
+def armar_solver_banda(matriz_A, forma=None):
+    """
+    Función que prepara la solución del sistema A x = b con LU en banda
+    de LAPACK ('gbtrf' y 'gbtrs') y devuelve una función
+    'resolver(vec_b, vec_x0=None)'.
+
+    Con la numeración de nodos del programa ('x' más rápida) el ancho de
+    banda de A es nx. Si se pasa la forma (ny, nx) del campo y ny < nx,
+    los nodos se renumeran con 'y' más rápida, de modo que el ancho de
+    banda pasa a ser ny. La renumeración es interna: b y x se reciben y
+    devuelven con la numeración original.
+
+    La matriz se factoriza una única vez, en almacenamiento en banda, y
+    en cada llamada se efectúan sólo las sustituciones, para un vector b
+    o para una matriz b de forma (n, k) con k lados derechos.
+    """
+
+    matriz_A = sp.coo_matrix(matriz_A)
+    n_el_total = matriz_A.shape[0]
+
+    # Renumeración de nodos con 'y' más rápida
+    if forma is not None and forma[0] < forma[1]:
+        n_el_y, n_el_x = forma
+        permutacion = np.arange(n_el_total).reshape(n_el_y, n_el_x).\
+            T.ravel()
+        inv_permutacion = np.argsort(permutacion)
+        filas = inv_permutacion[matriz_A.row]
+        cols = inv_permutacion[matriz_A.col]
+        orden = "'y' más rápida"
+    else:
+        permutacion = None
+        filas = matriz_A.row
+        cols = matriz_A.col
+        orden = "'x' más rápida"
+
+    # Anchos de banda inferior y superior
+    banda_inf = int(max((filas - cols).max(initial=0), 0))
+    banda_sup = int(max((cols - filas).max(initial=0), 0))
+
+    # Almacenamiento en banda de LAPACK para 'gbtrf': el elemento (i, j)
+    # se guarda en la fila banda_inf + banda_sup + i - j, columna j. Las
+    # primeras banda_inf filas quedan para el relleno de la factorización
+    ab = np.zeros((2*banda_inf + banda_sup + 1, n_el_total))
+    np.add.at(ab, (banda_inf + banda_sup + filas - cols, cols),
+              matriz_A.data)
+
+    t_ini = time.perf_counter()
+    gbtrf, gbtrs = linalg.lapack.get_lapack_funcs(('gbtrf', 'gbtrs'),
+                                                  (ab,))
+    lu_banda, pivotes, info = gbtrf(ab, banda_inf, banda_sup)
+    t_fact = time.perf_counter() - t_ini
+
+    if info != 0:
+        print("Error en función 'armar_solver_banda'")
+        print("Factorización en banda fallida (info = {:d})".format(info))
+        sys.exit(1)
+
+    print("\nFactorización LU en banda de la matriz 'A'")
+    print("\tNumeración de nodos: {}".format(orden))
+    print("\tAnchos de banda inferior y superior: {:d}, {:d}".
+          format(banda_inf, banda_sup))
+    print("\tTiempo de factorización: {:.3f} s".format(t_fact))
+    print("\tElementos almacenados: {:d}".format(lu_banda.size))
+
+    def resolver(vec_b, vec_x0=None):
+        vec_b = np.asarray(vec_b)
+        if permutacion is not None:
+            vec_b = vec_b[permutacion]
+
+        vec_x, info = gbtrs(lu_banda, banda_inf, banda_sup, vec_b,
+                            pivotes)
+
+        if permutacion is not None:
+            vec_x = vec_x[inv_permutacion]
+
+        return vec_x
+
+    # Fin función 'armar_solver_banda'
+    return resolver
+#%%
+
+#%%
+def por_columnas(resolver):
+    """
+    Función que extiende 'resolver(vec_b, vec_x0=None)' a matrices b de
+    forma (n, k), resolviendo cada columna por separado (con la columna
+    correspondiente de 'vec_x0', si se da). Los vectores b se resuelven
+    sin cambios.
+    """
+
+    def resolver_columnas(vec_b, vec_x0=None):
+        if np.ndim(vec_b) < 2:
+            return resolver(vec_b, vec_x0)
+
+        cols_x0 = [None]*vec_b.shape[1] if vec_x0 is None else \
+            np.reshape(vec_x0, vec_b.shape).T
+
+        return np.column_stack([resolver(col_b, col_x0) for col_b, col_x0
+                                in zip(np.transpose(vec_b), cols_x0)])
+
+    # Fin función 'por_columnas'
+    return resolver_columnas
+#%%
+
+#%%
+def armar_solver(matriz_A, metodo='LU', precond='ILU', tol=1e-10,
+                 registro=None, factores_kron=None, mascara_Dir=None):
+    """
+    Función que prepara la solución del sistema A x = b y devuelve una
+    función 'resolver(vec_b, vec_x0=None)' que calcula x para cada
+    vector b.
+
+    Métodos disponibles:
+    'SPSOLVE'  -> resuelve con 'spsolve' en cada llamada, factorizando
+                  la matriz cada vez.
+    'LU'       -> factoriza la matriz una única vez con LU disperso
+                  ('splu') y en cada llamada efectúa sólo las
+                  sustituciones con los factores triangulares.
+    'GMRES'    -> método de Krylov GMRES con precondicionador.
+    'BICGSTAB' -> método de Krylov BiCGSTAB con precondicionador.
+    'KRON'     -> diagonalización rápida de la matriz separable (ver
+                  'armar_solver_kron'), a partir de 'factores_kron' y
+                  'mascara_Dir'. Si A no es separable se usa 'LU'.
+    'BANDA'    -> LU en banda de LAPACK, factorizada una única vez, con
+                  la numeración de nodos de menor ancho de banda según
+                  la forma de 'mascara_Dir' (ver 'armar_solver_banda').
+    'MULTIGRID'-> ciclos V de multigrilla geométrica con suavizado por
+                  líneas, sobre el campo con la forma de 'mascara_Dir'
+                  (ver 'cna_tp1_multigrid.py'). Con tolerancia relativa
+                  'tol' y registro de ciclos como los métodos de Krylov.
+
+    Con el método 'LU' se informa el tiempo de factorización y el relleno
+    ('fill-in') de los factores respecto de la matriz original.
+
+    'vec_b' puede ser también una matriz de forma (n, k), con k lados
+    derechos. 'SPSOLVE', 'LU' y 'BANDA' los resuelven juntos, con una
+    única sustitución por factor; los demás métodos, columna a columna
+    (ver 'por_columnas').
+
+    Los métodos de Krylov no requieren factorizar A, por lo que sirven
+    para mallas donde el relleno de LU no entra en memoria. El
+    precondicionador ('precond', ver 'armar_precondicionador') se arma
+    una única vez. Cada solución parte de 'vec_x0', normalmente la
+    solución del paso anterior, y converge con tolerancia relativa 'tol'.
+    Si se pasa una lista en 'registro', se agrega a ella la cantidad de
+    iteraciones de cada solución.
+    """
+
+    if metodo not in ('SPSOLVE', 'LU', 'GMRES', 'BICGSTAB', 'KRON',
+                      'BANDA', 'MULTIGRID'):
+        print("Error en función 'armar_solver'")
+        print("Método de solución mal especificado: debe ser " +
+              "'SPSOLVE', 'LU', 'GMRES', 'BICGSTAB', 'KRON', 'BANDA' o " +
+              "'MULTIGRID'")
+        sys.exit(1)
+    else:
+        pass
+
+    if metodo=='KRON':
+        resolver = armar_solver_kron(matriz_A, *factores_kron,
+                                     mascara_Dir)
+        if resolver is not None:
+            return por_columnas(resolver)
+        else:
+            print("Se utiliza el método 'LU'")
+            metodo = 'LU'
+
+    # Forma (ny, nx) del campo, para los métodos que usan la malla
+    forma = None if mascara_Dir is None else np.shape(mascara_Dir)
+
+    if metodo=='BANDA':
+        return armar_solver_banda(matriz_A, forma)
+
+    elif metodo=='MULTIGRID':
+        return por_columnas(cna_mg.armar_solver_multigrilla(
+            matriz_A, forma, tol=tol, registro=registro))
+
+    # Formato 'csc' requerido por los solvers directos
+    matriz_A = matriz_A.tocsc()
+
+    if metodo=='SPSOLVE':
+        def resolver(vec_b, vec_x0=None):
+            return splinalg.spsolve(matriz_A, vec_b)
+
+    elif metodo=='LU':
+        t_ini = time.perf_counter()
+        factor_lu = splinalg.splu(matriz_A)
+        t_fact = time.perf_counter() - t_ini
+
+        # Relleno: elementos no nulos de L y U respecto de los de A
+        nnz_lu = factor_lu.L.nnz + factor_lu.U.nnz
+        relleno = nnz_lu / matriz_A.nnz
+
+        print("\nFactorización LU de la matriz 'A'")
+        print("\tTiempo de factorización: {:.3f} s".format(t_fact))
+        print("\tElementos no nulos de 'A': {:d}".format(matriz_A.nnz))
+        print("\tElementos no nulos de 'L' + 'U': {:d}".format(nnz_lu))
+        print("\tRelleno (nnz(L+U)/nnz(A)): {:.2f}".format(relleno))
+
+        def resolver(vec_b, vec_x0=None):
+            return factor_lu.solve(vec_b)
+
+    else: # metodo in ('GMRES', 'BICGSTAB')
+        matriz_A = matriz_A.tocsr()
+        precondicionador = armar_precondicionador(matriz_A, precond,
+                                                  forma=forma)
+
+        if metodo=='GMRES':
+            krylov = splinalg.gmres
+            # Conteo de iteraciones internas de GMRES
+            opciones = {'callback_type': 'pr_norm'}
+        else: # metodo=='BICGSTAB'
+            krylov = splinalg.bicgstab
+            opciones = {}
+
+        # A partir de scipy 1.12 la tolerancia relativa es 'rtol'
+        if 'rtol' in inspect.signature(krylov).parameters:
+            opciones['rtol'] = tol
+        else:
+            opciones['tol'] = tol
+
+        def resolver(vec_b, vec_x0=None):
+            iteraciones = [0]
+
+            def contar(_):
+                iteraciones[0] += 1
+
+            if vec_x0 is not None:
+                vec_x0 = np.ravel(vec_x0)
+
+            vec_x, info = krylov(matriz_A, np.ravel(vec_b), x0=vec_x0,
+                                 atol=0.0, M=precondicionador,
+                                 callback=contar, **opciones)
+
+            if info != 0:
+                print("\tAdvertencia: {} no convergió ".format(metodo) +
+                      "a la tolerancia pedida " +
+                      "({:d} iteraciones)".format(iteraciones[0]))
+
+            if registro is not None:
+                registro.append(iteraciones[0])
+
+            return vec_x
+
+        resolver = por_columnas(resolver)
+
+    # Fin función 'armar_solver'
+    return resolver
+#%%
+
+#**** FIN PROGRAMA ****#
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+# -*- coding: utf-8 -*-
+
+"""
+Cálculo numérico avanzado, 2020, FIUBA.
+
+Grupo 4: Santiago Mosca, Santiago Pérez Raiden, Cristhian Zárate Evers.
+
+Trabajo Práctico n.° 1
+
+archivo = 'cna_tp1_theta.py'
+
+Contiene el paso temporal del método theta con matrices globales.
+
+Cada paso resuelve A u_n1 = B u_ini + forzante, con A = I - theta*M y
+B = I + (1-theta)*M armadas con 'cna_tp1_armado.py' y las filas Dirichlet
+reemplazadas por la identidad. La solución del sistema se prepara una
+única vez con 'cna_tp1_solver.armar_solver'.
+"""
+
+import cna_tp1_func as cna_func
+import cna_tp1_armado as cna_armado
+import cna_tp1_solver as cna_solver
+
+#**** FUNCIONES DEL PROGRAMA ****#
+
+
+#%%
+def armar_sistema_theta(n_el_x=1, n_el_y=1, delta_x=1, delta_y=1,
+                        delta_t=1, vel=0, dif_long=0, dif_trans=0,
+                        c_dec=0, upwinding='NO', theta=0.5,
+                        mascara_Dir=None, solver='LU', precond='ILU',
+                        tol=1e-10, registro=None):
+    """
+    Función que arma las matrices del método theta y devuelve la matriz
+    B y la función 'resolver(vec_b, x0)' que resuelve A x = vec_b, con
+    la factorización de A (o el precondicionador) calculada una única
+    vez.
+
+    'solver', 'precond', 'tol' y 'registro' son los argumentos de
+    'cna_tp1_solver.armar_solver'. Con el solver 'KRON' se arman también
+    los factores 1D de A.
+    """
+
+    # Diagonales de la matriz M = dt*(D2x + D2y - I*c_dec - D1x),
+    # con D1x término advectivo y D2x, D2y términos difusivos
+    diags_M, offsets_M = cna_armado.diagonales_M(
+        n_el_x=n_el_x, n_el_y=n_el_y, delta_x=delta_x, delta_y=delta_y,
+        delta_t=delta_t, vel=vel, dif_long=dif_long, dif_trans=dif_trans,
+        c_dec=c_dec, upwinding=upwinding)
+
+    # Matrices para solución LHS y RHS
+    # A = I - theta * M
+    # B = I + (1-theta) * M
+    A, B = cna_armado.matrices_AB(diags_M, offsets_M, theta=theta)
+
+    # Aplicación de la condición Dirichlet sobre A y B
+    if mascara_Dir is not None:
+        B = cna_func.cb_Dir_mascara(B, mascara_Dir)
+        A = cna_func.cb_Dir_mascara(A, mascara_Dir)
+
+    # Factores 1D de la matriz separable, para el solver 'KRON'
+    if solver=='KRON':
+        factores_kron = cna_armado.factores_kron(
+            n_el_x=n_el_x, n_el_y=n_el_y, delta_x=delta_x,
+            delta_y=delta_y, delta_t=delta_t, vel=vel,
+            dif_long=dif_long, dif_trans=dif_trans, c_dec=c_dec,
+            upwinding=upwinding, theta=theta)
+    else:
+        factores_kron = None
+
+    # La matriz 'A' no cambia entre pasos, por lo que su factorización
+    # (o el armado del precondicionador) se efectúa una sola vez
+    resolver = cna_solver.armar_solver(A, metodo=solver, precond=precond,
+                                       tol=tol, registro=registro,
+                                       factores_kron=factores_kron,
+                                       mascara_Dir=mascara_Dir)
+
+    # Fin función 'armar_sistema_theta'
+    return B, resolver
+#%%
+
+#%%
+def armar_paso_theta(n_el_x=1, n_el_y=1, delta_x=1, delta_y=1,
+                     delta_t=1, vel=0, dif_long=0, dif_trans=0,
+                     c_dec=0, upwinding='NO', theta=0.5,
+                     mascara_Dir=None, val_forz=0, pos_x=1, pos_y=1,
+                     solver='LU', precond='ILU', tol=1e-10,
+                     registro=None):
+    """
+    Función que devuelve una función 'paso(u_ini)' que avanza un paso
+    temporal del método theta el vector u_ini, de nx*ny elementos, y
+    devuelve el vector u_n1.
+
+    'val_forz', 'pos_x' y 'pos_y' pueden ser arreglos, con varias
+    fuentes (ver 'cna_tp1_func.vector_rhs'). Con 'paso(u_ini, val_forz)'
+    la forzante del paso reemplaza a 'val_forz', en los mismos nodos. Los
+    demás argumentos son los de 'armar_sistema_theta'.
+    """
+
+    B, resolver = armar_sistema_theta(
+        n_el_x=n_el_x, n_el_y=n_el_y, delta_x=delta_x, delta_y=delta_y,
+        delta_t=delta_t, vel=vel, dif_long=dif_long, dif_trans=dif_trans,
+        c_dec=c_dec, upwinding=upwinding, theta=theta,
+        mascara_Dir=mascara_Dir, solver=solver, precond=precond, tol=tol,
+        registro=registro)
+
+    def paso(u_ini, val_forz=val_forz):
+        # Construcción del vector independiente con la forzante
+        u_rhs = cna_func.vector_rhs(mat_ind=B,
+                                    vec_ini=u_ini,
+                                    val_forz=val_forz,
+                                    pos_x=pos_x, pos_y=pos_y,
+                                    n_el_x=n_el_x, n_el_y=n_el_y)
+
+        # Cálculo del vector solución, partiendo de la solución del
+        # paso anterior en los métodos iterativos
+        return resolver(u_rhs, u_ini)
+
+    # Fin función 'armar_paso_theta'
+    return paso
+#%%
+
+#**** FIN PROGRAMA ****#